@@ -0,0 +1,33 @@
+"""Add geocode_cache table
+
+Revision ID: 5c1e7a9d2b40
+Revises: 20250817_product_options
+Create Date: 2026-10-18 10:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "5c1e7a9d2b40"
+down_revision = "20250817_product_options"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "geocode_cache",
+        sa.Column("address_key", sa.String(length=64), primary_key=True),
+        sa.Column("normalized_address", sa.Text(), nullable=False),
+        sa.Column("latitude", sa.Float(), nullable=False),
+        sa.Column("longitude", sa.Float(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=True),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index(op.f("ix_geocode_cache_expires_at"), "geocode_cache", ["expires_at"], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f("ix_geocode_cache_expires_at"), table_name="geocode_cache")
+    op.drop_table("geocode_cache")
@@ -0,0 +1,27 @@
+"""Composite indexes for orders keyset pagination and admin filters
+
+Revision ID: 8e3f0b6c4a17
+Revises: 5c1e7a9d2b40
+Create Date: 2026-10-18 11:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "8e3f0b6c4a17"
+down_revision = "5c1e7a9d2b40"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index("ix_orders_created_at_id", "orders", ["created_at", "id"], unique=False)
+    op.create_index("ix_orders_status_created_at_id", "orders", ["status", "created_at", "id"], unique=False)
+    op.create_index("ix_orders_payment_mode_created_at_id", "orders", ["payment_mode", "created_at", "id"], unique=False)
+
+
+def downgrade():
+    op.drop_index("ix_orders_payment_mode_created_at_id", table_name="orders")
+    op.drop_index("ix_orders_status_created_at_id", table_name="orders")
+    op.drop_index("ix_orders_created_at_id", table_name="orders")
@@ -0,0 +1,39 @@
+"""Add stripe_outbox table
+
+Revision ID: a7e1c5b9d302
+Revises: f5c3d8a2b694
+Create Date: 2026-10-18 18:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "a7e1c5b9d302"
+down_revision = "f5c3d8a2b694"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "stripe_outbox",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("action", sa.String(length=32), nullable=False),
+        sa.Column("payment_intent_id", sa.String(length=255), nullable=False),
+        sa.Column("payload", sa.Text(), nullable=False),
+        sa.Column("status", sa.String(length=16), nullable=False, server_default="pending"),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("next_attempt_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index(
+        "ix_stripe_outbox_status_next_attempt", "stripe_outbox", ["status", "next_attempt_at"], unique=False
+    )
+
+
+def downgrade():
+    op.drop_index("ix_stripe_outbox_status_next_attempt", table_name="stripe_outbox")
+    op.drop_table("stripe_outbox")
@@ -0,0 +1,41 @@
+"""Add stripe_events table
+
+Revision ID: b3f9e7a1c6d4
+Revises: a7e1c5b9d302
+Create Date: 2026-10-18 19:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "b3f9e7a1c6d4"
+down_revision = "a7e1c5b9d302"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "stripe_events",
+        sa.Column("id", sa.String(length=255), primary_key=True),
+        sa.Column("type", sa.String(length=64), nullable=False),
+        sa.Column("payment_intent_id", sa.String(length=255), nullable=True),
+        sa.Column("payload", sa.Text(), nullable=False),
+        sa.Column("status", sa.String(length=16), nullable=False, server_default="pending"),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("next_attempt_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("received_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.Column("processed_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index(op.f("ix_stripe_events_payment_intent_id"), "stripe_events", ["payment_intent_id"], unique=False)
+    op.create_index(
+        "ix_stripe_events_status_next_attempt", "stripe_events", ["status", "next_attempt_at"], unique=False
+    )
+
+
+def downgrade():
+    op.drop_index("ix_stripe_events_status_next_attempt", table_name="stripe_events")
+    op.drop_index(op.f("ix_stripe_events_payment_intent_id"), table_name="stripe_events")
+    op.drop_table("stripe_events")
@@ -0,0 +1,45 @@
+"""Foreign-key and lookup indexes
+
+Revision ID: b7d2c9e41f85
+Revises: 8e3f0b6c4a17
+Create Date: 2026-10-18 12:00:00
+
+orders.status / orders.created_at sont déjà couverts (colonnes de tête)
+par les index composites de 8e3f0b6c4a17.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "b7d2c9e41f85"
+down_revision = "8e3f0b6c4a17"
+branch_labels = None
+depends_on = None
+
+
+_INDEXES = [
+    ("ix_order_items_order_id", "order_items", ["order_id"]),
+    ("ix_order_items_product_id", "order_items", ["product_id"]),
+    ("ix_choice_options_option_id", "choice_options", ["option_id"]),
+    ("ix_products_category_id", "products", ["category_id"]),
+    ("ix_order_item_choices_choice_option_id", "order_item_choices", ["choice_option_id"]),
+    ("ix_product_options_option_id", "product_options", ["option_id"]),
+    ("ix_products_name", "products", ["name"]),
+]
+
+
+def upgrade():
+    for name, table, cols in _INDEXES:
+        op.create_index(name, table, cols, unique=False, if_not_exists=True)
+    # Même normalisation que core/pricing._norm : lower(trim(name))
+    op.create_index(
+        "ix_products_name_norm", "products", [sa.text("lower(trim(name))")],
+        unique=False, if_not_exists=True,
+    )
+
+
+def downgrade():
+    op.drop_index("ix_products_name_norm", table_name="products", if_exists=True)
+    for name, table, _cols in reversed(_INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
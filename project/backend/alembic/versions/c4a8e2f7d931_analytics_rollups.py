@@ -0,0 +1,90 @@
+"""Analytics rollup tables
+
+Revision ID: c4a8e2f7d931
+Revises: b7d2c9e41f85
+Create Date: 2026-10-18 13:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "c4a8e2f7d931"
+down_revision = "b7d2c9e41f85"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "sales_daily",
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("orders_count", sa.Integer(), nullable=False),
+        sa.Column("items_count", sa.Integer(), nullable=False),
+        sa.Column("revenue", sa.DECIMAL(precision=12, scale=2), nullable=False),
+        sa.Column("fees", sa.DECIMAL(precision=12, scale=2), nullable=False),
+    )
+    op.create_table(
+        "sales_hourly",
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("hour", sa.Integer(), primary_key=True),
+        sa.Column("orders_count", sa.Integer(), nullable=False),
+        sa.Column("revenue", sa.DECIMAL(precision=12, scale=2), nullable=False),
+    )
+    op.create_table(
+        "product_sales_daily",
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("product_id", sa.Integer(), primary_key=True),
+        sa.Column("product_name", sa.String(length=200), nullable=False),
+        sa.Column("quantity", sa.Integer(), nullable=False),
+        sa.Column("revenue", sa.DECIMAL(precision=12, scale=2), nullable=False),
+    )
+    op.create_table(
+        "choice_sales_daily",
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("choice_option_id", sa.Integer(), primary_key=True),
+        sa.Column("choice_name", sa.String(length=100), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+    )
+
+    # Backfill depuis l'historique (une seule fois), hors commandes annulées.
+    # Fuseau = ANALYTICS_TIMEZONE par défaut.
+    local_ts = "(o.created_at AT TIME ZONE 'Europe/Paris')"
+    op.execute(f"""
+        INSERT INTO sales_daily (day, orders_count, items_count, revenue, fees)
+        SELECT {local_ts}::date, COUNT(*),
+               COALESCE(SUM((SELECT SUM(oi.quantity) FROM order_items oi WHERE oi.order_id = o.id)), 0),
+               COALESCE(SUM(o.total), 0), COALESCE(SUM(o.fee), 0)
+        FROM orders o WHERE o.status <> 'cancelled'
+        GROUP BY 1;
+    """)
+    op.execute(f"""
+        INSERT INTO sales_hourly (day, hour, orders_count, revenue)
+        SELECT {local_ts}::date, EXTRACT(HOUR FROM {local_ts})::int, COUNT(*), COALESCE(SUM(o.total), 0)
+        FROM orders o WHERE o.status <> 'cancelled'
+        GROUP BY 1, 2;
+    """)
+    op.execute(f"""
+        INSERT INTO product_sales_daily (day, product_id, product_name, quantity, revenue)
+        SELECT {local_ts}::date, oi.product_id, MAX(oi.product_name_snapshot),
+               SUM(oi.quantity), SUM(oi.item_total)
+        FROM orders o JOIN order_items oi ON oi.order_id = o.id
+        WHERE o.status <> 'cancelled'
+        GROUP BY 1, 2;
+    """)
+    op.execute(f"""
+        INSERT INTO choice_sales_daily (day, choice_option_id, choice_name, count)
+        SELECT {local_ts}::date, oic.choice_option_id, MAX(oic.choice_name_snapshot), SUM(oi.quantity)
+        FROM orders o
+        JOIN order_items oi ON oi.order_id = o.id
+        JOIN order_item_choices oic ON oic.order_item_id = oi.id
+        WHERE o.status <> 'cancelled'
+        GROUP BY 1, 2;
+    """)
+
+
+def downgrade():
+    op.drop_table("choice_sales_daily")
+    op.drop_table("product_sales_daily")
+    op.drop_table("sales_hourly")
+    op.drop_table("sales_daily")
@@ -0,0 +1,56 @@
+"""Shared catalog version (catalog_state + triggers)
+
+Revision ID: c6e2a9d4f817
+Revises: b3f9e7a1c6d4
+Create Date: 2026-10-19 09:00:00
+
+Chaque écriture sur les tables du catalogue incrémente catalog_state.version
+(trigger par instruction) : un worker compare cette version à celle de son
+snapshot en cache avant de tarifer une commande.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "c6e2a9d4f817"
+down_revision = "b3f9e7a1c6d4"
+branch_labels = None
+depends_on = None
+
+
+_TABLES = ("categories", "products", "options", "choice_options", "product_options")
+
+
+def upgrade():
+    op.create_table(
+        "catalog_state",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("version", sa.BigInteger(), nullable=False, server_default="1"),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+    )
+    op.execute("INSERT INTO catalog_state (id, version) VALUES (1, 1)")
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION bump_catalog_version() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO catalog_state (id, version, updated_at) VALUES (1, 1, now())
+            ON CONFLICT (id) DO UPDATE SET version = catalog_state.version + 1, updated_at = now();
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+    for table in _TABLES:
+        op.execute(
+            f"CREATE TRIGGER trg_{table}_catalog_version "
+            f"AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table} "
+            f"FOR EACH STATEMENT EXECUTE PROCEDURE bump_catalog_version()"
+        )
+
+
+def downgrade():
+    for table in reversed(_TABLES):
+        op.execute(f"DROP TRIGGER IF EXISTS trg_{table}_catalog_version ON {table}")
+    op.execute("DROP FUNCTION IF EXISTS bump_catalog_version()")
+    op.drop_table("catalog_state")
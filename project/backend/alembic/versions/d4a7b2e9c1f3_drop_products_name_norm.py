@@ -0,0 +1,29 @@
+"""Drop the lower(trim(name)) index on products
+
+Revision ID: d4a7b2e9c1f3
+Revises: c6e2a9d4f817
+Create Date: 2026-10-19 09:30:00
+
+Le lookup "products by name" du Menu Combo est revenu à la comparaison
+exacte sur products.name (servie par ix_products_name).
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "d4a7b2e9c1f3"
+down_revision = "c6e2a9d4f817"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.drop_index("ix_products_name_norm", table_name="products", if_exists=True)
+
+
+def downgrade():
+    op.create_index(
+        "ix_products_name_norm", "products", [sa.text("lower(trim(name))")],
+        unique=False, if_not_exists=True,
+    )
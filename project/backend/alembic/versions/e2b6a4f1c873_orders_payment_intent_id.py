@@ -0,0 +1,39 @@
+"""Add orders.payment_intent_id (unique)
+
+Revision ID: e2b6a4f1c873
+Revises: d91f3b6e5a20
+Create Date: 2026-10-18 16:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "e2b6a4f1c873"
+down_revision = "d91f3b6e5a20"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("orders", sa.Column("payment_intent_id", sa.String(length=255), nullable=True))
+    op.create_index(op.f("ix_orders_payment_intent_id"), "orders", ["payment_intent_id"], unique=True)
+
+    # Reprise des PI déjà dédoublonnés via idempotency_keys (scope "orders.capture")
+    op.execute(
+        """
+        UPDATE orders o
+        SET payment_intent_id = k.key
+        FROM idempotency_keys k
+        WHERE k.scope = 'orders.capture'
+          AND k.state = 'done'
+          AND k.order_id = o.id
+          AND o.payment_intent_id IS NULL
+        """
+    )
+    op.execute("DELETE FROM idempotency_keys WHERE scope = 'orders.capture'")
+
+
+def downgrade():
+    op.drop_index(op.f("ix_orders_payment_intent_id"), table_name="orders")
+    op.drop_column("orders", "payment_intent_id")
@@ -0,0 +1,27 @@
+"""Lease column on stripe_outbox
+
+Revision ID: e8c1f4a6b2d9
+Revises: d4a7b2e9c1f3
+Create Date: 2026-10-19 14:00:00
+
+Le worker réserve ses lignes (locked_until = now() + bail) puis commit
+avant d'appeler Stripe : plus de verrou ni de transaction ouverts pendant
+les appels réseau.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "e8c1f4a6b2d9"
+down_revision = "d4a7b2e9c1f3"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("stripe_outbox", sa.Column("locked_until", sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade():
+    op.drop_column("stripe_outbox", "locked_until")
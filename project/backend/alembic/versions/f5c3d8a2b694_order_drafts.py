@@ -0,0 +1,30 @@
+"""Add order_drafts table
+
+Revision ID: f5c3d8a2b694
+Revises: e2b6a4f1c873
+Create Date: 2026-10-18 17:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "f5c3d8a2b694"
+down_revision = "e2b6a4f1c873"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "order_drafts",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("payload", sa.LargeBinary(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=True),
+    )
+    op.create_index(op.f("ix_order_drafts_created_at"), "order_drafts", ["created_at"], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f("ix_order_drafts_created_at"), table_name="order_drafts")
+    op.drop_table("order_drafts")
@@ -1,3 +1,3 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from database.session import get_db
-from core.security import get_admin_token
\ No newline at end of file
+from core.security import get_admin_token, get_admin_token_or_query
\ No newline at end of file
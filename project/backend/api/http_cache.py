@@ -0,0 +1,79 @@
+"""
+Réponses conditionnelles pour les lectures du catalogue.
+
+ETag fort = empreinte du snapshot catalogue (crud/catalog_cache.py) + URL
+(chemin et query) ; Last-Modified = date du snapshot. Un client / CDN qui
+renvoie If-None-Match (ou If-Modified-Since seul) reçoit une 304 vide,
+calculée en mémoire sans toucher à l'ORM.
+"""
+import zlib
+from datetime import timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Optional
+
+from fastapi import Request, Response, status
+
+from core.config import settings
+from crud.catalog_cache import CatalogSnapshot
+
+
+def catalog_etag(snap: CatalogSnapshot, request: Request, variant: str = "") -> str:
+    """`variant` : encodage du corps ("gzip", "br") -> un ETag fort distinct par représentation."""
+    key = f"{request.url.path}?{request.url.query}".encode("utf-8")
+    suffix = f"-{variant}" if variant else ""
+    return f'"{snap.digest[:20]}-{zlib.crc32(key):08x}{suffix}"'
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    # Comparaison faible (RFC 9110) : un proxy qui compresse peut préfixer W/
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
+
+
+def _not_modified_since(header: str, snap: CatalogSnapshot) -> bool:
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    if since is None or snap.last_modified is None:
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return snap.last_modified <= since
+
+
+def catalog_cache_headers(snap: CatalogSnapshot, request: Request, variant: str = "") -> Dict[str, str]:
+    headers = {
+        "ETag": catalog_etag(snap, request, variant),
+        "Cache-Control": f"public, max-age={settings.CATALOG_HTTP_MAX_AGE_SECONDS}",
+    }
+    if snap.last_modified is not None:
+        headers["Last-Modified"] = format_datetime(snap.last_modified, usegmt=True)
+    return headers
+
+
+def conditional_catalog_response(
+    snap: CatalogSnapshot, request: Request, response: Response, variant: str = ""
+) -> Optional[Response]:
+    """
+    Pose ETag / Last-Modified / Cache-Control sur `response` ; retourne une
+    304 à renvoyer telle quelle si la version du client est à jour, sinon None.
+    """
+    headers = catalog_cache_headers(snap, request, variant)
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        fresh = _etag_matches(if_none_match, headers["ETag"])
+    else:
+        if_modified_since = request.headers.get("if-modified-since")
+        fresh = if_modified_since is not None and _not_modified_since(if_modified_since, snap)
+    if fresh:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return None
@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 
-from . import categories, products, options, choice_options, orders
+from . import categories, products, options, choice_options, orders, analytics, stripe_events, catalog_menu, sql_profiler
 
 api_router = APIRouter()
 
@@ -9,5 +9,9 @@ api_router.include_router(products.router)
 api_router.include_router(options.router)
 api_router.include_router(choice_options.router)
 api_router.include_router(orders.router)
+api_router.include_router(analytics.router)
+api_router.include_router(stripe_events.router)
+api_router.include_router(catalog_menu.router)
+api_router.include_router(sql_profiler.router)
 
 
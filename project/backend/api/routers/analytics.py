@@ -0,0 +1,116 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.deps import get_db, get_admin_token
+from schemas.schemas import (
+    RevenueDayResponse, RevenueHourResponse, TopProductResponse,
+    TopChoiceResponse, BasketSummaryResponse,
+)
+from crud import analytics
+
+router = APIRouter(prefix="/analytics", tags=["Analytics"])
+
+_CENT = Decimal("0.01")
+
+
+def _period(start: Optional[date], end: Optional[date]):
+    """Par défaut : les 30 derniers jours (jour courant inclus, fuseau analytics)."""
+    today, _hour = analytics.local_day_hour()
+    end = end or today
+    start = start or (end - timedelta(days=29))
+    if start > end:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="start > end")
+    return start, end
+
+
+def _avg(total, count) -> Decimal:
+    return (Decimal(total or 0) / count).quantize(_CENT) if count else Decimal("0.00")
+
+
+@router.get("/revenue/daily", response_model=List[RevenueDayResponse])
+async def revenue_daily(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    db: AsyncSession = Depends(get_db),
+    admin_token: str = Depends(get_admin_token),
+):
+    start, end = _period(start, end)
+    rows = await analytics.revenue_by_day(db, start, end)
+    return [
+        RevenueDayResponse(
+            day=r.day,
+            orders_count=r.orders_count,
+            items_count=r.items_count,
+            revenue=r.revenue,
+            fees=r.fees,
+            avg_basket=_avg(r.revenue, r.orders_count),
+        )
+        for r in rows
+    ]
+
+
+@router.get("/revenue/hourly", response_model=List[RevenueHourResponse])
+async def revenue_hourly(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    db: AsyncSession = Depends(get_db),
+    admin_token: str = Depends(get_admin_token),
+):
+    start, end = _period(start, end)
+    rows = await analytics.revenue_by_hour(db, start, end)
+    return [RevenueHourResponse(hour=r.hour, orders_count=r.orders_count, revenue=r.revenue) for r in rows]
+
+
+@router.get("/top-products", response_model=List[TopProductResponse])
+async def top_products(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    limit: int = Query(10, ge=1, le=100),
+    db: AsyncSession = Depends(get_db),
+    admin_token: str = Depends(get_admin_token),
+):
+    start, end = _period(start, end)
+    rows = await analytics.top_products(db, start, end, limit=limit)
+    return [
+        TopProductResponse(product_id=r.product_id, product_name=r.product_name, quantity=r.quantity, revenue=r.revenue)
+        for r in rows
+    ]
+
+
+@router.get("/top-choices", response_model=List[TopChoiceResponse])
+async def top_choices(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    limit: int = Query(10, ge=1, le=100),
+    db: AsyncSession = Depends(get_db),
+    admin_token: str = Depends(get_admin_token),
+):
+    start, end = _period(start, end)
+    rows = await analytics.top_choices(db, start, end, limit=limit)
+    return [
+        TopChoiceResponse(choice_option_id=r.choice_option_id, choice_name=r.choice_name, count=r.count)
+        for r in rows
+    ]
+
+
+@router.get("/basket", response_model=BasketSummaryResponse)
+async def basket_summary(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    db: AsyncSession = Depends(get_db),
+    admin_token: str = Depends(get_admin_token),
+):
+    start, end = _period(start, end)
+    rows = await analytics.revenue_by_day(db, start, end)
+    orders_count = sum(r.orders_count for r in rows)
+    revenue = sum((Decimal(r.revenue) for r in rows), Decimal("0.00"))
+    items = sum(r.items_count for r in rows)
+    return BasketSummaryResponse(
+        orders_count=orders_count,
+        revenue=revenue,
+        avg_basket=_avg(revenue, orders_count),
+        avg_items=_avg(items, orders_count),
+    )
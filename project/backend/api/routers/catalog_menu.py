@@ -0,0 +1,52 @@
+from fastapi import APIRouter, Depends, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.deps import get_db
+from api.http_cache import conditional_catalog_response
+from crud.catalog_menu import menu_cache
+
+router = APIRouter(prefix="/menu", tags=["Menu"])
+
+
+def _accepts(accept_encoding: str, coding: str) -> bool:
+    """`coding` listé dans Accept-Encoding avec q > 0."""
+    for part in accept_encoding.split(","):
+        name, *params = [p.strip() for p in part.split(";")]
+        if name.lower() != coding:
+            continue
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    return float(value) > 0
+                except ValueError:
+                    return False
+        return True
+    return False
+
+
+@router.get("", response_class=Response)
+async def read_menu(request: Request, db: AsyncSession = Depends(get_db)):
+    """
+    Catalogue complet { categories: [ {..., products: [ {..., options: [ {..., choice_options} ]} ]} ], uncategorized }
+    pré-rendu et pré-compressé une fois par version du catalogue (crud/catalog_menu.py).
+    """
+    snap, menu = await menu_cache.get(db)
+
+    accept_encoding = request.headers.get("accept-encoding", "")
+    if menu.br is not None and _accepts(accept_encoding, "br"):
+        body, encoding = menu.br, "br"
+    elif _accepts(accept_encoding, "gzip"):
+        body, encoding = menu.gzip, "gzip"
+    else:
+        body, encoding = menu.body, ""
+
+    response = Response(content=body, media_type="application/json")
+    response.headers["Vary"] = "Accept-Encoding"
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    not_modified = conditional_catalog_response(snap, request, response, variant=encoding)
+    if not_modified:
+        not_modified.headers["Vary"] = "Accept-Encoding"
+        return not_modified
+    return response
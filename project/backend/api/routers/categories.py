@@ -1,10 +1,12 @@
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from api.deps import get_db, get_admin_token
 from schemas.schemas import CategoryCreate, CategoryUpdate, CategoryResponse
 from crud.crud_operations import category_crud
+from crud.catalog_cache import catalog_cache
+from api.http_cache import conditional_catalog_response
 
 router = APIRouter(prefix="/categories", tags=["Categories"])
 
@@ -14,15 +16,23 @@ async def create_category(
     db: AsyncSession = Depends(get_db),
     admin_token: str = Depends(get_admin_token) # Admin protected
 ):
-    return await category_crud.create(db, obj_in=category_in)
+    category = await category_crud.create(db, obj_in=category_in)
+    catalog_cache.invalidate()
+    return category
 
 @router.get("/", response_model=List[CategoryResponse])
 async def read_categories(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     db: AsyncSession = Depends(get_db)
 ):
-    return await category_crud.get_multi(db, skip=skip, limit=limit)
+    snap = await catalog_cache.get_snapshot(db)
+    not_modified = conditional_catalog_response(snap, request, response)
+    if not_modified:
+        return not_modified
+    return snap.categories[skip:skip + limit]
 
 @router.get("/{category_id}", response_model=CategoryResponse)
 async def read_category(
@@ -44,7 +54,9 @@ async def update_category(
     category = await category_crud.get(db, id=category_id)
     if not category:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Category not found")
-    return await category_crud.update(db, db_obj=category, obj_in=category_in)
+    category = await category_crud.update(db, db_obj=category, obj_in=category_in)
+    catalog_cache.invalidate()
+    return category
 
 @router.delete("/{category_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_category(
@@ -55,4 +67,5 @@ async def delete_category(
     category = await category_crud.remove(db, id=category_id)
     if not category:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Category not found")
+    catalog_cache.invalidate()
     return {"message": "Category deleted successfully"}
\ No newline at end of file
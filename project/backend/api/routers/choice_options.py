@@ -5,6 +5,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from api.deps import get_db, get_admin_token
 from schemas.schemas import ChoiceOptionCreate, ChoiceOptionUpdate, ChoiceOptionResponse
 from crud.crud_operations import choice_option_crud
+from crud.catalog_cache import catalog_cache
 
 router = APIRouter(prefix="/choice-options", tags=["Choice Options"])
 
@@ -14,7 +15,9 @@ async def create_choice_option(
     db: AsyncSession = Depends(get_db),
     admin_token: str = Depends(get_admin_token) # Admin protected
 ):
-    return await choice_option_crud.create(db, obj_in=choice_option_in)
+    choice_option = await choice_option_crud.create(db, obj_in=choice_option_in)
+    catalog_cache.invalidate()
+    return choice_option
 
 @router.get("/", response_model=List[ChoiceOptionResponse])
 async def read_choice_options(
@@ -22,14 +25,17 @@ async def read_choice_options(
     limit: int = 100,
     db: AsyncSession = Depends(get_db)
 ):
-    return await choice_option_crud.get_multi(db, skip=skip, limit=limit)
+    return await catalog_cache.get_choice_options(db, skip=skip, limit=limit)
 
 @router.get("/{choice_option_id}", response_model=ChoiceOptionResponse)
 async def read_choice_option(
     choice_option_id: int,
     db: AsyncSession = Depends(get_db)
 ):
-    choice_option = await choice_option_crud.get(db, id=choice_option_id)
+    choice_option = await catalog_cache.get_choice_option(db, id=choice_option_id)
+    if not choice_option:
+        # Miss cache -> DB
+        choice_option = await choice_option_crud.get(db, id=choice_option_id)
     if not choice_option:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Choice option not found")
     return choice_option
@@ -44,7 +50,9 @@ async def update_choice_option(
     choice_option = await choice_option_crud.get(db, id=choice_option_id)
     if not choice_option:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Choice option not found")
-    return await choice_option_crud.update(db, db_obj=choice_option, obj_in=choice_option_in)
+    choice_option = await choice_option_crud.update(db, db_obj=choice_option, obj_in=choice_option_in)
+    catalog_cache.invalidate()
+    return choice_option
 
 @router.delete("/{choice_option_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_choice_option(
@@ -55,4 +63,5 @@ async def delete_choice_option(
     choice_option = await choice_option_crud.remove(db, id=choice_option_id)
     if not choice_option:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Choice option not found")
+    catalog_cache.invalidate()
     return {"message": "Choice option deleted successfully"}
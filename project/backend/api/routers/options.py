@@ -1,5 +1,5 @@
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
@@ -7,6 +7,8 @@ from sqlalchemy.orm import selectinload
 from api.deps import get_db, get_admin_token
 from schemas.schemas import OptionCreate, OptionUpdate, OptionResponse
 from crud.crud_operations import option_crud, product_crud
+from crud.catalog_cache import catalog_cache
+from api.http_cache import conditional_catalog_response
 
 router = APIRouter(prefix="/options", tags=["Options"])
 
@@ -18,22 +20,33 @@ async def create_option(
     db: AsyncSession = Depends(get_db),
     admin_token: str = Depends(get_admin_token) # Admin protected
 ):
-    return await option_crud.create(db, obj_in=option_in)
+    option = await option_crud.create(db, obj_in=option_in)
+    catalog_cache.invalidate()
+    return option
 
 @router.get("/", response_model=List[OptionResponse])
 async def read_options(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     db: AsyncSession = Depends(get_db)
 ):
-    return await option_crud.get_multi_with_relations(db, skip=skip, limit=limit)
+    snap = await catalog_cache.get_snapshot(db)
+    not_modified = conditional_catalog_response(snap, request, response)
+    if not_modified:
+        return not_modified
+    return snap.options[skip:skip + limit]
 
 @router.get("/{option_id}", response_model=OptionResponse)
 async def read_option(
     option_id: int,
     db: AsyncSession = Depends(get_db)
 ):
-    option = await option_crud.get_with_relations(db, id=option_id)
+    option = await catalog_cache.get_option(db, id=option_id)
+    if not option:
+        # Miss cache -> DB
+        option = await option_crud.get_with_relations(db, id=option_id)
     if not option:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Option not found")
     return option
@@ -48,7 +61,9 @@ async def update_option(
     option = await option_crud.get(db, id=option_id)
     if not option:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Option not found")
-    return await option_crud.update(db, db_obj=option, obj_in=option_in)
+    option = await option_crud.update(db, db_obj=option, obj_in=option_in)
+    catalog_cache.invalidate()
+    return option
 
 @router.delete("/{option_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_option(
@@ -59,6 +74,7 @@ async def delete_option(
     option = await option_crud.remove(db, id=option_id)
     if not option:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Option not found")
+    catalog_cache.invalidate()
     return {"message": "Option deleted successfully"}
 
 # ----------- ROUTE PIVOT : lier Option <-> Produit ---------------
@@ -82,6 +98,7 @@ async def link_option_to_product(
         return  # Déjà lié, ne fait rien
     product.options.append(option)
     await db.commit()
+    catalog_cache.invalidate()
     return {"message": "Option linked to Product"}
 @router.delete("/{option_id}/products/{product_id}", status_code=204)
 async def unlink_option_from_product(
@@ -98,4 +115,5 @@ async def unlink_option_from_product(
     if option in product.options:
         product.options.remove(option)
         await db.commit()
+        catalog_cache.invalidate()
     return {"message": "Option unlinked from Product"}
@@ -1,88 +1,159 @@
 from typing import List, Optional, Dict, Any
+from datetime import datetime
 from decimal import Decimal
-import json
-import base64
-from crud.crud_operations import geocode_address, calculate_distance
+import asyncio
+from crud.crud_operations import quote_delivery
+from core.delivery import delivery_zone
 
-from fastapi import APIRouter, Depends, HTTPException, status, Body
-from fastapi.encoders import jsonable_encoder
+from fastapi import APIRouter, Depends, HTTPException, status, Body, Request, Response, Query, Header
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from sqlalchemy.orm import selectinload
-
-from api.deps import get_db, get_admin_token
-from schemas.schemas import OrderCreate, OrderUpdate, OrderResponse, OrderItemResponse
-from crud.crud_operations import order_crud
-from models.models import (
-    OrderStatus, Order, OrderItem, DeliveryMode, PaymentMode, Product, ChoiceOption, Option
+
+from api.deps import get_db, get_admin_token, get_admin_token_or_query
+from schemas.schemas import (
+    OrderCreate, OrderUpdate, OrderResponse,
+    DeliveryQuoteRequest, DeliveryQuoteResponse,
 )
-import stripe
+from crud.crud_operations import order_crud, map_order_to_response, order_to_dict, encode_order_cursor
+from core.fast_json import FastJSONResponse
+from crud.analytics import apply_status_rollup
+from crud.idempotency import idempotency_store, request_fingerprint, SCOPE_ORDER_CREATE, STATE_DONE
+from crud.payment_orders import payment_order_service
+from core.events import order_events, format_sse, publish_order_status
+from models.models import OrderStatus, DeliveryMode, PaymentMode
 from core.config import settings
+from core.payment_gateway import payment_gateway, PaymentGatewayError
 
-# Pricing centralisé (tacos/menus tacos + menu combo)
-from core.pricing import compute_unit_price_for_item
+# Résolution panier + pricing centralisé (tacos/menus tacos + menu combo)
+from crud.cart_resolver import resolve_cart
 
 router = APIRouter(prefix="/orders", tags=["Orders"])
-stripe.api_key = settings.STRIPE_SECRET_KEY
-
-
-def map_order_to_response(order: Order) -> OrderResponse:
-    items: List[OrderItemResponse] = []
-    for it in order.order_items:
-        snaps = getattr(it, "_choice_snapshots", None) or []
-        items.append(
-            OrderItemResponse(
-                id=it.id,
-                order_id=it.order_id,
-                product_id=it.product_id,
-                product_name_snapshot=it.product_name_snapshot,
-                base_price_snapshot=it.base_price_snapshot,
-                quantity=it.quantity,
-                item_total=it.item_total,
-                created_at=it.created_at,
-                updated_at=it.updated_at,
-                choice_options=snaps,
-                product=None,
-            )
+
+
+# ---------------- CASH ----------------
+def _replay_idempotent(record, request_hash: Optional[str]) -> Response:
+    if record.request_hash and request_hash and record.request_hash != request_hash:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Idempotency-Key déjà utilisée pour une autre commande.",
         )
-    return OrderResponse(
-        id=order.id,
-        name=order.name,
-        address=order.address,
-        phone=order.phone,
-        delivery_mode=order.delivery_mode,
-        payment_mode=order.payment_mode,
-        fee=order.fee,
-        latitude=None,
-        longitude=None,
-        total=order.total,
-        status=order.status,
-        created_at=order.created_at,
-        updated_at=order.updated_at,
-        order_items=items,
+    if record.state != STATE_DONE or record.response_body is None:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Commande déjà en cours de création.")
+    return Response(
+        content=record.response_body,
+        status_code=record.status_code or status.HTTP_201_CREATED,
+        media_type="application/json",
+        headers={"Idempotent-Replayed": "true"},
     )
 
 
-# ---------------- CASH ----------------
 @router.post("/", response_model=OrderResponse, status_code=status.HTTP_201_CREATED)
-async def create_order(order_in: OrderCreate, db: AsyncSession = Depends(get_db)):
+async def create_order(
+    order_in: OrderCreate,
+    db: AsyncSession = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
+):
     payload = order_in.model_copy(update={"delivery_mode": DeliveryMode.delivery})
-    db_order_full = await order_crud.create(db, obj_in=payload)
-    return map_order_to_response(db_order_full)
+    if not idempotency_key:
+        db_order_full = await order_crud.create(db, obj_in=payload)
+        return map_order_to_response(db_order_full)
+
+    # Retry / double-tap : même clé -> même réponse, sans recréer la commande
+    fingerprint = request_fingerprint(payload)
+    existing = await idempotency_store.claim(db, SCOPE_ORDER_CREATE, idempotency_key, fingerprint)
+    if existing is not None:
+        return _replay_idempotent(existing, fingerprint)
+
+    try:
+        db_order_full = await order_crud.create(db, obj_in=payload, idempotency_key=idempotency_key)
+    except Exception:
+        # Sans effet si la commande a été commitée (clé liée) : la clé reste prise
+        await idempotency_store.release(db, SCOPE_ORDER_CREATE, idempotency_key)
+        raise
+
+    response = map_order_to_response(db_order_full)
+    await idempotency_store.complete(
+        db, SCOPE_ORDER_CREATE, idempotency_key,
+        order_id=db_order_full.id,
+        status_code=status.HTTP_201_CREATED,
+        response_body=response.model_dump_json(),
+    )
+    return response
 
 
 @router.get("/", response_model=List[OrderResponse])
 async def read_orders(
+    response: Response,
     skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(100, ge=1, le=500),
     status: Optional[OrderStatus] = None,
+    payment_mode: Optional[PaymentMode] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    cursor: Optional[str] = None,
     db: AsyncSession = Depends(get_db),
     admin_token: str = Depends(get_admin_token),
 ):
-    orders = await order_crud.get_multi_with_relations(db, skip=skip, limit=limit, status=status)
+    """
+    Plus récentes d'abord. Pagination keyset : renvoyer la valeur de l'en-tête
+    X-Next-Cursor dans `cursor` pour la page suivante (absent = dernière page).
+    """
+    orders = await order_crud.get_multi_with_relations(
+        db,
+        skip=skip,
+        limit=limit,
+        status=status,
+        payment_mode=payment_mode,
+        created_from=created_from,
+        created_to=created_to,
+        cursor=cursor,
+    )
+    next_cursor = encode_order_cursor(orders[-1]) if len(orders) == limit else None
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    if settings.FAST_JSON_RESPONSES:
+        # Réponse renvoyée telle quelle : `response.headers` n'y est pas recopié
+        headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+        return FastJSONResponse([order_to_dict(o) for o in orders], headers=headers)
     return [map_order_to_response(o) for o in orders]
 
 
+# ---------------- FLUX TEMPS RÉEL (SSE) ----------------
+SSE_KEEPALIVE_SECONDS = 15
+
+
+@router.get("/stream")
+async def stream_orders(
+    request: Request,
+    admin_token: str = Depends(get_admin_token_or_query),
+):
+    """
+    Server-Sent Events : 'order.created' (commande complète, même JSON que GET)
+    et 'order.status' ({id, status}). Remplace le polling de GET /orders/.
+    """
+    async def event_stream():
+        queue = order_events.subscribe()
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                if await request.is_disconnected():
+                    break
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield format_sse(event)
+        finally:
+            order_events.unsubscribe(queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/{order_id}", response_model=OrderResponse)
 async def read_order(
     order_id: int,
@@ -102,164 +173,84 @@ async def update_order_status(
     db: AsyncSession = Depends(get_db),
     admin_token: str = Depends(get_admin_token),
 ):
-    order = await order_crud.get(db, id=order_id)
+    # Ligne verrouillée : deux annulations simultanées ne retirent pas deux fois la commande des rollups
+    order = await order_crud.get_for_update(db, id=order_id)
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     if order_in.status:
+        # Annulation / ré-activation -> rollups analytics (même transaction)
+        await apply_status_rollup(db, order, order.status, order_in.status)
         order.status = order_in.status
     await db.commit()
     await db.refresh(order)
+    if order_in.status:
+        publish_order_status(order.id, order.status)
     full_order = await order_crud.get_with_relations(db, id=order_id)
     return map_order_to_response(full_order)
 
 
-# ---------------- CARD: create intent ONLY (no DB order) ----------------
-def _encode_order_to_metadata_chunks(payload: Dict[str, Any], chunk_size: int = 495) -> Dict[str, str]:
-    """
-    Stripe metadata value limit ≈ 500 chars. On encode en base64 et on segmente.
-    """
-    raw = json.dumps(payload, separators=(",", ":"))
-    b64 = base64.b64encode(raw.encode("utf-8")).decode("ascii")
-    parts = [b64[i:i+chunk_size] for i in range(0, len(b64), chunk_size)]
-    md = {"order_created": "0", "order_parts": str(len(parts))}
-    for idx, part in enumerate(parts):
-        md[f"order_data_b64_{idx}"] = part
-    return md
-
-
-def _decode_order_from_metadata(md: Dict[str, Any]) -> Dict[str, Any]:
-    """
-    Reconstitue l'OrderCreate à partir des segments.
-    Supporte aussi l'ancien 'order_data' si présent et valide.
-    """
-    single = md.get("order_data")
-    if single:
-        try:
-            return json.loads(single)
-        except Exception:
-            pass
-
-    n_parts = int(md.get("order_parts") or 0)
-    if n_parts <= 0:
-        raise ValueError("Aucune donnée de commande dans la metadata.")
-    buf = []
-    for i in range(n_parts):
-        key = f"order_data_b64_{i}"
-        part = md.get(key)
-        if not part:
-            raise ValueError(f"Métadonnée manquante: {key}")
-        buf.append(part)
-    b64 = "".join(buf)
-    raw = base64.b64decode(b64.encode("ascii")).decode("utf-8")
-    return json.loads(raw)
+# ---------------- FRAIS DE LIVRAISON (devis, sans commande) ----------------
+@router.post("/delivery-quote", response_model=DeliveryQuoteResponse)
+async def delivery_quote(quote_in: DeliveryQuoteRequest):
+    if not (quote_in.latitude and quote_in.longitude) and not (quote_in.address or "").strip():
+        raise HTTPException(status_code=400, detail="Adresse ou coordonnées requises.")
+    try:
+        quote = await quote_delivery(quote_in.address or "", quote_in.latitude, quote_in.longitude)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Adresse invalide ou introuvable.")
+    return DeliveryQuoteResponse(
+        distance_km=round(quote.distance_km, 3),
+        fee=quote.fee,
+        in_zone=quote.in_zone,
+        max_km=delivery_zone.max_km,
+    )
 
 
+# ---------------- CARD: create intent ONLY (no DB order) ----------------
 @router.post("/stripe-intent")
 async def create_stripe_intent(order_in: OrderCreate, db: AsyncSession = Depends(get_db)):
     """
     - Calcule total au serveur (pricing centralisé)
     - Vérifie la zone de livraison et calcule les frais (géofencing)
-    - Crée PaymentIntent avec metadata CHUNKÉE (aucune création de commande ici)
+    - Crée PaymentIntent avec la commande encodée en metadata (aucune création de commande ici)
     """
     safe_payload = order_in.model_copy(update={
         "delivery_mode": DeliveryMode.delivery,
         "payment_mode": PaymentMode.cb,
     })
 
-    # ---------- GÉO-FENCING & FRAIS (identique au CRUD) ----------
-    radius_km = float(getattr(settings, "DELIVERY_MAX_KM", 8.0))
-
+    # ---------- GÉO-FENCING & FRAIS (même moteur que le CRUD) ----------
     try:
-        if safe_payload.latitude and safe_payload.longitude:
-            distance_km = calculate_distance(
-                settings.RESTAURANT_LAT, settings.RESTAURANT_LNG,
-                float(safe_payload.latitude), float(safe_payload.longitude),
-            )
-        else:
-            lat, lon = await geocode_address(safe_payload.address)
-            distance_km = calculate_distance(settings.RESTAURANT_LAT, settings.RESTAURANT_LNG, lat, lon)
+        quote = await quote_delivery(safe_payload.address, safe_payload.latitude, safe_payload.longitude)
     except Exception:
         raise HTTPException(status_code=400, detail="Adresse invalide ou introuvable.")
 
-    if distance_km > radius_km:
+    if not quote.in_zone:
         raise HTTPException(
             status_code=400,
-            detail=f"Adresse hors zone de livraison ({distance_km:.1f} km > {radius_km:.1f} km)."
+            detail=f"Adresse hors zone de livraison ({quote.distance_km:.1f} km > {delivery_zone.max_km:.1f} km)."
         )
 
-    fee = (
-        settings.DELIVERY_BASE_FEE
-        + settings.DELIVERY_PER_KM_FEE * Decimal(str(distance_km))
-    ).quantize(Decimal("0.01"))
+    fee = quote.fee
 
     # On met aussi le fee dans la payload encodée (cohérence avec /capture)
     safe_payload = safe_payload.model_copy(update={"fee": fee})
     # --------------------------------------------------------------
 
-    # Chargement produits / options / choice options
-    product_ids = [i.product_id for i in safe_payload.items]
-    co_ids = [ch.choice_option_id for i in safe_payload.items if i.choices for ch in i.choices]
-    opt_ids = [ch.option_id for i in safe_payload.items if i.choices for ch in i.choices]
-
-    products = {}
-    if product_ids:
-        res = await db.execute(select(Product).where(Product.id.in_(product_ids)))
-        products = {p.id: p for p in res.scalars().all()}
-
-    co_map = {}
-    if co_ids:
-        res = await db.execute(select(ChoiceOption).where(ChoiceOption.id.in_(co_ids)))
-        co_map = {c.id: c for c in res.scalars().all()}
-
-    opt_map = {}
-    if opt_ids:
-        res = await db.execute(select(Option).where(Option.id.in_(opt_ids)))
-        opt_map = {o.id: o for o in res.scalars().all()}
-
-    # Map "nom de choix burger" -> Product (avec catégorie) pour Menu Combo
-    choice_names = set()
-    for it in safe_payload.items:
-        if it.choices:
-            for ch in it.choices:
-                co = co_map.get(ch.choice_option_id)
-                if co and getattr(co, "name", None):
-                    choice_names.add(co.name.strip())
-
-    products_by_name: Dict[str, Product] = {}
-    if choice_names:
-        res = await db.execute(
-            select(Product)
-            .options(selectinload(Product.category))
-            .where(Product.name.in_(list(choice_names)))
-        )
-        products_by_name = {(p.name or "").strip().lower(): p for p in res.scalars().all()}
-
-    total = Decimal("0.00")
-    for i in safe_payload.items:
-        p = products.get(i.product_id)
-        if not p:
-            raise HTTPException(status_code=400, detail=f"Produit {i.product_id} introuvable.")
-        # Pricing centralisé (tacos/menu tacos + menu combo)
-        unit = compute_unit_price_for_item(p, i.choices, opt_map, co_map, products_by_name)
-        qty = int(i.quantity or 1)
-        line_total = unit * qty
-        total += line_total
+    # Produits / choix / prix unitaires (même résolveur que CRUDOrder.create)
+    cart = await resolve_cart(db, safe_payload.items)
+    total = cart.items_total
 
     # Utilise le fee calculé ci-dessus
     grand_total = (total + fee).quantize(Decimal("0.01"))
     amount_cents = max(50, int(grand_total * 100))
 
-    # CHUNKED metadata
-    md = _encode_order_to_metadata_chunks(jsonable_encoder(safe_payload))
+    # Metadata compacte (ids uniquement) ou brouillon DB, cf. core/order_codec.py
+    md = await payment_order_service.encode_metadata(db, safe_payload)
 
     try:
-        intent = stripe.PaymentIntent.create(
-            amount=amount_cents,
-            currency="eur",
-            automatic_payment_methods={"enabled": True},
-            metadata=md,
-        )
-    except stripe.error.StripeError as e:
+        intent = await payment_gateway.create_payment_intent(amount=amount_cents, currency="eur", metadata=md)
+    except PaymentGatewayError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
     return {
@@ -277,73 +268,56 @@ async def capture_payment(
 ):
     """
     Body: { "payment_intent_id": "pi_..." }
-    Si PI payé et commande pas encore créée → crée la commande, marque metadata (order_created=1, order_id=...).
+    Si PI payé et commande pas encore créée → crée la commande (une seule par PI, cf. crud/payment_orders.py).
     Met aussi la commande en 'preparing' si le paiement est 'succeeded' (fallback si le webhook n'a pas encore tourné).
     """
     pi_id = str(payload.get("payment_intent_id") or "").strip()
     if not pi_id:
         raise HTTPException(status_code=400, detail="payment_intent_id requis.")
 
+    # Déjà matérialisée (par /capture ou le webhook) ? -> lecture indexée, pas d'appel Stripe
+    existing = await payment_order_service.get(db, pi_id)
+    if existing is not None:
+        # Seul cas où Stripe est réinterrogé : CB encore 'pending' (webhook pas encore reçu)
+        if existing.payment_mode == PaymentMode.cb and existing.status == OrderStatus.pending:
+            try:
+                pi = await payment_gateway.retrieve_payment_intent(pi_id)
+                await payment_order_service.promote_if_paid(db, existing, pi.status == "succeeded")
+            except PaymentGatewayError:
+                pass
+        return map_order_to_response(existing)
+
     try:
-        pi = stripe.PaymentIntent.retrieve(pi_id)
-    except stripe.error.StripeError as e:
+        pi = await payment_gateway.retrieve_payment_intent(pi_id)
+    except PaymentGatewayError as e:
         raise HTTPException(status_code=400, detail=f"Stripe error: {e}")
 
-    md = dict(pi.metadata or {})
+    md = pi.metadata
     if pi.status not in ("succeeded", "processing", "requires_capture"):
         raise HTTPException(status_code=400, detail=f"Paiement non finalisé: {pi.status}")
 
-    # Déjà créée ?
+    # Commandes antérieures à orders.payment_intent_id : order_id marqué dans la metadata
+    db_order_full = None
     if md.get("order_created") == "1" and md.get("order_id"):
         try:
-            existing_id = int(md["order_id"])
+            db_order_full = await order_crud.get_with_relations(db, id=int(md["order_id"]))
         except (TypeError, ValueError):
-            existing_id = None
-
-        if existing_id:
-            existing = await order_crud.get_with_relations(db, id=existing_id)
-            if existing:
-                # Fallback: si déjà payé, passer en 'preparing'
-                if (
-                    pi.status == "succeeded"
-                    and existing.payment_mode == PaymentMode.cb
-                    and existing.status == OrderStatus.pending
-                ):
-                    existing.status = OrderStatus.preparing
-                    await db.commit()
-                    await db.refresh(existing)
-                return map_order_to_response(existing)
-
-    # Reconstruire payload depuis metadata segmentée
-    try:
-        data = _decode_order_from_metadata(md)
-        order_in = OrderCreate(**data)
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"order_data invalide dans metadata: {e}")
+            db_order_full = None
+        if db_order_full is not None:
+            await payment_order_service.attach(db, db_order_full, pi_id)
 
-    # Créer la commande maintenant
-    db_order_full = await order_crud.create(db, obj_in=order_in)
+    if db_order_full is None:
+        # Reconstruire la commande depuis la metadata (compacte, brouillon ou historique)
+        try:
+            order_in = await payment_order_service.decode_metadata(db, md)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"order_data invalide dans metadata: {e}")
 
-    # Fallback : si déjà payé, passer en 'preparing'
-    try:
-        if (
-            pi.status == "succeeded"
-            and db_order_full.payment_mode == PaymentMode.cb
-            and db_order_full.status == OrderStatus.pending
-        ):
-            db_order_full.status = OrderStatus.preparing
-            await db.commit()
-            await db.refresh(db_order_full)
-    except Exception:
-        pass
+        db_order_full, _ = await payment_order_service.materialize(db, pi_id, order_in)
 
-    # Mettre à jour la metadata pour idempotence
     try:
-        stripe.PaymentIntent.modify(
-            pi_id,
-            metadata={**md, "order_created": "1", "order_id": str(db_order_full.id)},
-        )
-    except stripe.error.StripeError:
+        await payment_order_service.promote_if_paid(db, db_order_full, pi.status == "succeeded")
+    except Exception:
         pass
 
     return map_order_to_response(db_order_full)
@@ -1,10 +1,14 @@
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from api.deps import get_db, get_admin_token
 from schemas.schemas import ProductCreate, ProductUpdate, ProductResponse
 from crud.crud_operations import product_crud
+from crud.catalog_cache import catalog_cache
+from api.http_cache import conditional_catalog_response, catalog_cache_headers
+from core.config import settings
+from core.fast_json import FastJSONResponse
 
 router = APIRouter(prefix="/products", tags=["Products"])
 
@@ -14,22 +18,42 @@ async def create_product(
     db: AsyncSession = Depends(get_db),
     admin_token: str = Depends(get_admin_token) # Admin protected
 ):
-    return await product_crud.create(db, obj_in=product_in)
+    product = await product_crud.create(db, obj_in=product_in)
+    catalog_cache.invalidate()
+    return product
 
 @router.get("/", response_model=List[ProductResponse])
 async def read_products(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     db: AsyncSession = Depends(get_db)
 ):
-    return await product_crud.get_multi_with_relations(db, skip=skip, limit=limit)
+    snap = await catalog_cache.get_snapshot(db)
+    not_modified = conditional_catalog_response(snap, request, response)
+    if not_modified:
+        return not_modified
+    if settings.FAST_JSON_RESPONSES:
+        return FastJSONResponse(snap.products_json(skip, limit), headers=catalog_cache_headers(snap, request))
+    return snap.products[skip:skip + limit]
 
 @router.get("/{product_id}", response_model=ProductResponse)
 async def read_product(
     product_id: int,
+    request: Request,
+    response: Response,
     db: AsyncSession = Depends(get_db)
 ):
-    product = await product_crud.get_with_relations(db, id=product_id)
+    snap = await catalog_cache.get_snapshot(db)
+    product = snap.products_by_id.get(product_id)
+    if product:
+        not_modified = conditional_catalog_response(snap, request, response)
+        if not_modified:
+            return not_modified
+    else:
+        # Miss cache (ex: créé sur un autre worker) -> DB, sans validateurs HTTP
+        product = await product_crud.get_with_relations(db, id=product_id)
     if not product:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Product not found")
     return product
@@ -44,7 +68,9 @@ async def update_product(
     product = await product_crud.get(db, id=product_id)
     if not product:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Product not found")
-    return await product_crud.update(db, db_obj=product, obj_in=product_in)
+    product = await product_crud.update(db, db_obj=product, obj_in=product_in)
+    catalog_cache.invalidate()
+    return product
 
 @router.delete("/{product_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_product(
@@ -55,4 +81,5 @@ async def delete_product(
     product = await product_crud.remove(db, id=product_id)
     if not product:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Product not found")
+    catalog_cache.invalidate()
     return {"message": "Product deleted successfully"}
\ No newline at end of file
@@ -0,0 +1,55 @@
+from typing import Any, Dict, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+
+from api.deps import get_admin_token
+from schemas.schemas import SQLProfilerConfigUpdate
+from core.sql_profiler import sql_profiler
+
+router = APIRouter(prefix="/sql-profiler", tags=["SQL Profiler"])
+
+# NB : état propre au process (worker uvicorn) qui répond
+
+
+@router.get("/")
+async def read_sql_profiler(admin_token: str = Depends(get_admin_token)) -> Dict[str, Any]:
+    return sql_profiler.stats()
+
+
+@router.patch("/")
+async def update_sql_profiler(
+    config_in: SQLProfilerConfigUpdate,
+    admin_token: str = Depends(get_admin_token),
+) -> Dict[str, Any]:
+    """Réglage à chaud : seuil des requêtes lentes, échantillonnage, routes toujours tracées."""
+    sql_profiler.configure(**config_in.model_dump(exclude_unset=True))
+    return sql_profiler.config()
+
+
+@router.get("/slow-queries")
+async def read_slow_queries(
+    limit: int = Query(50, ge=1, le=500),
+    admin_token: str = Depends(get_admin_token),
+) -> List[Dict[str, Any]]:
+    return sql_profiler.slow_queries(limit=limit)
+
+
+@router.get("/traces")
+async def read_traces(
+    route: Optional[str] = Query(None, description='gabarit de route, ex. "/api/orders/{order_id}"'),
+    limit: int = Query(50, ge=1, le=500),
+    admin_token: str = Depends(get_admin_token),
+) -> List[Dict[str, Any]]:
+    return sql_profiler.traces(route=route, limit=limit)
+
+
+@router.get("/traces/{trace_id}")
+async def read_trace(trace_id: int, admin_token: str = Depends(get_admin_token)) -> Dict[str, Any]:
+    trace = sql_profiler.get_trace(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Trace not found")
+    return trace
+
+
+@router.delete("/", status_code=status.HTTP_204_NO_CONTENT)
+async def clear_sql_profiler(admin_token: str = Depends(get_admin_token)):
+    sql_profiler.clear()
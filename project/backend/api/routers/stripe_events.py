@@ -0,0 +1,33 @@
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.deps import get_db, get_admin_token
+from schemas.schemas import StripeEventResponse
+from crud.stripe_events import list_events, replay_event, stripe_event_consumer
+
+router = APIRouter(prefix="/stripe-events", tags=["Stripe Events"])
+
+
+@router.get("/", response_model=List[StripeEventResponse])
+async def read_stripe_events(
+    status_filter: Optional[str] = Query(None, alias="status", description="pending | processing | done | ignored | dead"),
+    limit: int = Query(50, ge=1, le=500),
+    db: AsyncSession = Depends(get_db),
+    admin_token: str = Depends(get_admin_token),
+):
+    return await list_events(db, status=status_filter, limit=limit)
+
+
+@router.post("/{event_id}/replay", response_model=StripeEventResponse)
+async def replay_stripe_event(
+    event_id: str,
+    db: AsyncSession = Depends(get_db),
+    admin_token: str = Depends(get_admin_token),
+):
+    """Remet un évènement stocké (ex. 'dead') dans la file du consommateur."""
+    event = await replay_event(db, event_id)
+    if event is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Stripe event not found")
+    stripe_event_consumer.notify()
+    return event
@@ -0,0 +1,77 @@
+"""
+Worker de fond générique (un par process, démarré / arrêté dans main.py).
+
+La sous-classe implémente drain_once() (un lot, retourne le nombre
+d'éléments traités). La boucle enchaîne les lots tant qu'il y a du retard,
+sinon attend notify() ou poll_interval. retry_delay() : backoff exponentiel
+plafonné, avec un peu de jitter.
+"""
+import asyncio
+import logging
+import random
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PollingWorker:
+    name = "worker"
+
+    def __init__(
+        self,
+        poll_interval: float = 5.0,
+        batch_size: int = 20,
+        backoff: float = 5.0,
+        max_backoff: float = 600.0,
+    ):
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._task: Optional[asyncio.Task] = None
+        self._wake = asyncio.Event()
+
+    async def drain_once(self) -> int:
+        raise NotImplementedError
+
+    def retry_delay(self, attempts: int) -> float:
+        delay = min(self.backoff * (2 ** (attempts - 1)), self.max_backoff)
+        return delay + random.uniform(0, delay * 0.1)
+
+    def notify(self) -> None:
+        """Nouvel élément commité : réveille le worker sans attendre la scrutation."""
+        self._wake.set()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                processed = await self.drain_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("%s: échec du lot", self.name)
+                processed = 0
+            if processed >= self.batch_size:
+                continue  # encore du retard à rattraper
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,261 @@
+"""
+Compression des réponses (middleware ASGI).
+
+- brotli (si le module est installé) ou gzip selon Accept-Encoding
+- uniquement les types de contenu listés (JSON, HTML, texte...) et au-delà
+  de `minimum_size` octets ; le flux SSE (text/event-stream) n'est jamais
+  compressé
+- réponse déjà encodée (ex. /api/menu, pré-compressé) : laissée telle quelle
+- réponse en plusieurs morceaux : compression en flux
+
+Cache des corps compressés : une réponse portant un ETag fort et un
+Cache-Control "public" (lectures du catalogue) est compressée une seule fois
+par (ETag, encodage) ; les requêtes suivantes réutilisent les octets.
+L'ETag de la variante compressée reçoit le suffixe "+gzip" / "+br" ; le
+suffixe de l'encodage négocié est retiré de If-None-Match avant d'atteindre
+l'application, pour que les 304 continuent de fonctionner, et le 304 renvoie
+le même ETag suffixé que le 200 (un client qui revalide une autre variante
+reçoit un 200).
+"""
+import gzip
+import zlib
+from collections import OrderedDict
+from typing import Iterable, Optional, Set, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:  # dépendance optionnelle
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+DEFAULT_CONTENT_TYPES = (
+    "application/json",
+    "text/html",
+    "text/plain",
+    "text/css",
+    "text/javascript",
+    "application/javascript",
+    "image/svg+xml",
+)
+
+_SUFFIXES = {"gzip": "+gzip", "br": "+br"}
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    accepted = set()
+    for part in accept_encoding.split(","):
+        name, *params = [p.strip() for p in part.split(";")]
+        q = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if q > 0:
+            accepted.add(name.lower())
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def _strip_variant(if_none_match: str, suffix: str) -> Tuple[str, Set[str]]:
+    """Retire `suffix` des ETag de If-None-Match ; renvoie aussi les ETag ainsi dé-suffixés."""
+    tags = []
+    stripped = set()
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag.endswith(suffix + '"'):
+            tag = tag[: -len(suffix) - 1] + '"'
+            stripped.add(tag)
+        tags.append(tag)
+    return ", ".join(tags), stripped
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        content_types: Iterable[str] = DEFAULT_CONTENT_TYPES,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        cache_entries: int = 64,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.content_types = tuple(content_types)
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.cache_entries = cache_entries
+        self._cache: "OrderedDict[Tuple[str, str], bytes]" = OrderedDict()
+        # Métriques
+        self.compressed_total = 0
+        self.cache_hits = 0
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        encoding = choose_encoding(headers.get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        revalidated: Set[str] = set()
+        if "if-none-match" in headers:
+            if_none_match, revalidated = _strip_variant(headers["if-none-match"], _SUFFIXES[encoding])
+            scope = dict(scope)
+            scope["headers"] = [
+                (k, if_none_match.encode("latin-1") if k == b"if-none-match" else v)
+                for k, v in scope["headers"]
+            ]
+        responder = _CompressingResponder(self, encoding, send, revalidated)
+        await self.app(scope, receive, responder)
+
+    # --- compression / cache ---
+    def compress(self, body: bytes, encoding: str) -> bytes:
+        self.compressed_total += 1
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+
+    def cached(self, key: Tuple[str, str]) -> Optional[bytes]:
+        body = self._cache.get(key)
+        if body is not None:
+            self._cache.move_to_end(key)
+            self.cache_hits += 1
+        return body
+
+    def store(self, key: Tuple[str, str], body: bytes) -> None:
+        self._cache[key] = body
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_entries:
+            self._cache.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {
+            "compressed_total": self.compressed_total,
+            "cache_hits": self.cache_hits,
+            "cache_entries": len(self._cache),
+            "brotli": brotli is not None,
+        }
+
+
+class _StreamCompressor:
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        if encoding == "br":
+            self._br = brotli.Compressor(quality=brotli_quality)
+            self._gz = None
+        else:
+            self._br = None
+            self._gz = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def chunk(self, data: bytes) -> bytes:
+        if self._br is not None:
+            return self._br.process(data) + self._br.flush()
+        return self._gz.compress(data) + self._gz.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self._br is not None:
+            return self._br.finish()
+        return self._gz.flush(zlib.Z_FINISH)
+
+
+class _CompressingResponder:
+    def __init__(self, mw: CompressionMiddleware, encoding: str, send: Send, revalidated: Set[str]):
+        self.mw = mw
+        self.encoding = encoding
+        self.send = send
+        # ETag (sans suffixe) dont le client détient la variante compressée
+        self.revalidated = revalidated
+        self.start: Optional[Message] = None
+        self.passthrough = False
+        self.stream: Optional[_StreamCompressor] = None
+
+    def _eligible(self, message: Message) -> bool:
+        if message["status"] < 200 or message["status"] in (204, 304):
+            return False
+        headers = Headers(raw=message["headers"])
+        if "content-encoding" in headers:
+            return False
+        content_type = headers.get("content-type", "").split(";")[0].strip().lower()
+        return content_type in self.mw.content_types
+
+    def _cache_key(self, headers: MutableHeaders) -> Optional[Tuple[str, str]]:
+        etag = headers.get("etag", "")
+        if not etag.startswith('"') or "public" not in headers.get("cache-control", ""):
+            return None
+        return etag, self.encoding
+
+    def _variant_not_modified(self, message: Message) -> None:
+        """304 : même ETag suffixé que le 200 de la variante détenue par le client."""
+        headers = MutableHeaders(scope=message)
+        etag = headers.get("etag")
+        if etag in self.revalidated:
+            headers["ETag"] = etag[:-1] + _SUFFIXES[self.encoding] + '"'
+            headers.add_vary_header("Accept-Encoding")
+
+    def _rewrite_headers(self, headers: MutableHeaders, length: Optional[int]) -> None:
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        etag = headers.get("etag")
+        if etag and etag.endswith('"'):
+            headers["ETag"] = etag[:-1] + _SUFFIXES[self.encoding] + '"'
+        if length is None:
+            del headers["content-length"]
+        else:
+            headers["Content-Length"] = str(length)
+
+    async def __call__(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.start = message
+            self.passthrough = not self._eligible(message)
+            if self.passthrough:
+                if message["status"] == 304:
+                    self._variant_not_modified(message)
+                await self.send(message)
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        headers = MutableHeaders(scope=self.start)
+
+        if self.stream is None and not more_body:
+            # Corps complet en un seul message (cas des réponses JSON)
+            full = body
+            if len(full) < self.mw.minimum_size:
+                headers.add_vary_header("Accept-Encoding")
+                await self.send(self.start)
+                await self.send({"type": "http.response.body", "body": full})
+                return
+            key = self._cache_key(headers)
+            compressed = self.mw.cached(key) if key else None
+            if compressed is None:
+                compressed = self.mw.compress(full, self.encoding)
+                if key:
+                    self.mw.store(key, compressed)
+            self._rewrite_headers(headers, len(compressed))
+            await self.send(self.start)
+            await self.send({"type": "http.response.body", "body": compressed})
+            return
+
+        # Réponse en plusieurs morceaux : compression en flux
+        if self.stream is None:
+            self.stream = _StreamCompressor(self.encoding, self.mw.gzip_level, self.mw.brotli_quality)
+            self._rewrite_headers(headers, None)
+            await self.send(self.start)
+            self.mw.compressed_total += 1
+        out = self.stream.chunk(body)
+        if not more_body:
+            out += self.stream.finish()
+        await self.send({"type": "http.response.body", "body": out, "more_body": more_body})
@@ -1,6 +1,6 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from decimal import Decimal
-from typing import Optional  # <-- ajout
+from typing import List, Optional, Union, Literal  # <-- ajout
 
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
@@ -8,17 +8,88 @@ class Settings(BaseSettings):
     DATABASE_URL: str
     ADMIN_TOKEN: str
 
+    # Engine SQLAlchemy / pool asyncpg
+    DB_ECHO: Union[bool, Literal["debug"]] = False   # True = log SQL, "debug" = + lignes
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800                      # secondes, -1 = jamais
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_CACHE_SIZE: int = 100               # cache asyncpg, 0 derrière pgbouncer (transaction)
+
     RESTAURANT_LAT: float = 43.606206
     RESTAURANT_LNG: float = 3.870316
     DELIVERY_BASE_FEE: Decimal = Decimal("2.00")
     DELIVERY_PER_KM_FEE: Decimal = Decimal("1.00")
     DELIVERY_MAX_KM: float = 8.0
 
+    # Cache catalogue en mémoire (0 = pas d'expiration, invalidé par les écritures admin)
+    CATALOG_CACHE_TTL_SECONDS: float = 300.0
+    # Pricing : relecture de catalog_state.version au plus toutes les N s par snapshot (0 = à chaque panier)
+    CATALOG_VERSION_CHECK_SECONDS: float = 1.0
+    # Cache HTTP des lectures catalogue (ETag / Last-Modified + Cache-Control public)
+    CATALOG_HTTP_MAX_AGE_SECONDS: int = 60
+    # Listes (commandes, produits) sérialisées sans re-validation Pydantic (cf. core/fast_json.py)
+    FAST_JSON_RESPONSES: bool = False
+
+    # En-tête Server-Timing (app / db / appels sortants) sur chaque réponse
+    SERVER_TIMING_HEADER: bool = True
+
+    # Profilage SQL (core/sql_profiler.py, réglable à chaud via /api/sql-profiler)
+    SQL_SLOW_QUERY_MS: float = 200.0             # log des requêtes au-delà (0 = désactivé)
+    SQL_SLOW_QUERY_KEEP: int = 200
+    SQL_TRACE_SAMPLE_RATE: float = 0.0           # fraction des requêtes HTTP tracées (0..1)
+    SQL_TRACE_ROUTES: List[str] = []             # gabarits toujours tracés, ex. ["/api/orders/"]
+    SQL_TRACE_KEEP: int = 50
+    SQL_TRACE_MAX_STATEMENTS: int = 500
+
+    # Compression des réponses (core/compression.py) ; brotli si le module est installé
+    COMPRESSION_MIN_SIZE: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+    COMPRESSION_CACHE_ENTRIES: int = 64
+
+    # Cache géocodage (table geocode_cache + LRU en mémoire)
+    GEOCODE_CACHE_TTL_DAYS: int = 90
+    GEOCODE_CACHE_MAX_ENTRIES: int = 2048
+
+    # Client HTTP Nominatim (politique d'usage: 1 req/s, User-Agent identifiant)
+    NOMINATIM_URL: str = "https://nominatim.openstreetmap.org"
+    NOMINATIM_USER_AGENT: str = "kuisto-restaurant-api/1.0"
+    GEOCODE_TIMEOUT_SECONDS: float = 5.0
+    GEOCODE_MAX_CONCURRENCY: int = 1
+    GEOCODE_MIN_INTERVAL_SECONDS: float = 1.0
+    # Attente max d'une place (sémaphore) avant de renoncer : au-delà -> httpx.PoolTimeout
+    GEOCODE_QUEUE_TIMEOUT_SECONDS: float = 10.0
+
     STRIPE_SECRET_KEY: str
     # --- AJOUTS POUR LE WEBHOOK ---
     STRIPE_WEBHOOK_SECRET: str = ""              # whsec_... (obligatoire)
     STRIPE_WEBHOOK_SECRET_2: Optional[str] = None  # si tu as une 2e destination (optionnel)
     # --------------------------------
+    # SDK stripe synchrone : pool de threads borné (cf. core/payment_gateway.py)
+    STRIPE_MAX_CONCURRENCY: int = 16
+    STRIPE_TIMEOUT_SECONDS: float = 20.0
+    STRIPE_MAX_NETWORK_RETRIES: int = 2
+    # Commande portée par le PaymentIntent : "inline" (metadata compacte, brouillon DB
+    # si trop volumineuse) ou "draft" (toujours un brouillon DB, metadata = id)
+    STRIPE_METADATA_MODE: Literal["inline", "draft"] = "inline"
+    # Brouillons de commande (order_drafts) supprimés après ce délai (> fenêtre de relivraison des webhooks)
+    ORDER_DRAFT_TTL_HOURS: int = 7 * 24
+    # Outbox des appels Stripe (worker de fond) : scrutation, retries avec backoff exponentiel
+    STRIPE_OUTBOX_POLL_SECONDS: float = 5.0
+    STRIPE_OUTBOX_MAX_ATTEMPTS: int = 8
+    STRIPE_OUTBOX_BACKOFF_SECONDS: float = 5.0
+    # Évènements webhook stockés (stripe_events) : consommateur de fond, retries puis 'dead'
+    STRIPE_EVENTS_POLL_SECONDS: float = 5.0
+    STRIPE_EVENTS_MAX_ATTEMPTS: int = 8
+    STRIPE_EVENTS_BACKOFF_SECONDS: float = 5.0
+
+    # Idempotence : une clé restée 'processing' au-delà de ce délai (crash) peut être reprise
+    IDEMPOTENCY_LOCK_SECONDS: int = 60
+
+    # Fuseau des rollups analytics (jour / heure de service)
+    ANALYTICS_TIMEZONE: str = "Europe/Paris"
 
     FRONT_CONFIRM_URL: str
     FRONT_CANCEL_URL: str
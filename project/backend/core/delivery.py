@@ -0,0 +1,109 @@
+"""
+Zone et frais de livraison, calculés hors-ligne.
+
+Construit une fois depuis les settings (RESTAURANT_LAT/LNG, DELIVERY_MAX_KM,
+DELIVERY_BASE_FEE, DELIVERY_PER_KM_FEE) :
+- pré-rejet par bounding box (quelques comparaisons de floats) : un point
+  hors de la boîte est hors zone sans calcul précis ; sa distance (message
+  "hors zone : X km") est le grand cercle, valable à toute distance
+- dans la boîte, distance par projection locale sur l'ellipsoïde WGS84
+  (rayons de courbure méridien/normal à la latitude moyenne) : à l'échelle
+  d'une zone de livraison l'écart avec geopy.geodesic est de quelques
+  millimètres, pour un coût de quelques opérations trigonométriques.
+"""
+import math
+from decimal import Decimal
+from typing import List, NamedTuple, Sequence, Tuple
+
+from core.config import settings
+
+# WGS84
+_A_KM = 6378.137
+_E2 = 0.00669437999014
+_MEAN_RADIUS_KM = 6371.0088
+
+
+class DeliveryQuote(NamedTuple):
+    distance_km: float
+    fee: Decimal
+    in_zone: bool
+
+
+class DeliveryZone:
+    def __init__(
+        self,
+        lat: float,
+        lng: float,
+        max_km: float,
+        base_fee: Decimal,
+        per_km_fee: Decimal,
+    ):
+        self.lat = float(lat)
+        self.lng = float(lng)
+        self.max_km = float(max_km)
+        self.base_fee = Decimal(str(base_fee))
+        self.per_km_fee = Decimal(str(per_km_fee))
+
+        # Bounding box (marge 1%) : tout point hors de la boîte est hors zone
+        m, n = self._radii(self.lat)
+        margin = 1.01
+        self._dlat = math.degrees(self.max_km * margin / m)
+        cos_lat = max(math.cos(math.radians(self.lat)), 1e-6)
+        self._dlng = math.degrees(self.max_km * margin / (n * cos_lat))
+
+    @classmethod
+    def from_settings(cls) -> "DeliveryZone":
+        return cls(
+            lat=settings.RESTAURANT_LAT,
+            lng=settings.RESTAURANT_LNG,
+            max_km=float(getattr(settings, "DELIVERY_MAX_KM", 8.0)),
+            base_fee=settings.DELIVERY_BASE_FEE,
+            per_km_fee=settings.DELIVERY_PER_KM_FEE,
+        )
+
+    @staticmethod
+    def _radii(lat_deg: float) -> Tuple[float, float]:
+        """Rayons de courbure (méridien M, normal N) en km."""
+        s = math.sin(math.radians(lat_deg))
+        w2 = 1.0 - _E2 * s * s
+        n = _A_KM / math.sqrt(w2)
+        m = _A_KM * (1.0 - _E2) / (w2 * math.sqrt(w2))
+        return m, n
+
+    def in_bbox(self, lat: float, lng: float) -> bool:
+        return abs(lat - self.lat) <= self._dlat and abs(lng - self.lng) <= self._dlng
+
+    def distance_km(self, lat: float, lng: float) -> float:
+        lat_m = (self.lat + lat) / 2.0
+        m, n = self._radii(lat_m)
+        dy = math.radians(lat - self.lat) * m
+        dx = math.radians(lng - self.lng) * n * math.cos(math.radians(lat_m))
+        return math.hypot(dx, dy)
+
+    def great_circle_km(self, lat: float, lng: float) -> float:
+        """Haversine (sphère moyenne) : pour les points lointains, affichage seulement."""
+        phi1, phi2 = math.radians(self.lat), math.radians(lat)
+        dphi = phi2 - phi1
+        dlmb = math.radians(lng - self.lng)
+        h = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+        return 2 * _MEAN_RADIUS_KM * math.asin(min(1.0, math.sqrt(h)))
+
+    def fee_for(self, distance_km: float) -> Decimal:
+        return (self.base_fee + self.per_km_fee * Decimal(str(distance_km))).quantize(Decimal("0.01"))
+
+    def quote(self, lat: float, lng: float) -> DeliveryQuote:
+        lat, lng = float(lat), float(lng)
+        if not self.in_bbox(lat, lng):
+            distance = self.great_circle_km(lat, lng)
+            return DeliveryQuote(distance, self.fee_for(distance), False)
+        distance = self.distance_km(lat, lng)
+        return DeliveryQuote(distance, self.fee_for(distance), distance <= self.max_km)
+
+    def quote_many(self, lats: Sequence[float], lngs: Sequence[float]) -> List[DeliveryQuote]:
+        """Version batch (tableaux de coordonnées) ; même pré-rejet bbox que quote() pour chaque point."""
+        if len(lats) != len(lngs):
+            raise ValueError("lats et lngs doivent avoir la même longueur.")
+        return [self.quote(lat, lng) for lat, lng in zip(lats, lngs)]
+
+
+delivery_zone = DeliveryZone.from_settings()
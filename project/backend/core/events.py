@@ -0,0 +1,57 @@
+"""
+Pub/sub en mémoire pour le flux temps réel des commandes (admin / cuisine).
+
+Les écritures sur les commandes publient un évènement ; chaque client SSE
+connecté (GET /api/orders/stream) a sa propre file bornée. Un client trop
+lent perd les évènements en trop plutôt que de bloquer les publications :
+il resynchronise via GET /api/orders/ à la reconnexion.
+
+NB: local au process (un worker = un broker).
+"""
+import asyncio
+import itertools
+import json
+from typing import Any, Dict, Set
+
+
+class OrderEventBroker:
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._seq = itertools.count(1)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def publish(self, event_type: str, data: Dict[str, Any]) -> None:
+        event = {"id": next(self._seq), "type": event_type, "data": data}
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                pass
+
+    def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self._subscribers.discard(queue)
+
+
+def format_sse(event: Dict[str, Any]) -> str:
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event['data'], separators=(',', ':'))}\n\n"
+
+
+order_events = OrderEventBroker()
+
+
+def publish_order_created(order_response) -> None:
+    """`order_response` : OrderResponse (même JSON que l'API REST)."""
+    order_events.publish("order.created", json.loads(order_response.model_dump_json()))
+
+
+def publish_order_status(order_id: int, status) -> None:
+    order_events.publish("order.status", {"id": order_id, "status": getattr(status, "value", status)})
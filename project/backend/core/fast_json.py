@@ -0,0 +1,55 @@
+"""
+Sérialisation JSON rapide (opt-in : FAST_JSON_RESPONSES).
+
+Les endpoints de liste peuvent renvoyer directement des dicts / bytes au
+lieu de modèles Pydantic re-validés par `response_model`. Le JSON produit
+est le même que celui de Pydantic (mode json) : Decimal -> chaîne
+("12.50"), enum -> valeur, datetime ISO 8601 avec "Z" pour UTC.
+
+orjson est utilisé s'il est installé, sinon le module json standard.
+"""
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from typing import Any
+
+from fastapi import Response
+
+try:  # dépendance optionnelle
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, Decimal):
+        return str(obj)
+    if isinstance(obj, Enum):
+        return obj.value
+    raise TypeError(f"Type {type(obj).__name__} non sérialisable")
+
+
+def _json_default(obj: Any) -> Any:
+    if isinstance(obj, datetime):
+        iso = obj.isoformat()
+        return iso[:-6] + "Z" if iso.endswith("+00:00") else iso
+    if isinstance(obj, date):
+        return obj.isoformat()
+    return _default(obj)
+
+
+def dumps(obj: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_UTC_Z)
+    return json.dumps(obj, default=_json_default, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    """`content` : objet JSON-compatible, ou bytes déjà sérialisés (renvoyés tels quels)."""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, (bytes, bytearray)):
+            return bytes(content)
+        return dumps(content)
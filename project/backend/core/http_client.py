@@ -0,0 +1,128 @@
+"""
+Client HTTP sortant partagé (durée de vie = application).
+
+Un seul httpx.AsyncClient par service externe : pool de connexions +
+keep-alive, timeouts explicites, nombre d'appels simultanés borné et
+espacement minimal entre deux appels (Nominatim: 1 req/s max).
+L'attente d'une place est bornée (queue_timeout) : au-delà, httpx.PoolTimeout,
+comme un pool httpx saturé, que les appelants traitent déjà en erreur.
+Ouvert au startup et fermé au shutdown dans main.py ; créé à la demande
+si utilisé hors de l'app (scripts).
+"""
+import asyncio
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+
+from core.config import settings
+from core.instrumentation import record_outbound
+
+
+class OutboundHTTPClient:
+    def __init__(
+        self,
+        base_url: str,
+        timeout: float = 5.0,
+        max_connections: int = 10,
+        max_concurrency: int = 1,
+        min_interval: float = 0.0,
+        queue_timeout: Optional[float] = None,
+        headers: Optional[Dict[str, str]] = None,
+        name: str = "http",
+    ):
+        self.name = name
+        self.base_url = base_url
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.max_concurrency = max_concurrency
+        self.min_interval = min_interval
+        self.queue_timeout = queue_timeout  # None = attente non bornée
+        self.headers = headers or {}
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._pace_lock = asyncio.Lock()
+        self._last_call = 0.0
+        # Métriques
+        self.queue_depth = 0
+        self.in_flight = 0
+        self.requests_total = 0
+        self.errors_total = 0
+        self.rejected_total = 0
+
+    async def start(self) -> None:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=self.headers,
+                timeout=httpx.Timeout(self.timeout),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+            )
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _pace(self) -> None:
+        if self.min_interval <= 0:
+            return
+        async with self._pace_lock:
+            wait = self._last_call + self.min_interval - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._last_call = time.monotonic()
+
+    async def get(self, url: str, **kwargs: Any) -> httpx.Response:
+        if self._client is None:
+            await self.start()
+        started = time.perf_counter()
+        self.queue_depth += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected_total += 1
+            raise httpx.PoolTimeout(
+                f"{self.name}: pas de place après {self.queue_timeout}s d'attente "
+                f"({self.queue_depth} appels en file)"
+            ) from None
+        finally:
+            self.queue_depth -= 1
+        self.in_flight += 1
+        try:
+            await self._pace()
+            self.requests_total += 1
+            return await self._client.get(url, **kwargs)
+        except Exception:
+            self.errors_total += 1
+            raise
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+            # attente du sémaphore / du rate limit comprise : c'est ce que subit la requête
+            record_outbound(self.name, time.perf_counter() - started)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": self.queue_depth,
+            "in_flight": self.in_flight,
+            "requests_total": self.requests_total,
+            "errors_total": self.errors_total,
+            "rejected_total": self.rejected_total,
+            "max_concurrency": self.max_concurrency,
+        }
+
+
+geocoding_http = OutboundHTTPClient(
+    name="geocoding",
+    base_url=settings.NOMINATIM_URL,
+    timeout=settings.GEOCODE_TIMEOUT_SECONDS,
+    max_connections=settings.GEOCODE_MAX_CONCURRENCY,
+    max_concurrency=settings.GEOCODE_MAX_CONCURRENCY,
+    min_interval=settings.GEOCODE_MIN_INTERVAL_SECONDS,
+    queue_timeout=settings.GEOCODE_QUEUE_TIMEOUT_SECONDS,
+    headers={"User-Agent": settings.NOMINATIM_USER_AGENT},
+)
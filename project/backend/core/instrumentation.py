@@ -0,0 +1,248 @@
+"""
+Instrumentation par requête : temps total, temps DB, nombre de requêtes SQL,
+temps des appels sortants (géocodage, Stripe).
+
+- RequestMetrics : compteurs de la requête en cours, portés par un
+  ContextVar (posé par TimingMiddleware, hérité par les tâches et les
+  greenlets SQLAlchemy de la requête)
+- install_sql_instrumentation(engine) : écoute before/after_cursor_execute
+  sur `engine.sync_engine` et ajoute chaque requête SQL aux compteurs
+- record_outbound(service, secondes) : appelé par core/http_client.py et
+  core/payment_gateway.py
+- core/sql_profiler.py : requêtes lentes et traces SQL échantillonnées,
+  alimentées par les mêmes événements
+- TimingMiddleware : en-tête `Server-Timing` (visible dans l'onglet réseau
+  du navigateur) + histogrammes par route, exposés au format texte
+  Prometheus sur GET /metrics (render_metrics)
+
+Les métriques sont propres à chaque process (worker uvicorn) ; Prometheus
+les agrège par instance. Les routes sont étiquetées par leur gabarit
+("/api/orders/{order_id}") pour garder une cardinalité bornée.
+"""
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from threading import Lock
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from core.sql_profiler import sql_profiler
+
+
+def route_label(scope: Scope) -> str:
+    route = scope.get("route")
+    path = getattr(route, "path_format", None) or getattr(route, "path", None)
+    return path or "unmatched"
+
+
+@dataclass
+class RequestMetrics:
+    started: float = field(default_factory=time.perf_counter)
+    db_seconds: float = 0.0
+    db_queries: int = 0
+    outbound: Dict[str, float] = field(default_factory=dict)
+    # Trace SQL complète (core/sql_profiler.py), décidée à la 1re requête SQL
+    scope: Dict[str, Any] = field(default_factory=dict, repr=False)
+    trace_decided: bool = False
+    sql_trace: Optional[List[Dict[str, Any]]] = None
+    sql_trace_dropped: int = 0
+
+    def route(self) -> str:
+        # gabarit posé dans le scope par le routeur (après le middleware)
+        return route_label(self.scope)
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def server_timing(self) -> str:
+        parts = [
+            f"app;dur={self.elapsed() * 1000:.1f}",
+            f'db;dur={self.db_seconds * 1000:.1f};desc="{self.db_queries} queries"',
+        ]
+        for service, seconds in self.outbound.items():
+            parts.append(f"{service};dur={seconds * 1000:.1f}")
+        return ", ".join(parts)
+
+
+_current: ContextVar[Optional[RequestMetrics]] = ContextVar("request_metrics", default=None)
+
+
+def current_metrics() -> Optional[RequestMetrics]:
+    return _current.get()
+
+
+def record_outbound(service: str, seconds: float) -> None:
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.outbound[service] = metrics.outbound.get(service, 0.0) + seconds
+
+
+# --- SQL (événements SQLAlchemy) ---
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("query_start_time")
+    if not starts:
+        return
+    duration = time.perf_counter() - starts.pop()
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.db_seconds += duration
+        metrics.db_queries += 1
+    sql_profiler.observe(metrics, statement, parameters, executemany, duration)
+
+
+def install_sql_instrumentation(engine) -> None:
+    """`engine` : AsyncEngine (les événements sont posés sur son sync_engine)."""
+    sync_engine = engine.sync_engine
+    if not event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# --- Histogrammes (format texte Prometheus) ---
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+LabelValues = Tuple[str, ...]
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, label_names: Iterable[str], buckets: Iterable[float]):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        # par jeu de labels : [compteurs par bucket (+Inf en dernier), somme]
+        self._series: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+        self._lock = Lock()
+
+    def observe(self, labels: LabelValues, value: float) -> None:
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = ([0] * (len(self.buckets) + 1), [0.0])
+                self._series[labels] = series
+            counts, total = series
+            counts[bisect_left(self.buckets, value)] += 1
+            total[0] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((labels, list(counts), total[0]) for labels, (counts, total) in self._series.items())
+        for labels, counts, total in series:
+            base = ",".join(f'{k}="{_escape(v)}"' for k, v in zip(self.label_names, labels))
+            sep = "," if base else ""
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{base}{sep}le="{bound:g}"}} {cumulative}')
+            cumulative += counts[-1]
+            lines.append(f'{self.name}_bucket{{{base}{sep}le="+Inf"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{base}}} {total:.6f}")
+            lines.append(f"{self.name}_count{{{base}}} {cumulative}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, label_names: Iterable[str]):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._values: Dict[LabelValues, int] = {}
+        self._lock = Lock()
+
+    def inc(self, labels: LabelValues, amount: int = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            base = ",".join(f'{k}="{_escape(v)}"' for k, v in zip(self.label_names, labels))
+            lines.append(f"{self.name}{{{base}}} {value}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+REQUESTS = Counter("http_requests_total", "Requêtes HTTP traitées.", ("method", "route", "status"))
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Durée totale des requêtes.", ("method", "route"), DURATION_BUCKETS
+)
+DB_SECONDS = Histogram(
+    "http_request_db_seconds", "Temps passé en SQL par requête.", ("method", "route"), DURATION_BUCKETS
+)
+DB_QUERIES = Histogram(
+    "http_request_db_queries", "Nombre de requêtes SQL par requête HTTP.", ("method", "route"), QUERY_COUNT_BUCKETS
+)
+OUTBOUND_SECONDS = Histogram(
+    "http_request_outbound_seconds",
+    "Temps passé en appels sortants par requête.",
+    ("method", "route", "service"),
+    DURATION_BUCKETS,
+)
+
+_REGISTRY = (REQUESTS, REQUEST_SECONDS, DB_SECONDS, DB_QUERIES, OUTBOUND_SECONDS)
+
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def render_metrics() -> str:
+    lines: List[str] = []
+    for metric in _REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# --- Middleware ---
+class TimingMiddleware:
+    def __init__(self, app: ASGIApp, server_timing: bool = True):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        metrics = RequestMetrics(scope=scope)
+        token = _current.set(metrics)
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if self.server_timing:
+                    MutableHeaders(scope=message).append("Server-Timing", metrics.server_timing())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            self._observe(scope, metrics, status_code)
+
+    @staticmethod
+    def _observe(scope: Scope, metrics: RequestMetrics, status_code: int) -> None:
+        labels = (scope["method"], route_label(scope))
+        REQUESTS.inc(labels + (str(status_code),))
+        REQUEST_SECONDS.observe(labels, metrics.elapsed())
+        DB_SECONDS.observe(labels, metrics.db_seconds)
+        DB_QUERIES.observe(labels, metrics.db_queries)
+        for service, seconds in metrics.outbound.items():
+            OUTBOUND_SECONDS.observe(labels + (service,), seconds)
+        if metrics.sql_trace is not None:
+            sql_profiler.store_trace(labels[0], labels[1], status_code, metrics)
@@ -0,0 +1,156 @@
+"""
+Encodage compact de la commande dans la metadata d'un PaymentIntent Stripe.
+
+Format v2 (clé "ov" = "2") :
+- uniquement ce qui ne peut pas être recalculé : identité / adresse client,
+  frais, coordonnées, et pour chaque ligne (product_id, quantité, paires
+  option_id / choice_option_id). Noms et prix sont re-dérivés côté serveur
+  par le résolveur de panier.
+- tableau JSON positionnel, compressé (zlib) puis base64 url-safe sans
+  padding, découpé en valeurs de METADATA_VALUE_MAX caractères ("o0", "o1", ...).
+
+Mode brouillon (clé "ov" = "d") : la même charge utile est stockée en DB
+(table order_drafts) et la metadata ne porte que "od" = id du brouillon ;
+cf. crud/payment_orders.py.
+
+Le décodeur lit aussi les formats historiques ("order_data" JSON brut,
+"order_parts" + "order_data_b64_{i}").
+"""
+import base64
+import json
+import zlib
+from typing import Any, Dict, List, Optional
+
+CODEC_VERSION = "2"
+DRAFT_VERSION = "d"
+
+METADATA_VALUE_MAX = 500   # limite Stripe par valeur
+METADATA_MAX_KEYS = 50     # limite Stripe par objet
+
+# Clés de la metadata
+K_VERSION = "ov"
+K_PARTS = "on"
+K_PART = "o"
+K_DRAFT = "od"
+
+
+# --- Charge utile (bytes) ---
+def pack_order(data: Dict[str, Any]) -> bytes:
+    """dict OrderCreate (jsonable) -> bytes compressés."""
+    items = []
+    for it in data.get("items") or []:
+        flat: List[int] = []
+        for ch in it.get("choices") or []:
+            flat.append(int(ch["option_id"]))
+            flat.append(int(ch["choice_option_id"]))
+        items.append([int(it["product_id"]), int(it["quantity"]), flat])
+    fee = data.get("fee")
+    row = [
+        data.get("name"),
+        data.get("address"),
+        data.get("phone"),
+        None if fee is None else str(fee),
+        data.get("latitude"),
+        data.get("longitude"),
+        data.get("payment_mode") or "cb",
+        items,
+    ]
+    raw = json.dumps(row, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return zlib.compress(raw, 9)
+
+
+def unpack_order(blob: bytes) -> Dict[str, Any]:
+    """Inverse de pack_order : dict prêt pour OrderCreate(**data)."""
+    name, address, phone, fee, lat, lng, payment_mode, items = json.loads(zlib.decompress(blob))
+    return {
+        "name": name,
+        "address": address,
+        "phone": phone,
+        "fee": fee,
+        "latitude": lat,
+        "longitude": lng,
+        "payment_mode": payment_mode,
+        "delivery_mode": "delivery",
+        "items": [
+            {
+                "product_id": pid,
+                "quantity": qty,
+                "choices": [
+                    {"option_id": flat[i], "choice_option_id": flat[i + 1]}
+                    for i in range(0, len(flat), 2)
+                ] or None,
+            }
+            for pid, qty, flat in items
+        ],
+    }
+
+
+def _b64(blob: bytes) -> str:
+    return base64.urlsafe_b64encode(blob).decode("ascii").rstrip("=")
+
+
+def _unb64(s: str) -> bytes:
+    return base64.urlsafe_b64decode(s + "=" * (-len(s) % 4))
+
+
+# --- Metadata Stripe ---
+def encode_inline(blob: bytes, reserved_keys: int = 0) -> Optional[Dict[str, str]]:
+    """
+    Metadata v2 ; None si la commande ne tient pas dans la limite de clés
+    Stripe (l'appelant bascule alors en mode brouillon).
+    """
+    b64 = _b64(blob)
+    parts = [b64[i:i + METADATA_VALUE_MAX] for i in range(0, len(b64), METADATA_VALUE_MAX)] or [""]
+    if len(parts) + 2 + reserved_keys > METADATA_MAX_KEYS:
+        return None
+    md = {K_VERSION: CODEC_VERSION, K_PARTS: str(len(parts))}
+    for idx, part in enumerate(parts):
+        md[f"{K_PART}{idx}"] = part
+    return md
+
+
+def encode_draft(draft_id: int) -> Dict[str, str]:
+    return {K_VERSION: DRAFT_VERSION, K_DRAFT: str(draft_id)}
+
+
+def draft_id_from_metadata(md: Dict[str, Any]) -> Optional[int]:
+    if md.get(K_VERSION) != DRAFT_VERSION:
+        return None
+    try:
+        return int(md[K_DRAFT])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("Identifiant de brouillon invalide dans la metadata.")
+
+
+def decode_inline(md: Dict[str, Any]) -> Dict[str, Any]:
+    """Metadata v2 ou historique -> dict OrderCreate. Lève ValueError si absente / invalide."""
+    if md.get(K_VERSION) == CODEC_VERSION:
+        n_parts = int(md.get(K_PARTS) or 0)
+        buf = []
+        for i in range(n_parts):
+            part = md.get(f"{K_PART}{i}")
+            if part is None:
+                raise ValueError(f"Métadonnée manquante: {K_PART}{i}")
+            buf.append(part)
+        return unpack_order(_unb64("".join(buf)))
+
+    # --- Formats historiques ---
+    single = md.get("order_data")
+    if single:
+        try:
+            return json.loads(single)
+        except Exception:
+            pass
+
+    n_parts = int(md.get("order_parts") or 0)
+    if n_parts <= 0:
+        raise ValueError("Aucune donnée de commande dans la metadata.")
+    buf = []
+    for i in range(n_parts):
+        key = f"order_data_b64_{i}"
+        part = md.get(key)
+        if not part:
+            raise ValueError(f"Métadonnée manquante: {key}")
+        buf.append(part)
+    raw = base64.b64decode("".join(buf).encode("ascii")).decode("utf-8")
+    return json.loads(raw)
@@ -0,0 +1,176 @@
+"""
+Passerelle de paiement : appels sortants vers Stripe.
+
+Le SDK stripe (8.x) est synchrone et n'a pas de client async : chaque appel
+est exécuté dans un pool de threads borné (STRIPE_MAX_CONCURRENCY), jamais
+sur la boucle asyncio. Chaque thread du pool garde sa session HTTP
+(RequestsClient : keep-alive, pas de handshake TLS par appel).
+
+`FakePaymentGateway` garde les PaymentIntents en mémoire, avec une latence
+et des échecs simulables (tests, dev sans Stripe, mesures de débit).
+"""
+import asyncio
+import functools
+import itertools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import stripe
+
+from core.config import settings
+from core.instrumentation import record_outbound
+
+stripe.api_key = settings.STRIPE_SECRET_KEY
+
+
+class PaymentGatewayError(Exception):
+    pass
+
+
+@dataclass
+class PaymentIntentInfo:
+    id: str
+    status: str
+    amount: int
+    client_secret: Optional[str] = None
+    metadata: Dict[str, str] = field(default_factory=dict)
+
+
+class PaymentGateway:
+    async def create_payment_intent(
+        self, amount: int, currency: str, metadata: Dict[str, str]
+    ) -> PaymentIntentInfo:
+        raise NotImplementedError
+
+    async def retrieve_payment_intent(self, payment_intent_id: str) -> PaymentIntentInfo:
+        raise NotImplementedError
+
+    async def modify_payment_intent(self, payment_intent_id: str, metadata: Dict[str, str]) -> None:
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+    def close(self) -> None:
+        pass
+
+
+class StripeGateway(PaymentGateway):
+    def __init__(self, max_concurrency: int = 16, timeout: float = 20.0, max_network_retries: int = 2):
+        self.max_concurrency = max_concurrency
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="stripe")
+        stripe.default_http_client = stripe.http_client.RequestsClient(timeout=timeout)
+        stripe.max_network_retries = max_network_retries
+        # Métriques (mises à jour côté boucle uniquement)
+        self.pending = 0
+        self.requests_total = 0
+        self.errors_total = 0
+
+    async def _call(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        self.pending += 1
+        self.requests_total += 1
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+        except stripe.error.StripeError as e:
+            self.errors_total += 1
+            raise PaymentGatewayError(str(e)) from e
+        finally:
+            self.pending -= 1
+            record_outbound("stripe", time.perf_counter() - started)
+
+    @staticmethod
+    def _info(pi: Any) -> PaymentIntentInfo:
+        return PaymentIntentInfo(
+            id=pi.id,
+            status=pi.status,
+            amount=pi.amount,
+            client_secret=pi.client_secret,
+            metadata=dict(pi.metadata or {}),
+        )
+
+    async def create_payment_intent(
+        self, amount: int, currency: str, metadata: Dict[str, str]
+    ) -> PaymentIntentInfo:
+        pi = await self._call(
+            stripe.PaymentIntent.create,
+            amount=amount,
+            currency=currency,
+            automatic_payment_methods={"enabled": True},
+            metadata=metadata,
+        )
+        return self._info(pi)
+
+    async def retrieve_payment_intent(self, payment_intent_id: str) -> PaymentIntentInfo:
+        return self._info(await self._call(stripe.PaymentIntent.retrieve, payment_intent_id))
+
+    async def modify_payment_intent(self, payment_intent_id: str, metadata: Dict[str, str]) -> None:
+        # Stripe fusionne les clés : seules celles passées ici sont modifiées
+        await self._call(stripe.PaymentIntent.modify, payment_intent_id, metadata=metadata)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            # au-delà de max_concurrency, les appels attendent un thread libre
+            "queue_depth": max(self.pending - self.max_concurrency, 0),
+            "in_flight": min(self.pending, self.max_concurrency),
+            "requests_total": self.requests_total,
+            "errors_total": self.errors_total,
+            "max_concurrency": self.max_concurrency,
+        }
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class FakePaymentGateway(PaymentGateway):
+    def __init__(self, latency: float = 0.0, fail_times: int = 0, status: str = "succeeded"):
+        self.latency = latency
+        self.fail_times = fail_times
+        self.status = status
+        self.intents: Dict[str, PaymentIntentInfo] = {}
+        self.calls: List[Tuple[str, str]] = []
+        self._ids = itertools.count(1)
+
+    async def _simulate(self, method: str, payment_intent_id: str) -> None:
+        self.calls.append((method, payment_intent_id))
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.fail_times > 0:
+            self.fail_times -= 1
+            raise PaymentGatewayError("fake gateway: échec simulé")
+
+    def _get(self, payment_intent_id: str) -> PaymentIntentInfo:
+        try:
+            return self.intents[payment_intent_id]
+        except KeyError:
+            raise PaymentGatewayError(f"No such payment_intent: '{payment_intent_id}'")
+
+    async def create_payment_intent(
+        self, amount: int, currency: str, metadata: Dict[str, str]
+    ) -> PaymentIntentInfo:
+        pi_id = f"pi_fake_{next(self._ids)}"
+        await self._simulate("create", pi_id)
+        pi = PaymentIntentInfo(
+            id=pi_id, status=self.status, amount=amount,
+            client_secret=f"{pi_id}_secret", metadata=dict(metadata),
+        )
+        self.intents[pi_id] = pi
+        return pi
+
+    async def retrieve_payment_intent(self, payment_intent_id: str) -> PaymentIntentInfo:
+        await self._simulate("retrieve", payment_intent_id)
+        return self._get(payment_intent_id)
+
+    async def modify_payment_intent(self, payment_intent_id: str, metadata: Dict[str, str]) -> None:
+        await self._simulate("modify", payment_intent_id)
+        self._get(payment_intent_id).metadata.update(metadata)
+
+
+payment_gateway: PaymentGateway = StripeGateway(
+    max_concurrency=settings.STRIPE_MAX_CONCURRENCY,
+    timeout=settings.STRIPE_TIMEOUT_SECONDS,
+    max_network_retries=settings.STRIPE_MAX_NETWORK_RETRIES,
+)
@@ -168,3 +168,187 @@ def compute_unit_price_for_item(
 
     # ---------- AUTRES PRODUITS ----------
     return (base + extras_all).quantize(Decimal("0.01"))
+
+
+# ================== TABLE DE PRIX PRÉCOMPILÉE ==================
+# Les heuristiques ci-dessus (normalisation des slugs/noms, regex sur les
+# libellés, Decimal(str(...))) ne dépendent que du catalogue : on les évalue
+# une seule fois par version du catalogue, puis le pricing d'un panier n'est
+# plus qu'une suite de lookups dans des dicts.
+# compute_unit_price_for_item reste la référence : tests/test_pricing.py
+# vérifie que PricingTable donne les mêmes prix.
+
+STRATEGY_STANDARD = "standard"
+STRATEGY_TACOS = "tacos"
+STRATEGY_MENU_TACOS = "menu_tacos"
+STRATEGY_COMBO = "combo"
+
+_CENT = Decimal("0.01")
+_ZERO = Decimal("0.00")
+
+
+class CompiledProduct:
+    __slots__ = ("id", "name", "base_price", "strategy")
+
+    def __init__(self, id: int, name: str, base_price: Decimal, strategy: str):
+        self.id = id
+        self.name = name
+        self.base_price = base_price
+        self.strategy = strategy
+
+
+class CompiledChoice:
+    __slots__ = ("id", "name", "option_id", "option_name", "modifier", "meat_count", "burger_named", "burger_base")
+
+    def __init__(self, id: int, name: str, option_id: Optional[int], option_name: Optional[str],
+                 modifier: Decimal, meat_count: Optional[int], burger_named: bool,
+                 burger_base: Optional[Decimal]):
+        self.id = id
+        self.name = name
+        self.option_id = option_id
+        self.option_name = option_name        # nom de l'option parente (snapshots admin)
+        self.modifier = modifier
+        self.meat_count = meat_count          # 1/2/3 si le libellé indique un nb de viandes
+        self.burger_named = burger_named      # libellé non vide (sélecteur burger du Menu Combo)
+        self.burger_base = burger_base        # 6.00 smash | 10.50 signature | None
+
+
+class CompiledOption:
+    __slots__ = ("id", "is_meat", "is_burger_selector")
+
+    def __init__(self, id: int, is_meat: bool, is_burger_selector: bool):
+        self.id = id
+        self.is_meat = is_meat
+        self.is_burger_selector = is_burger_selector
+
+
+def _product_strategy(p) -> str:
+    if _is_tacos_product(p) or _is_menu_tacos_product(p):
+        return STRATEGY_MENU_TACOS if _is_menu_tacos_product(p) else STRATEGY_TACOS
+    if _is_combo_menu_product(p):
+        return STRATEGY_COMBO
+    return STRATEGY_STANDARD
+
+
+class PricingTable:
+    """
+    Table de prix construite depuis le catalogue complet :
+    - product_id -> stratégie de pricing + base_price (Decimal)
+    - choice_option_id -> modifier (Decimal), nb de viandes, base burger (Menu Combo)
+    - option_id -> rôle viande / sélecteur burger
+    """
+
+    def __init__(
+        self,
+        products: Dict[int, CompiledProduct],
+        choices: Dict[int, CompiledChoice],
+        options: Dict[int, CompiledOption],
+    ):
+        self.products = products
+        self.choices = choices
+        self.options = options
+
+    @classmethod
+    def build(cls, products: Iterable, options: Iterable, choice_options: Iterable) -> "PricingTable":
+        """
+        `products` doivent exposer `.category` (nom/slug) pour la détection
+        smash/signature du Menu Combo, triés par id (en cas de noms en double,
+        le dernier l'emporte). Objets ORM ou schémas Pydantic acceptés.
+        """
+        products = list(products)
+        options = list(options)
+        option_names = {o.id: o.name for o in options}
+
+        # "products by name" comme compute_unit_price_for_item : produit dont le nom
+        # est exactement le libellé du choix (sans espaces autour), le dernier l'emporte
+        by_exact_name: Dict[str, object] = {}
+        for p in products:
+            if p.name:
+                by_exact_name[p.name] = p
+
+        compiled_products = {
+            p.id: CompiledProduct(
+                id=p.id,
+                name=p.name,
+                base_price=Decimal(str(p.base_price)),
+                strategy=_product_strategy(p),
+            )
+            for p in products
+        }
+
+        compiled_options = {
+            o.id: CompiledOption(
+                id=o.id,
+                is_meat=_is_meat_option(o),
+                is_burger_selector=_is_burger_selector_option(o),
+            )
+            for o in options
+        }
+
+        compiled_choices: Dict[int, CompiledChoice] = {}
+        for co in choice_options:
+            name = getattr(co, "name", None)
+            burger_name = str(name).strip() if name else None
+            match = by_exact_name.get(burger_name) if burger_name else None
+            products_by_name = {_norm(match.name): match} if match is not None else None
+            compiled_choices[co.id] = CompiledChoice(
+                id=co.id,
+                name=name,
+                option_id=getattr(co, "option_id", None),
+                option_name=option_names.get(getattr(co, "option_id", None)),
+                modifier=Decimal(str(getattr(co, "price_modifier", 0) or 0)),
+                meat_count=_parse_meat_count_from_choice_name(name or ""),
+                burger_named=bool(name),
+                burger_base=_detect_burger_category_base(burger_name, products_by_name),
+            )
+
+        return cls(compiled_products, compiled_choices, compiled_options)
+
+    def has_product(self, product_id: int) -> bool:
+        return product_id in self.products
+
+    def unit_price(self, product_id: int, choice_reqs: Optional[Iterable]) -> Decimal:
+        """Équivalent table-driven de compute_unit_price_for_item."""
+        product = self.products[product_id]
+        choices = self.choices
+        options = self.options
+
+        extras_all = _ZERO
+        meat_count = 0
+        meat_mod_sum = _ZERO
+        meat_ids: Set[int] = set()
+        burger_base: Optional[Decimal] = None
+        burger_found = False
+
+        if choice_reqs:
+            for ch in choice_reqs:
+                co = choices.get(ch.choice_option_id)
+                if co is None:
+                    continue
+                extras_all += co.modifier
+                if co.meat_count and co.meat_count > meat_count:
+                    meat_count = co.meat_count
+                opt = options.get(ch.option_id)
+                if opt is None:
+                    continue
+                if opt.is_meat and ch.choice_option_id not in meat_ids:
+                    meat_ids.add(ch.choice_option_id)
+                    meat_mod_sum += co.modifier
+                if not burger_found and opt.is_burger_selector and co.burger_named:
+                    burger_found = True
+                    burger_base = co.burger_base
+
+        strategy = product.strategy
+        if strategy is STRATEGY_TACOS or strategy is STRATEGY_MENU_TACOS:
+            price = product.base_price
+            if meat_count:
+                price = _MEAT_PRICES[meat_count]
+                extras_all -= meat_mod_sum
+            if strategy is STRATEGY_MENU_TACOS:
+                price += _MENU_TACOS_EXTRA
+            return (price + extras_all).quantize(_CENT)
+
+        if strategy is STRATEGY_COMBO and burger_base is not None:
+            return (burger_base + _COMBO_EXTRA + extras_all).quantize(_CENT)
+
+        return (product.base_price + extras_all).quantize(_CENT)
@@ -1,4 +1,5 @@
-from fastapi import Header, HTTPException, status
+from typing import Optional
+from fastapi import Header, HTTPException, Query, status
 from core.config import settings  # On importe les settings pour lire ADMIN_TOKEN depuis le .env
 
 async def get_admin_token(x_admin_token: str = Header(...)):
@@ -12,3 +13,19 @@ async def get_admin_token(x_admin_token: str = Header(...)):
             detail="Token admin invalide !"
         )
     return x_admin_token
+
+
+async def get_admin_token_or_query(
+    x_admin_token: Optional[str] = Header(None),
+    token: Optional[str] = Query(None),
+):
+    """
+    Variante pour EventSource (SSE) : le navigateur ne permet pas d'envoyer
+    d'en-tête custom, on accepte donc aussi ?token=... dans l'URL.
+    """
+    if (x_admin_token or token) != settings.ADMIN_TOKEN:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token admin invalide !"
+        )
+    return x_admin_token or token
@@ -0,0 +1,229 @@
+"""
+Profilage SQL en production (complète core/instrumentation.py).
+
+- log des requêtes lentes : toute requête au-delà de SQL_SLOW_QUERY_MS est
+  loggée (logger "sql.slow") avec son texte, la forme de ses paramètres
+  (types, jamais les valeurs), sa durée et le code appelant ; les dernières
+  sont gardées en mémoire
+- traces par requête HTTP : une fraction des requêtes (SQL_TRACE_SAMPLE_RATE)
+  et toutes celles des routes listées dans SQL_TRACE_ROUTES gardent la
+  liste complète de leurs requêtes SQL
+
+Consultation et réglage à chaud (par process) : /api/sql-profiler (admin).
+Le code appelant n'est calculé que pour les requêtes lentes ou tracées.
+"""
+import itertools
+import logging
+import os
+import random
+import sys
+from collections import deque
+from datetime import datetime, timezone
+from threading import Lock
+from typing import Any, Deque, Dict, Iterable, List, Optional
+
+from core.config import settings
+
+try:  # installé avec SQLAlchemy (asyncio)
+    import greenlet
+except ImportError:  # pragma: no cover
+    greenlet = None
+
+logger = logging.getLogger("sql.slow")
+
+_BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_SKIP_FILES = {
+    os.path.abspath(__file__),
+    os.path.join(_BACKEND_DIR, "core", "instrumentation.py"),
+    os.path.join(_BACKEND_DIR, "database", "session.py"),
+}
+_MAX_STATEMENT_CHARS = 4000
+_CALL_SITE_DEPTH = 3
+
+
+def params_shape(parameters: Any, executemany: bool = False) -> str:
+    """Types des paramètres (les valeurs peuvent être des données personnelles)."""
+    if executemany:
+        rows = list(parameters or ())
+        return f"{len(rows)} x {params_shape(rows[0])}" if rows else "0 x ()"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{k}: {type(v).__name__}" for k, v in parameters.items()) + "}"
+    if isinstance(parameters, (list, tuple)):
+        return "(" + ", ".join(type(v).__name__ for v in parameters) + ")"
+    return type(parameters).__name__
+
+
+def _app_frames(frame) -> List[str]:
+    sites = []
+    while frame is not None and len(sites) < _CALL_SITE_DEPTH:
+        filename = frame.f_code.co_filename
+        if (
+            filename.startswith(_BACKEND_DIR)
+            and filename not in _SKIP_FILES
+            and "site-packages" not in filename
+        ):
+            rel = os.path.relpath(filename, _BACKEND_DIR)
+            sites.append(f"{rel}:{frame.f_lineno} ({frame.f_code.co_name})")
+        frame = frame.f_back
+    return sites
+
+
+def call_site() -> str:
+    """Fonctions du projet à l'origine de la requête SQL (la plus proche d'abord)."""
+    sites = _app_frames(sys._getframe(1))
+    if not sites and greenlet is not None:
+        # AsyncSession : le SQL tourne dans un greenlet fils ; la pile des
+        # coroutines appelantes est celle du greenlet parent (suspendu)
+        parent = greenlet.getcurrent().parent
+        if parent is not None:
+            sites = _app_frames(parent.gr_frame)
+    return " <- ".join(sites) or "?"
+
+
+class SQLProfiler:
+    def __init__(
+        self,
+        slow_ms: float = 200.0,
+        sample_rate: float = 0.0,
+        routes: Iterable[str] = (),
+        keep_slow: int = 200,
+        keep_traces: int = 50,
+        max_statements: int = 500,
+    ):
+        self.slow_ms = slow_ms
+        self.sample_rate = sample_rate
+        self.routes = set(routes)
+        self.max_statements = max_statements
+        self._slow: Deque[Dict[str, Any]] = deque(maxlen=keep_slow)
+        self._traces: Deque[Dict[str, Any]] = deque(maxlen=keep_traces)
+        self._ids = itertools.count(1)
+        self._lock = Lock()
+        # Métriques
+        self.slow_total = 0
+        self.traces_total = 0
+
+    def configure(
+        self,
+        slow_ms: Optional[float] = None,
+        sample_rate: Optional[float] = None,
+        routes: Optional[Iterable[str]] = None,
+    ) -> None:
+        if slow_ms is not None:
+            self.slow_ms = slow_ms
+        if sample_rate is not None:
+            self.sample_rate = sample_rate
+        if routes is not None:
+            self.routes = set(routes)
+
+    def config(self) -> Dict[str, Any]:
+        return {
+            "slow_ms": self.slow_ms,
+            "sample_rate": self.sample_rate,
+            "routes": sorted(self.routes),
+            "max_statements": self.max_statements,
+        }
+
+    def should_trace(self, route: str) -> bool:
+        return route in self.routes or (self.sample_rate > 0 and random.random() < self.sample_rate)
+
+    # --- appelé par core/instrumentation.py (after_cursor_execute) ---
+    def observe(self, metrics, statement: str, parameters: Any, executemany: bool, duration: float) -> None:
+        """`metrics` : RequestMetrics de la requête HTTP en cours, ou None (workers, scripts)."""
+        duration_ms = duration * 1000
+        slow = self.slow_ms > 0 and duration_ms >= self.slow_ms
+        trace = None
+        if metrics is not None:
+            if not metrics.trace_decided:
+                metrics.trace_decided = True
+                if self.should_trace(metrics.route()):
+                    metrics.sql_trace = []
+            trace = metrics.sql_trace
+        if not slow and trace is None:
+            return
+
+        entry = {
+            "duration_ms": round(duration_ms, 3),
+            "statement": statement[:_MAX_STATEMENT_CHARS],
+            "params": params_shape(parameters, executemany),
+            "call_site": call_site(),
+        }
+        if trace is not None:
+            if len(trace) < self.max_statements:
+                trace.append(entry)
+            else:
+                metrics.sql_trace_dropped += 1
+        if slow:
+            self.slow_total += 1
+            route = metrics.route() if metrics is not None else None
+            logger.warning(
+                "requête SQL lente (%.1f ms) [%s] %s params=%s : %s",
+                duration_ms, route or "hors requête", entry["call_site"], entry["params"],
+                " ".join(entry["statement"].split())[:500],
+            )
+            with self._lock:
+                self._slow.append(dict(entry, at=_now(), route=route))
+
+    # --- appelé par TimingMiddleware en fin de requête ---
+    def store_trace(self, method: str, route: str, status_code: int, metrics) -> None:
+        trace = {
+            "id": next(self._ids),
+            "at": _now(),
+            "method": method,
+            "route": route,
+            "status": status_code,
+            "duration_ms": round(metrics.elapsed() * 1000, 3),
+            "db_ms": round(metrics.db_seconds * 1000, 3),
+            "db_queries": metrics.db_queries,
+            "dropped": metrics.sql_trace_dropped,
+            "statements": metrics.sql_trace,
+        }
+        self.traces_total += 1
+        with self._lock:
+            self._traces.append(trace)
+
+    # --- consultation (api/routers/sql_profiler.py) ---
+    def slow_queries(self, limit: int = 50) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(reversed(self._slow))[:limit]
+
+    def traces(self, route: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        with self._lock:
+            traces = list(reversed(self._traces))
+        if route:
+            traces = [t for t in traces if t["route"] == route]
+        return [{k: v for k, v in t.items() if k != "statements"} for t in traces[:limit]]
+
+    def get_trace(self, trace_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            for trace in self._traces:
+                if trace["id"] == trace_id:
+                    return trace
+        return None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._slow.clear()
+            self._traces.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(
+            self.config(),
+            slow_total=self.slow_total,
+            traces_total=self.traces_total,
+            slow_kept=len(self._slow),
+            traces_kept=len(self._traces),
+        )
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+sql_profiler = SQLProfiler(
+    slow_ms=settings.SQL_SLOW_QUERY_MS,
+    sample_rate=settings.SQL_TRACE_SAMPLE_RATE,
+    routes=settings.SQL_TRACE_ROUTES,
+    keep_slow=settings.SQL_SLOW_QUERY_KEEP,
+    keep_traces=settings.SQL_TRACE_KEEP,
+    max_statements=settings.SQL_TRACE_MAX_STATEMENTS,
+)
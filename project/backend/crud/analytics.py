@@ -0,0 +1,220 @@
+"""
+Rollups analytics (CA par jour/heure, mix produits, choix populaires).
+
+Les tables sales_daily / sales_hourly / product_sales_daily /
+choice_sales_daily sont incrémentées dans la MÊME transaction que la
+création de la commande, et décrémentées quand une commande passe en
+'cancelled' (ré-incrémentées si elle en sort). Les endpoints analytics
+ne lisent que ces tables : coût O(jours), jamais O(commandes).
+"""
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from typing import Iterable, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import select, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import settings
+from models.models import (
+    Order, OrderItem, OrderStatus, order_item_choices_association,
+    SalesDaily, SalesHourly, ProductSalesDaily, ChoiceSalesDaily,
+)
+
+_TZ = ZoneInfo(settings.ANALYTICS_TIMEZONE)
+
+
+@dataclass
+class ProductDelta:
+    product_id: int
+    product_name: str
+    quantity: int
+    revenue: Decimal
+
+
+@dataclass
+class ChoiceDelta:
+    choice_option_id: int
+    choice_name: str
+    count: int
+
+
+def local_day_hour(ts: Optional[datetime] = None) -> Tuple[date, int]:
+    ts = ts or datetime.now(timezone.utc)
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    local = ts.astimezone(_TZ)
+    return local.date(), local.hour
+
+
+_LABEL_COLUMNS = ("product_name", "choice_name")
+
+
+def _increment(model, key_columns: List[str], rows: List[dict]):
+    """
+    INSERT multi-lignes ... ON CONFLICT (pk) DO UPDATE SET col = col + excluded.col
+    (les libellés sont simplement remplacés). Les clés doivent être uniques dans `rows`.
+    """
+    stmt = pg_insert(model).values(rows)
+    table = model.__table__
+    set_ = {}
+    for col in rows[0]:
+        if col in key_columns:
+            continue
+        set_[col] = stmt.excluded[col] if col in _LABEL_COLUMNS else table.c[col] + stmt.excluded[col]
+    return stmt.on_conflict_do_update(index_elements=key_columns, set_=set_)
+
+
+async def apply_order_rollup(
+    db: AsyncSession,
+    when: Optional[datetime],
+    total: Decimal,
+    fee: Decimal,
+    products: Iterable[ProductDelta],
+    choices: Iterable[ChoiceDelta],
+    sign: int = 1,
+) -> None:
+    """Ajoute (sign=1) ou retire (sign=-1) une commande des rollups. Ne commit pas."""
+    day, hour = local_day_hour(when)
+    products = list(products)
+    choices = list(choices)
+
+    await db.execute(_increment(SalesDaily, ["day"], [{
+        "day": day,
+        "orders_count": sign,
+        "items_count": sign * sum(p.quantity for p in products),
+        "revenue": sign * Decimal(total),
+        "fees": sign * Decimal(fee),
+    }]))
+    await db.execute(_increment(SalesHourly, ["day", "hour"], [{
+        "day": day,
+        "hour": hour,
+        "orders_count": sign,
+        "revenue": sign * Decimal(total),
+    }]))
+
+    # Plusieurs lignes d'un même produit / choix dans la commande -> une seule ligne de rollup
+    by_product = {}
+    for p in products:
+        cur = by_product.get(p.product_id)
+        if cur:
+            cur.quantity += p.quantity
+            cur.revenue += p.revenue
+        else:
+            by_product[p.product_id] = ProductDelta(p.product_id, p.product_name, p.quantity, Decimal(p.revenue))
+    by_choice = {}
+    for c in choices:
+        cur = by_choice.get(c.choice_option_id)
+        if cur:
+            cur.count += c.count
+        else:
+            by_choice[c.choice_option_id] = ChoiceDelta(c.choice_option_id, c.choice_name, c.count)
+
+    # Un seul INSERT multi-lignes par table
+    if by_product:
+        await db.execute(_increment(ProductSalesDaily, ["day", "product_id"], [
+            {
+                "day": day,
+                "product_id": p.product_id,
+                "product_name": p.product_name,
+                "quantity": sign * p.quantity,
+                "revenue": sign * p.revenue,
+            }
+            for p in by_product.values()
+        ]))
+    if by_choice:
+        await db.execute(_increment(ChoiceSalesDaily, ["day", "choice_option_id"], [
+            {
+                "day": day,
+                "choice_option_id": c.choice_option_id,
+                "choice_name": c.choice_name,
+                "count": sign * c.count,
+            }
+            for c in by_choice.values()
+        ]))
+
+
+async def apply_status_rollup(db: AsyncSession, order: Order, old_status, new_status) -> None:
+    """Entrée / sortie de l'état 'cancelled' : retire / remet la commande dans les rollups."""
+    was_cancelled = old_status == OrderStatus.cancelled
+    is_cancelled = new_status == OrderStatus.cancelled
+    if was_cancelled == is_cancelled:
+        return
+    sign = -1 if is_cancelled else 1
+
+    res = await db.execute(
+        select(OrderItem.product_id, OrderItem.product_name_snapshot, OrderItem.quantity, OrderItem.item_total)
+        .where(OrderItem.order_id == order.id)
+    )
+    products = [
+        ProductDelta(row.product_id, row.product_name_snapshot, row.quantity, Decimal(row.item_total))
+        for row in res.fetchall()
+    ]
+    res = await db.execute(
+        select(
+            order_item_choices_association.c.choice_option_id,
+            order_item_choices_association.c.choice_name_snapshot,
+            OrderItem.quantity,
+        )
+        .join(OrderItem, OrderItem.id == order_item_choices_association.c.order_item_id)
+        .where(OrderItem.order_id == order.id)
+    )
+    choices = [ChoiceDelta(row.choice_option_id, row.choice_name_snapshot, row.quantity) for row in res.fetchall()]
+
+    await apply_order_rollup(db, order.created_at, order.total, order.fee, products, choices, sign=sign)
+
+
+# --- Lectures (uniquement les rollups) ---
+async def revenue_by_day(db: AsyncSession, start: date, end: date) -> List[SalesDaily]:
+    res = await db.execute(
+        select(SalesDaily).where(SalesDaily.day >= start, SalesDaily.day <= end).order_by(SalesDaily.day)
+    )
+    return res.scalars().all()
+
+
+async def revenue_by_hour(db: AsyncSession, start: date, end: date):
+    """Agrégé par heure sur la période (profil du service)."""
+    res = await db.execute(
+        select(
+            SalesHourly.hour,
+            func.sum(SalesHourly.orders_count).label("orders_count"),
+            func.sum(SalesHourly.revenue).label("revenue"),
+        )
+        .where(SalesHourly.day >= start, SalesHourly.day <= end)
+        .group_by(SalesHourly.hour)
+        .order_by(SalesHourly.hour)
+    )
+    return res.fetchall()
+
+
+async def top_products(db: AsyncSession, start: date, end: date, limit: int = 10):
+    res = await db.execute(
+        select(
+            ProductSalesDaily.product_id,
+            func.max(ProductSalesDaily.product_name).label("product_name"),
+            func.sum(ProductSalesDaily.quantity).label("quantity"),
+            func.sum(ProductSalesDaily.revenue).label("revenue"),
+        )
+        .where(ProductSalesDaily.day >= start, ProductSalesDaily.day <= end)
+        .group_by(ProductSalesDaily.product_id)
+        .order_by(func.sum(ProductSalesDaily.quantity).desc())
+        .limit(limit)
+    )
+    return res.fetchall()
+
+
+async def top_choices(db: AsyncSession, start: date, end: date, limit: int = 10):
+    res = await db.execute(
+        select(
+            ChoiceSalesDaily.choice_option_id,
+            func.max(ChoiceSalesDaily.choice_name).label("choice_name"),
+            func.sum(ChoiceSalesDaily.count).label("count"),
+        )
+        .where(ChoiceSalesDaily.day >= start, ChoiceSalesDaily.day <= end)
+        .group_by(ChoiceSalesDaily.choice_option_id)
+        .order_by(func.sum(ChoiceSalesDaily.count).desc())
+        .limit(limit)
+    )
+    return res.fetchall()
@@ -0,0 +1,114 @@
+"""
+Résolution d'un panier (OrderCreate.items) contre le catalogue.
+
+Partagé par CRUDOrder.create (cash / capture / webhook) et
+/orders/stripe-intent : produits, choix et prix unitaires viennent de la
+table de prix du cache catalogue, dont la version est vérifiée contre
+catalog_state (au plus une lecture par CATALOG_VERSION_CHECK_SECONDS,
+cf. CatalogCache.is_current). Snapshot à jour = catalogue complet : un id
+absent est inconnu de la DB aussi -> 400, sans requête. Snapshot d'une
+autre version (écriture admin vue par un autre worker, SQL manuel...) ->
+on recharge uniquement ce qu'il faut depuis la DB.
+"""
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import List, Sequence
+
+from fastapi import HTTPException, status
+from sqlalchemy import select, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from core.pricing import PricingTable, CompiledProduct, CompiledChoice
+from crud.catalog_cache import catalog_cache
+from models.models import Product, Option, ChoiceOption
+from schemas.schemas import OrderItemRequest
+
+
+@dataclass
+class ResolvedCartLine:
+    product: CompiledProduct
+    quantity: int
+    unit_price: Decimal
+    line_total: Decimal
+    # Choix du panier, dans l'ordre de la requête
+    choices: List[CompiledChoice] = field(default_factory=list)
+
+
+@dataclass
+class ResolvedCart:
+    lines: List[ResolvedCartLine]
+    items_total: Decimal
+
+
+async def _load_pricing_from_db(db: AsyncSession, items: Sequence[OrderItemRequest]) -> PricingTable:
+    """Fallback: charge uniquement les lignes du catalogue utiles au panier."""
+    product_ids = {item.product_id for item in items}
+    co_ids = {ch.choice_option_id for item in items for ch in item.choices or []}
+    opt_ids = {ch.option_id for item in items for ch in item.choices or []}
+
+    choice_options = []
+    if co_ids:
+        res = await db.execute(select(ChoiceOption).where(ChoiceOption.id.in_(co_ids)))
+        choice_options = res.scalars().all()
+
+    # + options parentes des choix (option_name des snapshots)
+    opt_ids |= {co.option_id for co in choice_options}
+    options = []
+    if opt_ids:
+        res = await db.execute(select(Option).where(Option.id.in_(opt_ids)))
+        options = res.scalars().all()
+
+    # Produits du panier + burgers choisis par nom exact (Menu Combo), avec catégorie
+    choice_names = {co.name.strip() for co in choice_options if co.name}
+    cond = Product.id.in_(product_ids)
+    if choice_names:
+        cond = or_(cond, Product.name.in_(choice_names))
+    res = await db.execute(
+        select(Product).options(selectinload(Product.category)).where(cond).order_by(Product.id)
+    )
+    products = res.scalars().all()
+
+    return PricingTable.build(products, options, choice_options)
+
+
+async def resolve_cart(db: AsyncSession, items: Sequence[OrderItemRequest]) -> ResolvedCart:
+    snap = await catalog_cache.get_snapshot(db)
+    if await catalog_cache.is_current(db, snap):
+        pricing = snap.pricing
+    else:
+        # Catalogue modifié depuis le snapshot : ce worker le reconstruira au prochain accès
+        if snap.version == catalog_cache.version:
+            catalog_cache.invalidate()
+        pricing = await _load_pricing_from_db(db, items)
+
+    lines: List[ResolvedCartLine] = []
+    items_total = Decimal("0.00")
+    for item in items:
+        product = pricing.products.get(item.product_id)
+        if product is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Produit {item.product_id} introuvable.",
+            )
+        for ch in item.choices or []:
+            if ch.choice_option_id not in pricing.choices or ch.option_id not in pricing.options:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Choix {ch.choice_option_id} introuvable.",
+                )
+        unit_price = pricing.unit_price(item.product_id, item.choices)
+        qty = int(item.quantity or 1)
+        line_total = unit_price * qty
+        items_total += line_total
+        lines.append(
+            ResolvedCartLine(
+                product=product,
+                quantity=qty,
+                unit_price=unit_price,
+                line_total=line_total,
+                choices=[pricing.choices[ch.choice_option_id] for ch in item.choices or []],
+            )
+        )
+
+    return ResolvedCart(lines=lines, items_total=items_total)
@@ -0,0 +1,229 @@
+"""
+Cache catalogue en mémoire (process local).
+
+Le catalogue (catégories, produits, options, choix) ne change que via les
+routes admin. On garde donc un snapshot versionné, construit depuis la DB
+au premier accès, et servi tel quel aux lectures publiques.
+Toute écriture admin appelle `catalog_cache.invalidate()` : la version est
+incrémentée et le snapshot est jeté, le prochain accès le reconstruit.
+
+NB: le cache est local au process. Avec plusieurs workers, un TTL
+(CATALOG_CACHE_TTL_SECONDS) borne la durée pendant laquelle un worker
+qui n'a pas reçu l'écriture peut servir un catalogue périmé aux lectures.
+Le pricing des commandes ne s'en contente pas : chaque snapshot retient la
+version DB du catalogue (`catalog_state.version`, incrémentée par trigger à
+chaque écriture) et crud/cart_resolver.py la compare à la version courante
+(`is_current`, relue au plus toutes les CATALOG_VERSION_CHECK_SECONDS).
+
+Chaque snapshot porte une empreinte de son contenu (`digest`, base des
+ETag HTTP : identique d'un worker à l'autre pour un même catalogue) et la
+date à laquelle ce contenu a été vu pour la première fois (`last_modified`).
+"""
+import asyncio
+import hashlib
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from core.config import settings
+from core.pricing import PricingTable
+from models.models import Category, Product, Option, ChoiceOption, CatalogState
+from schemas.schemas import (
+    CategoryResponse, ProductResponse, OptionResponse, ChoiceOptionResponse,
+)
+
+
+@dataclass
+class CatalogSnapshot:
+    version: int
+    built_at: float
+    categories: List[CategoryResponse] = field(default_factory=list)
+    products: List[ProductResponse] = field(default_factory=list)
+    options: List[OptionResponse] = field(default_factory=list)
+    choice_options: List[ChoiceOptionResponse] = field(default_factory=list)
+    categories_by_id: Dict[int, CategoryResponse] = field(default_factory=dict)
+    products_by_id: Dict[int, ProductResponse] = field(default_factory=dict)
+    options_by_id: Dict[int, OptionResponse] = field(default_factory=dict)
+    choice_options_by_id: Dict[int, ChoiceOptionResponse] = field(default_factory=dict)
+    pricing: PricingTable = field(default_factory=lambda: PricingTable({}, {}, {}))
+    digest: str = ""
+    db_version: Optional[int] = None
+    # Dernière confirmation que db_version est la version courante (time.monotonic)
+    verified_at: float = 0.0
+    last_modified: Optional[datetime] = None
+    _products_json: Optional[List[bytes]] = field(default=None, repr=False, compare=False)
+
+    def products_json(self, skip: int = 0, limit: int = 100) -> bytes:
+        """Liste produits déjà sérialisée (chaque produit encodé une fois par snapshot)."""
+        if self._products_json is None:
+            self._products_json = [p.model_dump_json().encode("utf-8") for p in self.products]
+        return b"[" + b",".join(self._products_json[skip:skip + limit]) + b"]"
+
+
+def _catalog_digest(*groups) -> str:
+    h = hashlib.sha256()
+    for group in groups:
+        for model in group:
+            h.update(model.model_dump_json().encode("utf-8"))
+        h.update(b"|")
+    return h.hexdigest()
+
+
+async def read_catalog_db_version(db: AsyncSession) -> Optional[int]:
+    """Version partagée du catalogue (une lecture par clé primaire)."""
+    res = await db.execute(select(CatalogState.version).where(CatalogState.id == 1))
+    return res.scalar_one_or_none()
+
+
+async def load_catalog_snapshot(db: AsyncSession, version: int) -> CatalogSnapshot:
+    """Charge tout le catalogue depuis la DB (quelques requêtes, une fois par version)."""
+    # Lue AVANT le contenu : une écriture concurrente rend le snapshot périmé, jamais l'inverse
+    db_version = await read_catalog_db_version(db)
+
+    res = await db.execute(select(Category).order_by(Category.id))
+    categories = [CategoryResponse.model_validate(c) for c in res.scalars().all()]
+
+    res = await db.execute(
+        select(Product)
+        .options(
+            selectinload(Product.category),
+            selectinload(Product.options).selectinload(Option.choice_options),
+        )
+        .order_by(Product.id)
+    )
+    product_rows = res.scalars().unique().all()
+    products = [ProductResponse.model_validate(p) for p in product_rows]
+
+    res = await db.execute(
+        select(Option).options(selectinload(Option.choice_options)).order_by(Option.id)
+    )
+    option_rows = res.scalars().unique().all()
+    options = [OptionResponse.model_validate(o) for o in option_rows]
+
+    res = await db.execute(select(ChoiceOption).order_by(ChoiceOption.id))
+    choice_option_rows = res.scalars().all()
+    choice_options = [ChoiceOptionResponse.model_validate(co) for co in choice_option_rows]
+
+    built_at = time.monotonic()
+    return CatalogSnapshot(
+        version=version,
+        built_at=built_at,
+        categories=categories,
+        products=products,
+        options=options,
+        choice_options=choice_options,
+        categories_by_id={c.id: c for c in categories},
+        products_by_id={p.id: p for p in products},
+        options_by_id={o.id: o for o in options},
+        choice_options_by_id={co.id: co for co in choice_options},
+        pricing=PricingTable.build(product_rows, option_rows, choice_option_rows),
+        digest=_catalog_digest(categories, products, options, choice_options),
+        db_version=db_version,
+        verified_at=built_at,
+    )
+
+
+class CatalogCache:
+    def __init__(self, ttl_seconds: float = 300.0, version_check_seconds: float = 0.0):
+        self.ttl_seconds = ttl_seconds
+        self.version_check_seconds = version_check_seconds
+        self._version = 1
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._lock = asyncio.Lock()
+        # Dernier contenu vu : une reconstruction à l'identique garde son Last-Modified
+        self._last_digest = ""
+        self._last_modified = datetime.now(timezone.utc).replace(microsecond=0)
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def invalidate(self) -> int:
+        """À appeler après chaque écriture admin sur le catalogue."""
+        self._version += 1
+        self._snapshot = None
+        return self._version
+
+    def _is_fresh(self, snap: Optional[CatalogSnapshot]) -> bool:
+        if snap is None or snap.version != self._version:
+            return False
+        if self.ttl_seconds and time.monotonic() - snap.built_at > self.ttl_seconds:
+            return False
+        return True
+
+    async def get_snapshot(self, db: AsyncSession) -> CatalogSnapshot:
+        snap = self._snapshot
+        if self._is_fresh(snap):
+            return snap
+
+        async with self._lock:
+            # Un autre appel a peut-être reconstruit pendant qu'on attendait
+            snap = self._snapshot
+            if self._is_fresh(snap):
+                return snap
+            version = self._version
+            snap = await load_catalog_snapshot(db, version)
+            if snap.digest != self._last_digest:
+                self._last_digest = snap.digest
+                self._last_modified = datetime.now(timezone.utc).replace(microsecond=0)
+            snap.last_modified = self._last_modified
+            # Pas de stockage si une écriture admin est passée pendant le chargement
+            if version == self._version:
+                self._snapshot = snap
+            return snap
+
+    async def is_current(self, db: AsyncSession, snap: CatalogSnapshot) -> bool:
+        """
+        Le snapshot est-il à la version DB du catalogue ? Confirmé il y a moins
+        de version_check_seconds -> oui sans requête ; sinon une lecture de
+        catalog_state (une écriture ne peut donc échapper au pricing plus longtemps).
+        """
+        if snap.db_version is None:
+            return False
+        now = time.monotonic()
+        if now - snap.verified_at < self.version_check_seconds:
+            return True
+        if await read_catalog_db_version(db) != snap.db_version:
+            return False
+        snap.verified_at = now
+        return True
+
+    # --- Lectures (même signature skip/limit que les CRUD) ---
+    async def get_categories(self, db: AsyncSession, skip: int = 0, limit: int = 100):
+        snap = await self.get_snapshot(db)
+        return snap.categories[skip:skip + limit]
+
+    async def get_products(self, db: AsyncSession, skip: int = 0, limit: int = 100):
+        snap = await self.get_snapshot(db)
+        return snap.products[skip:skip + limit]
+
+    async def get_product(self, db: AsyncSession, id: int) -> Optional[ProductResponse]:
+        snap = await self.get_snapshot(db)
+        return snap.products_by_id.get(id)
+
+    async def get_options(self, db: AsyncSession, skip: int = 0, limit: int = 100):
+        snap = await self.get_snapshot(db)
+        return snap.options[skip:skip + limit]
+
+    async def get_option(self, db: AsyncSession, id: int) -> Optional[OptionResponse]:
+        snap = await self.get_snapshot(db)
+        return snap.options_by_id.get(id)
+
+    async def get_choice_options(self, db: AsyncSession, skip: int = 0, limit: int = 100):
+        snap = await self.get_snapshot(db)
+        return snap.choice_options[skip:skip + limit]
+
+    async def get_choice_option(self, db: AsyncSession, id: int) -> Optional[ChoiceOptionResponse]:
+        snap = await self.get_snapshot(db)
+        return snap.choice_options_by_id.get(id)
+
+
+catalog_cache = CatalogCache(
+    ttl_seconds=settings.CATALOG_CACHE_TTL_SECONDS,
+    version_check_seconds=settings.CATALOG_VERSION_CHECK_SECONDS,
+)
@@ -0,0 +1,80 @@
+"""
+Menu complet pré-rendu pour la vitrine (GET /api/menu).
+
+Arbre catégorie -> produits -> options -> choix, sérialisé UNE fois par
+snapshot catalogue (crud/catalog_cache.py) en bytes JSON, plus ses
+variantes gzip et brotli (si le module `brotli` est installé). Servir le
+menu revient ensuite à renvoyer des bytes déjà prêts : ni ORM, ni
+validation Pydantic, ni compression par requête.
+"""
+import asyncio
+import gzip
+import json
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from crud.catalog_cache import CatalogSnapshot, catalog_cache
+
+try:  # dépendance optionnelle
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+
+@dataclass(frozen=True)
+class RenderedMenu:
+    digest: str
+    body: bytes
+    gzip: bytes
+    br: Optional[bytes] = None
+
+
+def build_menu_tree(snap: CatalogSnapshot) -> Dict[str, Any]:
+    """Même JSON que les endpoints REST (ProductResponse...), regroupé par catégorie."""
+    by_category: Dict[Optional[int], List[Dict[str, Any]]] = {}
+    for product in snap.products:
+        data = product.model_dump(mode="json", exclude={"category"})
+        by_category.setdefault(data.get("category_id"), []).append(data)
+
+    categories = []
+    for category in snap.categories:
+        data = category.model_dump(mode="json")
+        data["products"] = by_category.pop(category.id, [])
+        categories.append(data)
+
+    uncategorized = [p for products in by_category.values() for p in products]
+    return {"categories": categories, "uncategorized": uncategorized}
+
+
+def render_menu(snap: CatalogSnapshot) -> RenderedMenu:
+    body = json.dumps(build_menu_tree(snap), separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return RenderedMenu(
+        digest=snap.digest,
+        body=body,
+        gzip=gzip.compress(body, compresslevel=9, mtime=0),
+        br=brotli.compress(body, quality=11) if brotli is not None else None,
+    )
+
+
+class MenuCache:
+    def __init__(self):
+        self._rendered: Optional[RenderedMenu] = None
+        self._lock = asyncio.Lock()
+
+    async def get(self, db: AsyncSession) -> Tuple[CatalogSnapshot, RenderedMenu]:
+        snap = await catalog_cache.get_snapshot(db)
+        rendered = self._rendered
+        if rendered is not None and rendered.digest == snap.digest:
+            return snap, rendered
+        async with self._lock:
+            rendered = self._rendered
+            if rendered is None or rendered.digest != snap.digest:
+                # Compression brotli q11 : hors de la boucle (une fois par version)
+                rendered = await asyncio.to_thread(render_menu, snap)
+                self._rendered = rendered
+        return snap, rendered
+
+
+menu_cache = MenuCache()
@@ -1,15 +1,20 @@
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Iterable, Tuple
+from datetime import datetime
+import base64
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, tuple_
 from sqlalchemy.orm import selectinload
 from fastapi import HTTPException, status
 from decimal import Decimal
-import httpx
-from geopy.distance import geodesic
-import stripe
 
 from core.config import settings
+from core.delivery import DeliveryQuote, delivery_zone
 from crud.base import CRUDBase
+from crud.geocoding import geocode_cache
+from crud.analytics import apply_order_rollup, ProductDelta, ChoiceDelta
+from crud.idempotency import idempotency_store, SCOPE_ORDER_CREATE
+from crud.stripe_outbox import enqueue as enqueue_stripe, stripe_outbox_worker, ACTION_TAG_ORDER
+from core.events import order_events, publish_order_created
 from models.models import (
     Category, Product, Option, ChoiceOption, Order, OrderItem,
     DeliveryMode, PaymentMode, OrderStatus,
@@ -19,44 +24,47 @@ from schemas.schemas import (
     CategoryCreate, CategoryUpdate, ProductCreate, ProductUpdate,
     OptionCreate, OptionUpdate,
     ChoiceOptionCreate, ChoiceOptionUpdate, OrderCreate, OrderUpdate,
+    OrderResponse, OrderItemResponse,
 )
 
-# Pricing centralisé (tacos/menus tacos + menu combo)
-from core.pricing import compute_unit_price_for_item
+# Résolution panier + pricing centralisé (tacos/menus tacos + menu combo)
+from crud.cart_resolver import resolve_cart
 
-stripe.api_key = settings.STRIPE_SECRET_KEY
 
-
-# --- Geocoding and Distance Calculation ---
+# --- Geocoding and Delivery Quote ---
 async def geocode_address(address: str):
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            "https://nominatim.openstreetmap.org/search",
-            params={"q": address, "format": "json", "limit": 1},
-        )
-        response.raise_for_status()
-        data = response.json()
-        if not data:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Could not geocode address: {address}",
-            )
-        return float(data[0]["lat"]), float(data[0]["lon"])
+    # Cache LRU + table geocode_cache, Nominatim seulement en cas de miss
+    return await geocode_cache.lookup(address)
 
 
-def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-    return geodesic((lat1, lon1), (lat2, lon2)).km
+async def quote_delivery(
+    address: str, latitude: Optional[float] = None, longitude: Optional[float] = None
+) -> DeliveryQuote:
+    """Distance / frais / zone depuis le restaurant (géocode l'adresse si pas de coordonnées)."""
+    if latitude and longitude:
+        return delivery_zone.quote(latitude, longitude)
+    lat, lon = await geocode_address(address)
+    return delivery_zone.quote(lat, lon)
 
 
-# --- UTIL snapshots choices (avec nom d'option pour l'admin) ---
-async def get_order_item_choice_snapshots(db: AsyncSession, order_item_id: int):
+async def quote_order_delivery(obj_in: OrderCreate) -> DeliveryQuote:
     """
-    Récupère les snapshots des choix d'un OrderItem + le nom/ID de l'option
-    (ex: option_name = 'Sauces', 'Suppléments', ...).
-    Aucune migration: on déduit via des JOINs.
+    Devis de livraison d'une commande (géocodage éventuel : appel Nominatim
+    possible). À calculer avant toute transaction / verrou, cf. CRUDOrder.create.
     """
-    q = (
+    # On calcule la distance quoiqu'il arrive (même si le client a proposé un fee)
+    try:
+        return await quote_delivery(obj_in.address, obj_in.latitude, obj_in.longitude)
+    except Exception:
+        # En cas d'échec de géocodage, on laisse 0.0 (mais tu peux choisir de lever 400 si tu préfères)
+        return delivery_zone.quote(delivery_zone.lat, delivery_zone.lng)
+
+
+# --- UTIL snapshots choices (avec nom d'option pour l'admin) ---
+def _choice_snapshots_query():
+    return (
         select(
+            order_item_choices_association.c.order_item_id,
             order_item_choices_association.c.choice_option_id,
             order_item_choices_association.c.choice_name_snapshot,
             order_item_choices_association.c.choice_price_modifier_snapshot,
@@ -65,21 +73,154 @@ async def get_order_item_choice_snapshots(db: AsyncSession, order_item_id: int):
         )
         .join(ChoiceOption, ChoiceOption.id == order_item_choices_association.c.choice_option_id)
         .join(Option, Option.id == ChoiceOption.option_id)
-        .where(order_item_choices_association.c.order_item_id == order_item_id)
+    )
+
+
+def _snapshot_row_to_dict(row) -> dict:
+    return {
+        "choice_option_id": row.choice_option_id,
+        "choice_name_snapshot": row.choice_name_snapshot,
+        "choice_price_modifier_snapshot": row.choice_price_modifier_snapshot,
+        "option_id": row.option_id,
+        "option_name": row.option_name,
+    }
+
+
+async def get_order_item_choice_snapshots(db: AsyncSession, order_item_id: int):
+    """
+    Récupère les snapshots des choix d'un OrderItem + le nom/ID de l'option
+    (ex: option_name = 'Sauces', 'Suppléments', ...).
+    Aucune migration: on déduit via des JOINs.
+    """
+    q = _choice_snapshots_query().where(
+        order_item_choices_association.c.order_item_id == order_item_id
     )
     res = await db.execute(q)
-    rows = res.fetchall()
+    return [_snapshot_row_to_dict(row) for row in res.fetchall()]
+
+
+async def get_order_items_choice_snapshots_bulk(
+    db: AsyncSession, order_item_ids: Iterable[int]
+) -> Dict[int, List[dict]]:
+    """
+    Même chose que get_order_item_choice_snapshots, mais pour N items
+    en UNE seule requête (évite le N+1 sur la liste admin).
+    Retourne {order_item_id: [snapshots...]} (liste vide si aucun choix).
+    """
+    ids = list(dict.fromkeys(order_item_ids))
+    snapshots: Dict[int, List[dict]] = {item_id: [] for item_id in ids}
+    if not ids:
+        return snapshots
+
+    q = _choice_snapshots_query().where(
+        order_item_choices_association.c.order_item_id.in_(ids)
+    )
+    res = await db.execute(q)
+    for row in res.fetchall():
+        snapshots[row.order_item_id].append(_snapshot_row_to_dict(row))
+    return snapshots
+
+
+async def attach_choice_snapshots(db: AsyncSession, orders: Iterable[Order]) -> None:
+    """
+    Attache `_choice_snapshots` à chaque OrderItem des commandes données
+    (utilisé par map_order_to_response).
+    """
+    items = [item for order in orders for item in order.order_items]
+    snapshots = await get_order_items_choice_snapshots_bulk(db, (item.id for item in items))
+    for item in items:
+        item._choice_snapshots = snapshots.get(item.id, [])
+
+
+# --- ORM -> réponse API (snapshots déjà attachés) ---
+def map_order_to_response(order: Order) -> OrderResponse:
+    items: List[OrderItemResponse] = []
+    for it in order.order_items:
+        snaps = getattr(it, "_choice_snapshots", None) or []
+        items.append(
+            OrderItemResponse(
+                id=it.id,
+                order_id=it.order_id,
+                product_id=it.product_id,
+                product_name_snapshot=it.product_name_snapshot,
+                base_price_snapshot=it.base_price_snapshot,
+                quantity=it.quantity,
+                item_total=it.item_total,
+                created_at=it.created_at,
+                updated_at=it.updated_at,
+                choice_options=snaps,
+                product=None,
+            )
+        )
+    return OrderResponse(
+        id=order.id,
+        name=order.name,
+        address=order.address,
+        phone=order.phone,
+        delivery_mode=order.delivery_mode,
+        payment_mode=order.payment_mode,
+        fee=order.fee,
+        latitude=None,
+        longitude=None,
+        total=order.total,
+        status=order.status,
+        created_at=order.created_at,
+        updated_at=order.updated_at,
+        order_items=items,
+    )
 
-    return [
-        {
-            "choice_option_id": row.choice_option_id,
-            "choice_name_snapshot": row.choice_name_snapshot,
-            "choice_price_modifier_snapshot": row.choice_price_modifier_snapshot,
-            "option_id": row.option_id,
-            "option_name": row.option_name,
-        }
-        for row in rows
-    ]
+
+def order_to_dict(order: Order) -> dict:
+    """
+    Même JSON que map_order_to_response, sans passer par Pydantic
+    (chemin rapide des listes, cf. core/fast_json.py).
+    """
+    return {
+        "created_at": order.created_at,
+        "updated_at": order.updated_at,
+        "name": order.name,
+        "address": order.address,
+        "phone": order.phone,
+        "delivery_mode": order.delivery_mode,
+        "payment_mode": order.payment_mode,
+        "fee": order.fee,
+        "latitude": None,
+        "longitude": None,
+        "id": order.id,
+        "total": order.total,
+        "status": order.status,
+        "order_items": [
+            {
+                "id": it.id,
+                "order_id": it.order_id,
+                "product_id": it.product_id,
+                "product_name_snapshot": it.product_name_snapshot,
+                "base_price_snapshot": it.base_price_snapshot,
+                "quantity": it.quantity,
+                "item_total": it.item_total,
+                "created_at": it.created_at,
+                "updated_at": it.updated_at,
+                "choice_options": getattr(it, "_choice_snapshots", None) or [],
+                "product": None,
+            }
+            for it in order.order_items
+        ],
+    }
+
+
+# --- Curseur keyset des commandes : base64url("<created_at iso>|<id>") ---
+def encode_order_cursor(order: Order) -> str:
+    raw = f"{order.created_at.isoformat()}|{order.id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_order_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, order_id = base64.urlsafe_b64decode(padded).decode("utf-8").rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(order_id)
+    except Exception:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Curseur invalide.")
 
 
 # --- CRUD ---
@@ -137,126 +278,48 @@ class CRUDChoiceOption(CRUDBase[ChoiceOption, ChoiceOptionCreate, ChoiceOptionUp
 
 
 class CRUDOrder(CRUDBase[Order, OrderCreate, OrderUpdate]):
-    async def create(self, db: AsyncSession, obj_in: OrderCreate):
-        # Maps
-        products_map: Dict[int, Product] = {}
-        options_map: Dict[int, Option] = {}
-        choice_options_map: Dict[int, ChoiceOption] = {}
-
-        product_ids = [item.product_id for item in obj_in.items]
-        choice_option_ids = [
-            ch.choice_option_id
-            for item in obj_in.items if item.choices
-            for ch in item.choices
-        ]
-        option_ids_from_choices = [
-            ch.option_id
-            for item in obj_in.items if item.choices
-            for ch in item.choices
-        ]
-
-        if product_ids:
-            products_result = await db.execute(
-                select(Product).filter(Product.id.in_(product_ids))
-            )
-            products_map = {p.id: p for p in products_result.scalars().all()}
-
-        if option_ids_from_choices:
-            options_result = await db.execute(
-                select(Option).filter(Option.id.in_(option_ids_from_choices))
-            )
-            options_map = {o.id: o for o in options_result.scalars().all()}
+    async def create(
+        self,
+        db: AsyncSession,
+        obj_in: OrderCreate,
+        payment_intent_id: Optional[str] = None,
+        idempotency_key: Optional[str] = None,
+        quote: Optional[DeliveryQuote] = None,
+    ):
+        """`quote` : devis déjà calculé (quote_order_delivery), sinon calculé ici."""
+        # Devis (géocodage possible) avant la première requête : pas de transaction ouverte pendant l'attente
+        if quote is None:
+            quote = await quote_order_delivery(obj_in)
 
-        if choice_option_ids:
-            choice_options_result = await db.execute(
-                select(ChoiceOption).filter(ChoiceOption.id.in_(choice_option_ids))
-            )
-            choice_options_map = {co.id: co for co in choice_options_result.scalars().all()}
-
-        # ---- map "nom (choice) -> Product (avec .category)" pour Menu Combo
-        choice_names = set()
-        for item_req in obj_in.items:
-            if item_req.choices:
-                for ch in item_req.choices:
-                    co = choice_options_map.get(ch.choice_option_id)
-                    if co and getattr(co, "name", None):
-                        choice_names.add(co.name.strip())
-
-        products_by_name: Dict[str, Product] = {}
-        if choice_names:
-            res = await db.execute(
-                select(Product)
-                .options(selectinload(Product.category))
-                .where(Product.name.in_(list(choice_names)))
-            )
-            products_by_name = {(p.name or "").strip().lower(): p for p in res.scalars().all()}
+        # Produits / choix / prix unitaires (cache catalogue, fallback DB)
+        cart = await resolve_cart(db, obj_in.items)
 
         # Items & total
         db_order_items: List[OrderItem] = []
-        order_total_items_sum = Decimal("0.00")
-
-        for item_req in obj_in.items:
-            product = products_map.get(item_req.product_id)
-            if not product:
-                raise HTTPException(status_code=400, detail=f"Product with ID {item_req.product_id} not found.")
-
-            # Pricing centralisé (tacos/menu tacos + menu combo + autres produits)
-            unit_price = compute_unit_price_for_item(
-                product,
-                item_req.choices,
-                options_map,
-                choice_options_map,
-                products_by_name,  # important pour Menu Combo (catégorie du burger choisi)
-            )
-            qty = int(item_req.quantity or 1)
-            item_total_for_quantity = unit_price * qty
-            order_total_items_sum += item_total_for_quantity
+        order_total_items_sum = cart.items_total
 
+        for line in cart.lines:
             db_order_item = OrderItem(
-                product_id=product.id,
-                product_name_snapshot=product.name,
-                base_price_snapshot=Decimal(str(product.base_price)),
-                quantity=qty,
-                item_total=item_total_for_quantity,
+                product_id=line.product.id,
+                product_name_snapshot=line.product.name,
+                base_price_snapshot=line.product.base_price,
+                quantity=line.quantity,
+                item_total=line.line_total,
             )
             db_order_items.append(db_order_item)
 
         # ----------------------- GÉO-FENCING / FRAIS -----------------------
-        # Rayon de livraison autorisé (km). Si non défini dans Settings, fallback 8.0 km.
-        radius_km = float(getattr(settings, "DELIVERY_MAX_KM", 8.0))
-
-        # On calcule la distance quoiqu'il arrive (même si le client a proposé un fee)
-        distance_km = 0.0
-        try:
-            if obj_in.latitude and obj_in.longitude:
-                distance_km = calculate_distance(
-                    settings.RESTAURANT_LAT, settings.RESTAURANT_LNG,
-                    float(obj_in.latitude), float(obj_in.longitude),
-                )
-            else:
-                lat, lon = await geocode_address(obj_in.address)
-                distance_km = calculate_distance(
-                    settings.RESTAURANT_LAT, settings.RESTAURANT_LNG, lat, lon,
-                )
-        except Exception:
-            # En cas d'échec de géocodage, on laisse 0.0 (mais tu peux choisir de lever 400 si tu préfères)
-            distance_km = 0.0
-
         # Blocage hors zone
-        if distance_km > radius_km:
+        if not quote.in_zone:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Hors zone de livraison : {distance_km:.1f} km > {radius_km:.1f} km.",
+                detail=f"Hors zone de livraison : {quote.distance_km:.1f} km > {delivery_zone.max_km:.1f} km.",
             )
 
         # Fee
         final_fee = Decimal(str(obj_in.fee or 0))
         if final_fee <= 0:
-            calc_fee = (
-                settings.DELIVERY_BASE_FEE
-                + settings.DELIVERY_PER_KM_FEE * Decimal(str(distance_km))
-            )
-            final_fee = calc_fee.quantize(Decimal("0.01"))
+            final_fee = quote.fee
         # -------------------------------------------------------------------
 
         # Order
@@ -269,27 +332,62 @@ class CRUDOrder(CRUDBase[Order, OrderCreate, OrderUpdate]):
             fee=final_fee,
             total=(order_total_items_sum + final_fee),
             status=OrderStatus.pending if obj_in.payment_mode == PaymentMode.cb else OrderStatus.preparing,
+            payment_intent_id=payment_intent_id,
         )
         db_order.order_items.extend(db_order_items)
         db.add(db_order)
-        await db.flush()  # IDs d'items
-
-        # Snapshots des choix (NULL-safe)
-        for db_item, item_req in zip(db_order_items, obj_in.items):
-            if item_req.choices:
-                for choice_req in item_req.choices:
-                    co = choice_options_map.get(choice_req.choice_option_id)
-                    if not co:
-                        continue
-                    await db.execute(
-                        order_item_choices_association.insert().values(
-                            order_item_id=db_item.id,
-                            choice_option_id=co.id,
-                            choice_name_snapshot=co.name,
-                            choice_price_modifier_snapshot=Decimal(str(getattr(co, "price_modifier", 0) or 0)),
-                        )
-                    )
+        await db.flush()  # IDs d'items, created_at (horloge DB)
+
+        # Marquage du PaymentIntent (order_id) : outbox, même transaction, envoyé par le worker
+        if payment_intent_id:
+            enqueue_stripe(db, ACTION_TAG_ORDER, payment_intent_id, {"order_id": db_order.id})
+
+        # Snapshots des choix (NULL-safe) : un seul INSERT multi-lignes (executemany)
+        snapshot_rows = []
+        snapshots_by_item: Dict[int, List[dict]] = {}
+        for db_item, line in zip(db_order_items, cart.lines):
+            item_snaps = snapshots_by_item.setdefault(db_item.id, [])
+            for co in line.choices:
+                snapshot_rows.append({
+                    "order_item_id": db_item.id,
+                    "choice_option_id": co.id,
+                    "choice_name_snapshot": co.name,
+                    "choice_price_modifier_snapshot": co.modifier,
+                })
+                item_snaps.append({
+                    "choice_option_id": co.id,
+                    "choice_name_snapshot": co.name,
+                    "choice_price_modifier_snapshot": co.modifier,
+                    "option_id": co.option_id,
+                    "option_name": co.option_name,
+                })
+        if snapshot_rows:
+            await db.execute(order_item_choices_association.insert(), snapshot_rows)
+
+        # Rollups analytics, dans la même transaction que la commande. Bucket tiré
+        # de created_at (comme l'annulation et le backfill), pas de l'horloge du process.
+        await apply_order_rollup(
+            db,
+            db_order.created_at,
+            db_order.total,
+            db_order.fee,
+            products=[
+                ProductDelta(line.product.id, line.product.name, line.quantity, line.line_total)
+                for line in cart.lines
+            ],
+            choices=[
+                ChoiceDelta(co.id, co.name, line.quantity)
+                for line in cart.lines
+                for co in line.choices
+            ],
+        )
+        # Clé d'idempotence liée à la commande dans la même transaction :
+        # un échec après ce commit ne la libère plus (pas de doublon au retry)
+        if idempotency_key:
+            await idempotency_store.bind_order(db, SCOPE_ORDER_CREATE, idempotency_key, db_order.id)
         await db.commit()
+        if payment_intent_id:
+            stripe_outbox_worker.notify()
 
         # Recharger avec relations nécessaires
         result = await db.execute(
@@ -301,33 +399,90 @@ class CRUDOrder(CRUDBase[Order, OrderCreate, OrderUpdate]):
         )
         db_order_full = result.scalar_one()
 
-        # Attacher les snapshots (avec option_name) pour Pydantic
+        # Attacher les snapshots (avec option_name) pour Pydantic, déjà en mémoire
         for item in db_order_full.order_items:
-            item._choice_snapshots = await get_order_item_choice_snapshots(db, item.id)
+            item._choice_snapshots = snapshots_by_item.get(item.id, [])
+
+        # Flux temps réel admin (SSE) ; rien à sérialiser sans abonné
+        if order_events.subscriber_count:
+            publish_order_created(map_order_to_response(db_order_full))
 
         return db_order_full
 
+    async def get_with_relations(self, db: AsyncSession, id: int):
+        result = await db.execute(
+            select(Order).options(selectinload(Order.order_items)).where(Order.id == id)
+        )
+        order = result.scalar_one_or_none()
+        if order:
+            await attach_choice_snapshots(db, [order])
+        return order
+
+    async def get_for_update(self, db: AsyncSession, id: int) -> Optional[Order]:
+        """
+        Commande verrouillée (FOR UPDATE) jusqu'à la fin de la transaction :
+        deux changements de statut concurrents sont sérialisés, le second lit
+        le statut écrit par le premier.
+        """
+        result = await db.execute(
+            select(Order)
+            .where(Order.id == id)
+            .with_for_update()
+            .execution_options(populate_existing=True)
+        )
+        return result.scalar_one_or_none()
+
+    async def get_by_payment_intent(self, db: AsyncSession, payment_intent_id: str):
+        result = await db.execute(
+            select(Order)
+            .options(selectinload(Order.order_items))
+            .where(Order.payment_intent_id == payment_intent_id)
+        )
+        order = result.scalar_one_or_none()
+        if order:
+            await attach_choice_snapshots(db, [order])
+        return order
+
     async def get_multi_with_relations(
         self,
         db: AsyncSession,
         skip: int = 0,
         limit: int = 100,
         status: Optional[OrderStatus] = None,
+        payment_mode: Optional[PaymentMode] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+        cursor: Optional[str] = None,
     ):
+        """
+        Plus récentes d'abord, ordre stable (created_at DESC, id DESC).
+        `cursor` (keyset, cf. encode_order_cursor) remplace `skip` : coût constant
+        quelle que soit la profondeur de page.
+        """
         query = (
             select(Order)
             .options(selectinload(Order.order_items))
-            .offset(skip)
+            .order_by(Order.created_at.desc(), Order.id.desc())
             .limit(limit)
         )
         if status:
             query = query.where(Order.status == status)
+        if payment_mode:
+            query = query.where(Order.payment_mode == payment_mode)
+        if created_from:
+            query = query.where(Order.created_at >= created_from)
+        if created_to:
+            query = query.where(Order.created_at < created_to)
+        if cursor:
+            cur_created_at, cur_id = decode_order_cursor(cursor)
+            query = query.where(tuple_(Order.created_at, Order.id) < tuple_(cur_created_at, cur_id))
+        elif skip:
+            query = query.offset(skip)
         result = await db.execute(query)
         orders = result.scalars().unique().all()
 
-        for order in orders:
-            for item in order.order_items:
-                item._choice_snapshots = await get_order_item_choice_snapshots(db, item.id)
+        # Snapshots de tous les items en une seule requête (pas de N+1)
+        await attach_choice_snapshots(db, orders)
 
         return orders
 
@@ -0,0 +1,195 @@
+"""
+Géocodage avec cache.
+
+Ordre de résolution d'une adresse :
+1) LRU en mémoire (borné, GEOCODE_CACHE_MAX_ENTRIES)
+2) table `geocode_cache` (TTL GEOCODE_CACHE_TTL_DAYS)
+3) appel au géocodeur externe (Nominatim via le client partagé
+   core.http_client.geocoding_http), résultat écrit en DB + LRU
+
+Les clés sont calculées sur l'adresse normalisée (casse, accents,
+ponctuation, espaces), et les recherches concurrentes d'une même adresse
+partagent un seul appel externe.
+"""
+import asyncio
+import hashlib
+import logging
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from core.config import settings
+from core.http_client import geocoding_http
+from database.session import AsyncSessionLocal
+from models.models import GeocodeCacheEntry
+
+logger = logging.getLogger(__name__)
+
+Coords = Tuple[float, float]
+Geocoder = Callable[[str], Awaitable[Coords]]
+
+_PUNCT_RE = re.compile(r"[,;.\-/'’\"()]+")
+_SPACES_RE = re.compile(r"\s+")
+
+
+def normalize_address(address: str) -> str:
+    """'12, Rue de la République  34000 MONTPELLIER' -> '12 rue de la republique 34000 montpellier'"""
+    s = unicodedata.normalize("NFKD", address or "")
+    s = "".join(c for c in s if not unicodedata.combining(c))
+    s = _PUNCT_RE.sub(" ", s.lower())
+    return _SPACES_RE.sub(" ", s).strip()
+
+
+def address_key(normalized: str) -> str:
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+async def nominatim_geocode(address: str) -> Coords:
+    # Client partagé : pool, timeouts et 1 req/s (cf. core/http_client.py)
+    response = await geocoding_http.get(
+        "/search",
+        params={"q": address, "format": "json", "limit": 1},
+    )
+    response.raise_for_status()
+    data = response.json()
+    if not data:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Could not geocode address: {address}",
+        )
+    return float(data[0]["lat"]), float(data[0]["lon"])
+
+
+class GeocodeCache:
+    def __init__(
+        self,
+        geocoder: Geocoder,
+        ttl: timedelta,
+        max_entries: int = 2048,
+        session_factory=AsyncSessionLocal,
+    ):
+        self.geocoder = geocoder
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.session_factory = session_factory  # None = pas de persistance DB
+        self._lru: "OrderedDict[str, Tuple[Coords, float]]" = OrderedDict()
+        self._inflight: Dict[str, "asyncio.Task[Coords]"] = {}
+
+    # --- LRU mémoire ---
+    def _lru_get(self, key: str) -> Optional[Coords]:
+        hit = self._lru.get(key)
+        if hit is None:
+            return None
+        coords, expires_at = hit
+        if expires_at < time.monotonic():
+            del self._lru[key]
+            return None
+        self._lru.move_to_end(key)
+        return coords
+
+    def _lru_put(self, key: str, coords: Coords, ttl_seconds: float) -> None:
+        self._lru[key] = (coords, time.monotonic() + ttl_seconds)
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    def clear(self) -> None:
+        self._lru.clear()
+
+    # --- Table geocode_cache ---
+    async def _db_get(self, key: str) -> Optional[Tuple[Coords, datetime]]:
+        if self.session_factory is None:
+            return None
+        try:
+            async with self.session_factory() as db:
+                res = await db.execute(
+                    select(GeocodeCacheEntry).where(
+                        GeocodeCacheEntry.address_key == key,
+                        GeocodeCacheEntry.expires_at > datetime.now(timezone.utc),
+                    )
+                )
+                entry = res.scalar_one_or_none()
+                if entry is None:
+                    return None
+                return (entry.latitude, entry.longitude), entry.expires_at
+        except Exception:
+            logger.exception("geocode_cache: lecture DB impossible")
+            return None
+
+    async def _db_put(self, key: str, normalized: str, coords: Coords) -> None:
+        if self.session_factory is None:
+            return
+        expires_at = datetime.now(timezone.utc) + self.ttl
+        stmt = pg_insert(GeocodeCacheEntry).values(
+            address_key=key,
+            normalized_address=normalized,
+            latitude=coords[0],
+            longitude=coords[1],
+            expires_at=expires_at,
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[GeocodeCacheEntry.address_key],
+            set_={
+                "latitude": stmt.excluded.latitude,
+                "longitude": stmt.excluded.longitude,
+                "expires_at": stmt.excluded.expires_at,
+            },
+        )
+        try:
+            async with self.session_factory() as db:
+                await db.execute(stmt)
+                await db.commit()
+        except Exception:
+            logger.exception("geocode_cache: écriture DB impossible")
+
+    # --- API ---
+    async def _resolve(self, key: str, normalized: str, address: str) -> Coords:
+        stored = await self._db_get(key)
+        if stored is not None:
+            coords, expires_at = stored
+            remaining = (expires_at - datetime.now(timezone.utc)).total_seconds()
+            self._lru_put(key, coords, remaining)
+            return coords
+
+        coords = await self.geocoder(address)
+        await self._db_put(key, normalized, coords)
+        self._lru_put(key, coords, self.ttl.total_seconds())
+        return coords
+
+    async def lookup(self, address: str) -> Coords:
+        normalized = normalize_address(address)
+        key = address_key(normalized)
+
+        coords = self._lru_get(key)
+        if coords is not None:
+            return coords
+
+        # Même adresse déjà en cours de résolution -> on attend le même résultat.
+        # La résolution tourne dans sa propre tâche : l'annulation d'un appelant
+        # (client déconnecté, timeout) n'interrompt pas les autres.
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._resolve(key, normalized, address))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t, key=key: self._forget(key, t))
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: "asyncio.Task[Coords]") -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # évite "exception was never retrieved" si tous les appelants sont partis
+
+
+geocode_cache = GeocodeCache(
+    geocoder=nominatim_geocode,
+    ttl=timedelta(days=settings.GEOCODE_CACHE_TTL_DAYS),
+    max_entries=settings.GEOCODE_CACHE_MAX_ENTRIES,
+)
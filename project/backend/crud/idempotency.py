@@ -0,0 +1,130 @@
+"""
+Store d'idempotence local (table idempotency_keys).
+
+POST /orders/ : clé = en-tête `Idempotency-Key`. La réponse JSON est
+stockée et rejouée telle quelle (même code HTTP) sur un retry ; la même
+clé avec un autre contenu est refusée. (Les commandes CB sont dédoublonnées
+par orders.payment_intent_id, cf. crud/payment_orders.py.)
+
+La prise de clé est un INSERT ... ON CONFLICT sur la PK (scope, key) : deux
+requêtes concurrentes ne peuvent pas l'obtenir toutes les deux. Une clé
+restée 'processing' plus de IDEMPOTENCY_LOCK_SECONDS (crash en plein
+traitement) peut être reprise, sauf si la commande a déjà été commitée :
+bind_order() y inscrit order_id dans la transaction de la commande, et une
+clé liée à une commande n'est plus jamais libérée ni reprise.
+"""
+import hashlib
+import json
+from datetime import timedelta
+from typing import Any, Optional
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import select, update, delete, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import settings
+from models.models import IdempotencyKey
+
+SCOPE_ORDER_CREATE = "orders.create"
+
+STATE_PROCESSING = "processing"
+STATE_DONE = "done"
+
+
+def request_fingerprint(payload: Any) -> str:
+    """sha256 du corps de requête canonique (clés triées)."""
+    raw = json.dumps(jsonable_encoder(payload), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class IdempotencyStore:
+    def __init__(self, lock_seconds: int = 60):
+        self.lock_seconds = lock_seconds
+
+    async def get(self, db: AsyncSession, scope: str, key: str) -> Optional[IdempotencyKey]:
+        res = await db.execute(
+            select(IdempotencyKey).where(IdempotencyKey.scope == scope, IdempotencyKey.key == key)
+        )
+        return res.scalar_one_or_none()
+
+    async def claim(
+        self, db: AsyncSession, scope: str, key: str, request_hash: Optional[str] = None
+    ) -> Optional[IdempotencyKey]:
+        """
+        None = clé obtenue par l'appelant (à terminer par complete() ou release()).
+        Sinon : l'enregistrement existant (déjà traité ou en cours ailleurs).
+        Commit la transaction courante.
+        """
+        for _ in range(2):
+            stmt = pg_insert(IdempotencyKey).values(
+                scope=scope, key=key, request_hash=request_hash, state=STATE_PROCESSING,
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[IdempotencyKey.scope, IdempotencyKey.key],
+                set_={"request_hash": stmt.excluded.request_hash, "updated_at": func.now()},
+                where=(
+                    (IdempotencyKey.state == STATE_PROCESSING)
+                    & IdempotencyKey.order_id.is_(None)
+                    & (IdempotencyKey.updated_at < func.now() - timedelta(seconds=self.lock_seconds))
+                ),
+            ).returning(IdempotencyKey.key)
+            res = await db.execute(stmt)
+            claimed = res.scalar_one_or_none() is not None
+            await db.commit()
+            if claimed:
+                return None
+            existing = await self.get(db, scope, key)
+            if existing is not None:
+                return existing
+            # Libérée entre l'INSERT et la lecture : on retente une fois
+        return await self.get(db, scope, key)
+
+    async def bind_order(self, db: AsyncSession, scope: str, key: str, order_id: int) -> None:
+        """Lie la clé à la commande, dans la transaction qui la crée. Ne commit pas."""
+        await db.execute(
+            update(IdempotencyKey)
+            .where(IdempotencyKey.scope == scope, IdempotencyKey.key == key)
+            .values(order_id=order_id, updated_at=func.now())
+        )
+
+    async def complete(
+        self,
+        db: AsyncSession,
+        scope: str,
+        key: str,
+        order_id: Optional[int],
+        status_code: Optional[int] = None,
+        response_body: Optional[str] = None,
+    ) -> None:
+        await db.execute(
+            update(IdempotencyKey)
+            .where(IdempotencyKey.scope == scope, IdempotencyKey.key == key)
+            .values(
+                state=STATE_DONE,
+                order_id=order_id,
+                status_code=status_code,
+                response_body=response_body,
+                updated_at=func.now(),
+            )
+        )
+        await db.commit()
+
+    async def release(self, db: AsyncSession, scope: str, key: str) -> None:
+        """
+        Échec du traitement : la clé redevient libre pour un retry, sauf si la
+        commande a été commitée (clé liée par bind_order) : elle reste prise.
+        """
+        await db.rollback()
+        await db.execute(
+            delete(IdempotencyKey).where(
+                IdempotencyKey.scope == scope,
+                IdempotencyKey.key == key,
+                IdempotencyKey.state == STATE_PROCESSING,
+                IdempotencyKey.order_id.is_(None),
+            )
+        )
+        await db.commit()
+
+
+idempotency_store = IdempotencyStore(lock_seconds=settings.IDEMPOTENCY_LOCK_SECONDS)
@@ -0,0 +1,177 @@
+"""
+Matérialisation des commandes CB à partir d'un PaymentIntent Stripe.
+
+Point d'entrée unique pour le webhook Stripe et /orders/capture : les deux
+chemins peuvent recevoir le même PaymentIntent en même temps.
+
+- `orders.payment_intent_id` est UNIQUE : le second arrivé retrouve la
+  commande par une lecture indexée, sans aller-retour Stripe.
+- la création se fait sous un verrou consultatif transactionnel
+  (pg_advisory_xact_lock) propre au PI : le second chemin attend le commit
+  du premier au lieu de re-tarifer le panier pour rien. Le devis de
+  livraison (géocodage Nominatim possible, 1 req/s) est calculé AVANT le
+  verrou : sous le verrou, uniquement des lectures / écritures DB.
+- l'unicité reste le garde-fou final (IntegrityError -> commande existante).
+
+Porte aussi l'encodage / décodage de la commande dans la metadata du
+PaymentIntent (core/order_codec.py + table order_drafts), commun aux deux
+chemins. Les brouillons sont purgés après ORDER_DRAFT_TTL_HOURS par
+OrderDraftPruner (worker de fond) : au-delà, Stripe ne relivre plus le
+webhook et la page de retour /capture n'est plus appelée.
+"""
+import hashlib
+import logging
+from datetime import timedelta
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi.encoders import jsonable_encoder
+
+from sqlalchemy import select, delete, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.background import PollingWorker
+from core.config import settings
+from core.events import publish_order_status
+from core.order_codec import (
+    pack_order, unpack_order, encode_inline, encode_draft, draft_id_from_metadata, decode_inline,
+)
+from crud.crud_operations import order_crud, quote_order_delivery
+from database.session import AsyncSessionLocal
+from models.models import Order, OrderDraft, OrderStatus, PaymentMode
+from schemas.schemas import OrderCreate
+
+logger = logging.getLogger(__name__)
+
+# Clés ajoutées plus tard par l'outbox (ACTION_TAG_ORDER) : order_created, order_id
+_OUTBOX_METADATA_KEYS = 2
+
+
+def _lock_key(payment_intent_id: str) -> int:
+    """Clé bigint (signée) stable pour pg_advisory_xact_lock."""
+    digest = hashlib.sha256(payment_intent_id.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big", signed=True)
+
+
+class PaymentOrderService:
+    def __init__(self, metadata_mode: str = "inline"):
+        self.metadata_mode = metadata_mode
+
+    # --- Commande <-> metadata du PaymentIntent ---
+    async def encode_metadata(self, db: AsyncSession, order_in: OrderCreate) -> Dict[str, str]:
+        blob = pack_order(jsonable_encoder(order_in))
+        if self.metadata_mode != "draft":
+            md = encode_inline(blob, reserved_keys=_OUTBOX_METADATA_KEYS)
+            if md is not None:
+                return md
+        # Mode brouillon (ou panier trop gros pour les 50 clés Stripe)
+        draft = OrderDraft(payload=blob)
+        db.add(draft)
+        await db.commit()
+        return encode_draft(draft.id)
+
+    async def decode_metadata(self, db: AsyncSession, md: Dict[str, Any]) -> OrderCreate:
+        """Lève ValueError / ValidationError si la metadata ne décrit pas une commande."""
+        draft_id = draft_id_from_metadata(md)
+        if draft_id is None:
+            return OrderCreate(**decode_inline(md))
+        draft = await db.get(OrderDraft, draft_id)
+        if draft is None:
+            raise ValueError(f"Brouillon de commande {draft_id} introuvable.")
+        return OrderCreate(**unpack_order(draft.payload))
+
+    # --- Matérialisation ---
+    async def get(self, db: AsyncSession, payment_intent_id: str) -> Optional[Order]:
+        return await order_crud.get_by_payment_intent(db, payment_intent_id)
+
+    async def materialize(
+        self, db: AsyncSession, payment_intent_id: str, order_in: OrderCreate
+    ) -> Tuple[Order, bool]:
+        """Retourne (commande, créée_maintenant). Idempotent par payment_intent_id."""
+        existing = await self.get(db, payment_intent_id)
+        if existing is not None:
+            return existing, False
+        # Hors transaction / verrou : peut attendre le géocodeur
+        await db.commit()
+        quote = await quote_order_delivery(order_in)
+        try:
+            await db.execute(select(func.pg_advisory_xact_lock(_lock_key(payment_intent_id))))
+            existing = await self.get(db, payment_intent_id)
+            if existing is not None:
+                await db.commit()  # libère le verrou
+                return existing, False
+            # create() commit -> libère le verrou une fois la commande visible
+            order = await order_crud.create(
+                db, obj_in=order_in, payment_intent_id=payment_intent_id, quote=quote
+            )
+            return order, True
+        except IntegrityError:
+            await db.rollback()
+            existing = await self.get(db, payment_intent_id)
+            if existing is None:
+                raise
+            return existing, False
+        except Exception:
+            await db.rollback()
+            raise
+
+    async def attach(self, db: AsyncSession, order: Order, payment_intent_id: str) -> None:
+        """Commandes antérieures à la colonne (order_id en metadata) : on renseigne le PI."""
+        if order.payment_intent_id:
+            return
+        order.payment_intent_id = payment_intent_id
+        try:
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+
+    async def promote_if_paid(self, db: AsyncSession, order: Order, succeeded: bool) -> None:
+        """Paiement confirmé : commande CB 'pending' -> 'preparing' (jamais de retour arrière)."""
+        if succeeded and order.payment_mode == PaymentMode.cb and order.status == OrderStatus.pending:
+            order.status = OrderStatus.preparing
+            await db.commit()
+            await db.refresh(order)
+            publish_order_status(order.id, order.status)
+
+
+class OrderDraftPruner(PollingWorker):
+    """Supprime les brouillons plus vieux que `ttl`, par lots (index sur created_at)."""
+
+    name = "order_drafts"
+
+    def __init__(
+        self,
+        ttl: timedelta,
+        session_factory=AsyncSessionLocal,
+        poll_interval: float = 3600.0,
+        batch_size: int = 500,
+    ):
+        super().__init__(poll_interval, batch_size)
+        self.ttl = ttl
+        self.session_factory = session_factory
+        # Métriques (process)
+        self.pruned_total = 0
+
+    async def drain_once(self) -> int:
+        expired = (
+            select(OrderDraft.id)
+            .where(OrderDraft.created_at < func.now() - self.ttl)
+            .order_by(OrderDraft.id)
+            .limit(self.batch_size)
+            .scalar_subquery()
+        )
+        async with self.session_factory() as db:
+            res = await db.execute(
+                delete(OrderDraft)
+                .where(OrderDraft.id.in_(expired))
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+        if res.rowcount:
+            self.pruned_total += res.rowcount
+            logger.info("order_drafts: %s brouillon(s) expiré(s) supprimé(s)", res.rowcount)
+        return res.rowcount or 0
+
+
+payment_order_service = PaymentOrderService(metadata_mode=settings.STRIPE_METADATA_MODE)
+order_draft_pruner = OrderDraftPruner(ttl=timedelta(hours=settings.ORDER_DRAFT_TTL_HOURS))
@@ -0,0 +1,245 @@
+"""
+File locale des évènements Stripe (table stripe_events).
+
+Le webhook ne fait que vérifier la signature, écrire l'évènement brut
+(dédoublonné par son id `evt_...`) et répondre 200 : sa latence ne dépend
+plus ni de la DB des commandes, ni du géocodage, ni de Stripe.
+
+Un consommateur de fond (un par process, démarré dans main.py) traite les
+évènements dans leur ordre de réception :
+- prise d'un lot par UPDATE ... WHERE id IN (SELECT ... FOR UPDATE SKIP
+  LOCKED) : statut 'processing' + bail (next_attempt_at) ; un évènement dont
+  le bail expire (crash) est repris
+- erreur transitoire -> retry avec backoff exponentiel ; erreur définitive
+  (metadata invalide, panier refusé) ou STRIPE_EVENTS_MAX_ATTEMPTS atteint
+  -> 'dead'
+- replay_event() remet n'importe quel évènement stocké en file
+  (POST /api/stripe-events/{id}/replay)
+"""
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import select, update, func, or_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.background import PollingWorker
+from core.config import settings
+from crud.crud_operations import order_crud
+from crud.payment_orders import payment_order_service
+from database.session import AsyncSessionLocal
+from models.models import StripeEvent
+
+logger = logging.getLogger(__name__)
+
+HANDLED_TYPES = ("payment_intent.succeeded", "payment_intent.processing")
+
+STATUS_PENDING = "pending"
+STATUS_PROCESSING = "processing"
+STATUS_DONE = "done"
+STATUS_IGNORED = "ignored"
+STATUS_DEAD = "dead"
+
+_LEASE_SECONDS = 300
+
+
+class PermanentEventError(Exception):
+    """Un nouvel essai donnerait le même résultat : l'évènement part en 'dead'."""
+
+
+# --- Écriture (webhook) ---
+async def record_event(db: AsyncSession, event_id: str, event_type: str, payload: str) -> bool:
+    """Stocke l'évènement brut ; False si déjà reçu (re-livraison Stripe). Commit."""
+    obj: Dict[str, Any] = (json.loads(payload).get("data") or {}).get("object") or {}
+    stmt = pg_insert(StripeEvent).values(
+        id=event_id,
+        type=event_type,
+        payment_intent_id=obj.get("id") if event_type.startswith("payment_intent.") else None,
+        payload=payload,
+        status=STATUS_PENDING if event_type in HANDLED_TYPES else STATUS_IGNORED,
+        attempts=0,
+    ).on_conflict_do_nothing(index_elements=[StripeEvent.id]).returning(StripeEvent.id)
+    res = await db.execute(stmt)
+    inserted = res.scalar_one_or_none() is not None
+    await db.commit()
+    return inserted
+
+
+async def replay_event(db: AsyncSession, event_id: str) -> Optional[StripeEvent]:
+    res = await db.execute(
+        update(StripeEvent)
+        .where(StripeEvent.id == event_id)
+        .values(
+            status=STATUS_PENDING,
+            attempts=0,
+            next_attempt_at=func.now(),
+            last_error=None,
+            processed_at=None,
+        )
+        .returning(StripeEvent)
+    )
+    event = res.scalar_one_or_none()
+    await db.commit()
+    return event
+
+
+async def list_events(
+    db: AsyncSession, status: Optional[str] = None, limit: int = 50
+) -> List[StripeEvent]:
+    query = select(StripeEvent).order_by(StripeEvent.received_at.desc()).limit(limit)
+    if status:
+        query = query.where(StripeEvent.status == status)
+    res = await db.execute(query)
+    return res.scalars().all()
+
+
+# --- Traitement ---
+async def handle_payment_intent_event(db: AsyncSession, event_type: str, pi: Dict[str, Any]) -> None:
+    """Matérialise la commande du PaymentIntent (idempotent) et la passe en 'preparing' si payé."""
+    succeeded = event_type == "payment_intent.succeeded"
+    pi_id = pi["id"]
+    md = dict(pi.get("metadata") or {})
+
+    # 1) Commande déjà matérialisée pour ce PI (par /orders/capture ou un évènement précédent)
+    existing = await payment_order_service.get(db, pi_id)
+    if existing is not None:
+        await payment_order_service.promote_if_paid(db, existing, succeeded)
+        return
+
+    # 1bis) Commandes antérieures à orders.payment_intent_id : order_id marqué dans la metadata
+    if md.get("order_created") == "1" and md.get("order_id"):
+        try:
+            order_id = int(md["order_id"])
+        except (TypeError, ValueError):
+            raise PermanentEventError(f"order_id invalide en metadata: {md.get('order_id')!r}")
+        order = await order_crud.get(db, id=order_id)
+        if order is None:
+            raise PermanentEventError(f"commande {order_id} introuvable")
+        await payment_order_service.attach(db, order, pi_id)
+        await payment_order_service.promote_if_paid(db, order, succeeded)
+        return
+
+    # 2) Sinon, créer la commande depuis la metadata (le 2e chemin concurrent récupère la même)
+    try:
+        order_in = await payment_order_service.decode_metadata(db, md)
+    except Exception as e:
+        raise PermanentEventError(f"metadata de commande invalide: {e}")
+    try:
+        order, _ = await payment_order_service.materialize(db, pi_id, order_in)
+    except HTTPException as e:
+        if e.status_code < 500:
+            raise PermanentEventError(str(e.detail))
+        raise
+    await payment_order_service.promote_if_paid(db, order, succeeded)
+
+
+class StripeEventConsumer(PollingWorker):
+    name = "stripe_events"
+
+    def __init__(
+        self,
+        session_factory=AsyncSessionLocal,
+        poll_interval: float = 5.0,
+        batch_size: int = 20,
+        max_attempts: int = 8,
+        backoff: float = 5.0,
+        max_backoff: float = 600.0,
+    ):
+        super().__init__(poll_interval, batch_size, backoff, max_backoff)
+        self.session_factory = session_factory
+        self.max_attempts = max_attempts
+        # Métriques (process)
+        self.processed_total = 0
+        self.retries_total = 0
+        self.dead_total = 0
+
+    async def _claim(self) -> List[StripeEvent]:
+        now = func.now()
+        due = (
+            select(StripeEvent.id)
+            .where(
+                or_(
+                    StripeEvent.status == STATUS_PENDING,
+                    StripeEvent.status == STATUS_PROCESSING,  # bail expiré
+                ),
+                StripeEvent.next_attempt_at <= now,
+            )
+            .order_by(StripeEvent.received_at, StripeEvent.id)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        async with self.session_factory() as db:
+            res = await db.execute(
+                update(StripeEvent)
+                .where(StripeEvent.id.in_(due))
+                .values(status=STATUS_PROCESSING, next_attempt_at=now + timedelta(seconds=_LEASE_SECONDS))
+                .returning(StripeEvent)
+                .execution_options(synchronize_session=False)
+            )
+            events = sorted(res.scalars().all(), key=lambda e: (e.received_at, e.id))
+            await db.commit()
+            return events
+
+    async def _finish(self, db: AsyncSession, event: StripeEvent, error: Optional[Exception]) -> None:
+        values: Dict[str, Any]
+        if error is None:
+            values = {"status": STATUS_DONE, "processed_at": func.now(), "last_error": None}
+            self.processed_total += 1
+        else:
+            attempts = event.attempts + 1
+            permanent = isinstance(error, PermanentEventError)
+            values = {"attempts": attempts, "last_error": str(error)[:1000]}
+            if permanent or attempts >= self.max_attempts:
+                values.update(status=STATUS_DEAD, processed_at=func.now())
+                self.dead_total += 1
+                logger.error("stripe_events: %s en dead-letter (%s)", event.id, error)
+            else:
+                values.update(
+                    status=STATUS_PENDING,
+                    next_attempt_at=datetime.now(timezone.utc) + timedelta(seconds=self.retry_delay(attempts)),
+                )
+                self.retries_total += 1
+        await db.execute(update(StripeEvent).where(StripeEvent.id == event.id).values(**values))
+        await db.commit()
+
+    async def process(self, event: StripeEvent) -> None:
+        async with self.session_factory() as db:
+            error: Optional[Exception] = None
+            try:
+                if event.type in HANDLED_TYPES:
+                    pi = json.loads(event.payload)["data"]["object"]
+                    await handle_payment_intent_event(db, event.type, pi)
+            except Exception as e:
+                error = e
+                await db.rollback()
+            await self._finish(db, event, error)
+
+    async def drain_once(self) -> int:
+        events = await self._claim()
+        for event in events:
+            await self.process(event)
+        return len(events)
+
+    async def stats(self) -> Dict[str, Any]:
+        async with self.session_factory() as db:
+            res = await db.execute(select(StripeEvent.status, func.count()).group_by(StripeEvent.status))
+            by_status = {status: count for status, count in res.all()}
+        return {
+            "pending": by_status.get(STATUS_PENDING, 0) + by_status.get(STATUS_PROCESSING, 0),
+            "dead": by_status.get(STATUS_DEAD, 0),
+            "processed_total": self.processed_total,
+            "retries_total": self.retries_total,
+            "dead_total": self.dead_total,
+            "running": self.running,
+        }
+
+
+stripe_event_consumer = StripeEventConsumer(
+    poll_interval=settings.STRIPE_EVENTS_POLL_SECONDS,
+    max_attempts=settings.STRIPE_EVENTS_MAX_ATTEMPTS,
+    backoff=settings.STRIPE_EVENTS_BACKOFF_SECONDS,
+)
@@ -0,0 +1,171 @@
+"""
+Outbox transactionnelle pour les appels Stripe.
+
+Un effet de bord (ex. marquer le PaymentIntent avec l'order_id) est écrit
+dans `stripe_outbox` dans la MÊME transaction que la commande : il ne peut
+ni se perdre si l'appel Stripe échoue, ni exister sans commande. Un worker de
+fond (un par process, démarré dans main.py) vide la table :
+- réservation d'un lot (UPDATE ... locked_until = now() + bail, sous-requête
+  FOR UPDATE SKIP LOCKED) puis commit : plusieurs workers uvicorn ne traitent
+  jamais la même ligne, et aucun verrou ni transaction ne reste ouvert pendant
+  les appels Stripe. Un worker mort en plein lot : ses lignes redeviennent
+  éligibles à l'expiration du bail.
+- résultat de chaque appel enregistré dans une courte transaction
+- échec -> nouvel essai avec backoff exponentiel, puis état 'dead' après
+  STRIPE_OUTBOX_MAX_ATTEMPTS (visible via /health/stripe-outbox)
+
+La latence des réponses n'inclut plus d'écriture Stripe.
+"""
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import select, update, or_, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.background import PollingWorker
+from core.config import settings
+from core.payment_gateway import PaymentGateway, payment_gateway
+from database.session import AsyncSessionLocal
+from models.models import StripeOutboxEntry
+
+logger = logging.getLogger(__name__)
+
+ACTION_TAG_ORDER = "pi.tag_order"
+
+STATUS_PENDING = "pending"
+STATUS_DONE = "done"
+STATUS_DEAD = "dead"
+
+# Bail d'un lot réservé : couvre largement les appels Stripe (timeout + retries réseau)
+_LEASE_SECONDS = 300
+
+
+def enqueue(db: AsyncSession, action: str, payment_intent_id: str, payload: Dict[str, Any]) -> None:
+    """Ajoute l'effet de bord à la transaction en cours (ne commit pas)."""
+    db.add(StripeOutboxEntry(
+        action=action,
+        payment_intent_id=payment_intent_id,
+        payload=json.dumps(payload, separators=(",", ":")),
+        status=STATUS_PENDING,
+        attempts=0,
+    ))
+
+
+class StripeOutboxWorker(PollingWorker):
+    name = "stripe_outbox"
+
+    def __init__(
+        self,
+        gateway: PaymentGateway,
+        session_factory=AsyncSessionLocal,
+        poll_interval: float = 5.0,
+        batch_size: int = 20,
+        max_attempts: int = 8,
+        backoff: float = 5.0,
+        max_backoff: float = 600.0,
+    ):
+        super().__init__(poll_interval, batch_size, backoff, max_backoff)
+        self.gateway = gateway
+        self.session_factory = session_factory
+        self.max_attempts = max_attempts
+        # Métriques (process)
+        self.sent_total = 0
+        self.retries_total = 0
+        self.dead_total = 0
+
+    async def _dispatch(self, entry: StripeOutboxEntry) -> None:
+        payload = json.loads(entry.payload)
+        if entry.action == ACTION_TAG_ORDER:
+            await self.gateway.modify_payment_intent(
+                entry.payment_intent_id,
+                {"order_created": "1", "order_id": str(payload["order_id"])},
+            )
+        else:
+            raise ValueError(f"action outbox inconnue: {entry.action}")
+
+    async def _claim(self) -> List[StripeOutboxEntry]:
+        """Réserve un lot d'entrées dues (bail) et commit : aucun verrou conservé."""
+        now = func.now()
+        due = (
+            select(StripeOutboxEntry.id)
+            .where(
+                StripeOutboxEntry.status == STATUS_PENDING,
+                StripeOutboxEntry.next_attempt_at <= now,
+                or_(StripeOutboxEntry.locked_until.is_(None), StripeOutboxEntry.locked_until <= now),
+            )
+            .order_by(StripeOutboxEntry.id)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        async with self.session_factory() as db:
+            res = await db.execute(
+                update(StripeOutboxEntry)
+                .where(StripeOutboxEntry.id.in_(due))
+                .values(locked_until=now + timedelta(seconds=_LEASE_SECONDS))
+                .returning(StripeOutboxEntry)
+                .execution_options(synchronize_session=False)
+            )
+            entries = sorted(res.scalars().all(), key=lambda e: e.id)
+            await db.commit()
+            return entries
+
+    async def _finish(self, entry: StripeOutboxEntry, error: Optional[Exception]) -> None:
+        values: Dict[str, Any] = {"locked_until": None}
+        if error is None:
+            values.update(status=STATUS_DONE, last_error=None)
+            self.sent_total += 1
+        else:
+            attempts = entry.attempts + 1
+            values.update(attempts=attempts, last_error=str(error)[:1000])
+            if attempts >= self.max_attempts:
+                values.update(status=STATUS_DEAD)
+                self.dead_total += 1
+                logger.error("stripe_outbox: entrée %s abandonnée (%s)", entry.id, error)
+            else:
+                values.update(
+                    next_attempt_at=datetime.now(timezone.utc) + timedelta(seconds=self.retry_delay(attempts))
+                )
+                self.retries_total += 1
+        async with self.session_factory() as db:
+            await db.execute(
+                update(StripeOutboxEntry).where(StripeOutboxEntry.id == entry.id).values(**values)
+            )
+            await db.commit()
+
+    async def drain_once(self) -> int:
+        """Traite un lot d'entrées dues ; retourne le nombre d'entrées traitées."""
+        entries = await self._claim()
+        for entry in entries:
+            error: Optional[Exception] = None
+            try:
+                await self._dispatch(entry)   # hors transaction
+            except Exception as e:
+                error = e
+            await self._finish(entry, error)
+        return len(entries)
+
+    async def stats(self) -> Dict[str, Any]:
+        async with self.session_factory() as db:
+            res = await db.execute(
+                select(StripeOutboxEntry.status, func.count()).group_by(StripeOutboxEntry.status)
+            )
+            by_status = {status: count for status, count in res.all()}
+        return {
+            "pending": by_status.get(STATUS_PENDING, 0),
+            "dead": by_status.get(STATUS_DEAD, 0),
+            "sent_total": self.sent_total,
+            "retries_total": self.retries_total,
+            "dead_total": self.dead_total,
+            "running": self.running,
+        }
+
+
+stripe_outbox_worker = StripeOutboxWorker(
+    gateway=payment_gateway,
+    poll_interval=settings.STRIPE_OUTBOX_POLL_SECONDS,
+    max_attempts=settings.STRIPE_OUTBOX_MAX_ATTEMPTS,
+    backoff=settings.STRIPE_OUTBOX_BACKOFF_SECONDS,
+)
@@ -10,10 +10,16 @@ if os.environ.get("FORCE_PGSSL", "1") == "1":
     ctx.check_hostname = False
     ctx.verify_mode = ssl.CERT_NONE
     connect_args["ssl"] = ctx
+connect_args["statement_cache_size"] = settings.DB_STATEMENT_CACHE_SIZE
 
 async_engine = create_async_engine(
     settings.DATABASE_URL,
-    echo=True,
+    echo=settings.DB_ECHO,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
     connect_args=connect_args,
 )
 AsyncSessionLocal = sessionmaker(
@@ -24,6 +30,17 @@ AsyncSessionLocal = sessionmaker(
     expire_on_commit=False,
 )
 
+def pool_status() -> dict:
+    """Etat du pool (pour dimensionner DB_POOL_SIZE / DB_MAX_OVERFLOW)."""
+    pool = async_engine.pool
+    return {
+        "pool_size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "idle": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+    }
+
 async def get_db():
     async with AsyncSessionLocal() as session:
         try:
@@ -1,10 +1,24 @@
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 
-from database.session import async_engine
+from database.session import async_engine, pool_status
 from database.base import Base
 from api.routers import api_router
 from api.routers.stripe_webhook import router as stripe_webhook_router
+from core.http_client import geocoding_http
+from core.compression import CompressionMiddleware
+from core.instrumentation import (
+    METRICS_CONTENT_TYPE,
+    TimingMiddleware,
+    install_sql_instrumentation,
+    render_metrics,
+)
+from core.config import settings
+from core.security import get_admin_token, get_admin_token_or_query
+from core.payment_gateway import payment_gateway
+from crud.stripe_outbox import stripe_outbox_worker
+from crud.stripe_events import stripe_event_consumer
+from crud.payment_orders import order_draft_pruner
 
 
 app = FastAPI(
@@ -30,15 +44,68 @@ app.add_middleware(
     allow_credentials=True,          # ✅ important
     allow_methods=["*"],
     allow_headers=["*"],             # inclut X-Admin-Token, Content-Type, etc.
+    expose_headers=["X-Next-Cursor", "Idempotent-Replayed"],  # pagination keyset, rejeu idempotent
     max_age=86400,
 )
 
+# --- Temps par requête (total / SQL / appels sortants) : Server-Timing + /metrics ---
+# Ajouté avant la compression : la compression l'enveloppe, et le gabarit de route
+# posé dans le scope par le routeur reste visible ici.
+app.add_middleware(TimingMiddleware, server_timing=settings.SERVER_TIMING_HEADER)
+install_sql_instrumentation(async_engine)
+
+# --- Compression gzip / brotli (JSON, HTML...) au-delà de COMPRESSION_MIN_SIZE octets ---
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MIN_SIZE,
+    gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+    brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+    cache_entries=settings.COMPRESSION_CACHE_ENTRIES,
+)
+
 # Création des tables au démarrage (dev)
 @app.on_event("startup")
 async def create_db_tables():
     async with async_engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
 
+# Clients HTTP sortants partagés (pool + keep-alive)
+@app.on_event("startup")
+async def open_http_clients():
+    await geocoding_http.start()
+
+@app.on_event("shutdown")
+async def close_http_clients():
+    await geocoding_http.close()
+    payment_gateway.close()
+
+# Worker de l'outbox Stripe (appels Stripe hors du chemin des requêtes)
+@app.on_event("startup")
+async def start_stripe_outbox():
+    await stripe_outbox_worker.start()
+
+@app.on_event("shutdown")
+async def stop_stripe_outbox():
+    await stripe_outbox_worker.stop()
+
+# Consommateur des évènements webhook stockés (table stripe_events)
+@app.on_event("startup")
+async def start_stripe_event_consumer():
+    await stripe_event_consumer.start()
+
+@app.on_event("shutdown")
+async def stop_stripe_event_consumer():
+    await stripe_event_consumer.stop()
+
+# Purge des brouillons de commande CB expirés (order_drafts)
+@app.on_event("startup")
+async def start_order_draft_pruner():
+    await order_draft_pruner.start()
+
+@app.on_event("shutdown")
+async def stop_order_draft_pruner():
+    await order_draft_pruner.stop()
+
 # Routes API
 app.include_router(api_router, prefix="/api")
 app.include_router(stripe_webhook_router)  # /stripe/webhook
@@ -50,3 +117,34 @@ async def root():
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
+
+@app.get("/health/geocoding")
+async def geocoding_health(admin_token: str = Depends(get_admin_token_or_query)):
+    # queue_depth = appels en attente du sémaphore / du rate limit Nominatim
+    return geocoding_http.stats()
+
+@app.get("/health/db-pool")
+async def db_pool_health(admin_token: str = Depends(get_admin_token)):
+    # checked_out / idle / overflow : connexions du pool SQLAlchemy de ce worker
+    return pool_status()
+
+@app.get("/health/payment-gateway")
+async def payment_gateway_health(admin_token: str = Depends(get_admin_token_or_query)):
+    # queue_depth = appels Stripe en attente d'un thread du pool (STRIPE_MAX_CONCURRENCY)
+    return payment_gateway.stats()
+
+@app.get("/health/stripe-outbox")
+async def stripe_outbox_health(admin_token: str = Depends(get_admin_token_or_query)):
+    # pending = appels Stripe en attente / en retry ; dead = abandonnés après max tentatives
+    return await stripe_outbox_worker.stats()
+
+@app.get("/health/stripe-events")
+async def stripe_events_health(admin_token: str = Depends(get_admin_token_or_query)):
+    # pending = évènements webhook pas encore traités ; dead = à rejouer (POST /api/stripe-events/{id}/replay)
+    return await stripe_event_consumer.stats()
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics(admin_token: str = Depends(get_admin_token_or_query)):
+    # Format texte Prometheus ; histogrammes par route (gabarit), propres à ce worker.
+    # Admin : X-Admin-Token ou ?token=... (params du scrape_config Prometheus)
+    return Response(content=render_metrics(), media_type=METRICS_CONTENT_TYPE)
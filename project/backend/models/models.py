@@ -1,7 +1,7 @@
 import enum
 from sqlalchemy import (
-    Column, Integer, String, Text, ForeignKey, DateTime, Enum,
-    DECIMAL, Table
+    Column, Integer, BigInteger, String, Text, ForeignKey, DateTime, Enum,
+    DECIMAL, Table, Float, Index, Date, LargeBinary, DDL, event
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -30,7 +30,8 @@ product_options_association = Table(
     "product_options",
     Base.metadata,
     Column("product_id", Integer, ForeignKey("products.id"), primary_key=True),
-    Column("option_id", Integer, ForeignKey("options.id"), primary_key=True)
+    Column("option_id", Integer, ForeignKey("options.id"), primary_key=True),
+    Index("ix_product_options_option_id", "option_id"),
 )
 
 # Commande : snapshot des choix
@@ -41,7 +42,9 @@ order_item_choices_association = Table(
     Column("choice_option_id", Integer, ForeignKey("choice_options.id"), primary_key=True),
     Column("choice_name_snapshot", String(100), nullable=False),
     Column("choice_price_modifier_snapshot", DECIMAL(10, 2), nullable=False),
-    Column("created_at", DateTime(timezone=True), server_default=func.now())
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    # order_item_id est déjà en tête de la PK ; index pour les JOIN côté choice_options
+    Index("ix_order_item_choices_choice_option_id", "choice_option_id"),
 )
 
 # --- CATEGORY ---
@@ -63,11 +66,16 @@ class Product(Base):
     description = Column(Text)
     base_price = Column(DECIMAL(10, 2), nullable=False)
     image_url = Column(String(500))
-    category_id = Column(Integer, ForeignKey("categories.id"), nullable=False)
+    category_id = Column(Integer, ForeignKey("categories.id"), nullable=False, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     category = relationship("Category", back_populates="products")
 
+    # Lookup "products by name" (Menu Combo, nom exact)
+    __table_args__ = (
+        Index("ix_products_name", "name"),
+    )
+
     # Plusieurs options réutilisables (sauces, etc.)
     options = relationship("Option", secondary=product_options_association, back_populates="products")
     order_items = relationship("OrderItem", back_populates="product")
@@ -92,7 +100,7 @@ class ChoiceOption(Base):
     name = Column(String(100), nullable=False)
     image_url = Column(String(500))
     price_modifier = Column(DECIMAL(10, 2), nullable=False, default=0.0)
-    option_id = Column(Integer, ForeignKey("options.id"), nullable=False)
+    option_id = Column(Integer, ForeignKey("options.id"), nullable=False, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     option = relationship("Option", back_populates="choice_options")
@@ -114,15 +122,27 @@ class Order(Base):
     fee = Column(DECIMAL(10, 2), nullable=False)
     total = Column(DECIMAL(10, 2), nullable=False)
     status = Column(Enum(OrderStatus), nullable=False, default=OrderStatus.pending)
+    # PaymentIntent Stripe (CB) : une seule commande par PI, webhook et /capture confondus
+    payment_intent_id = Column(String(255), nullable=True, unique=True, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     order_items = relationship("OrderItem", back_populates="order")
 
+    # created_at relu par RETURNING au flush (bucket analytics de la création)
+    __mapper_args__ = {"eager_defaults": True}
+
+    # Pagination keyset (created_at DESC, id DESC) + filtres admin
+    __table_args__ = (
+        Index("ix_orders_created_at_id", "created_at", "id"),
+        Index("ix_orders_status_created_at_id", "status", "created_at", "id"),
+        Index("ix_orders_payment_mode_created_at_id", "payment_mode", "created_at", "id"),
+    )
+
 class OrderItem(Base):
     __tablename__ = "order_items"
     id = Column(Integer, primary_key=True, index=True)
-    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False)
-    product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
+    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False, index=True)
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=False, index=True)
     # >>> SUPPRIMÉ: menu_id
     product_name_snapshot = Column(String(200), nullable=False)
     base_price_snapshot = Column(DECIMAL(10, 2), nullable=False)
@@ -135,3 +155,145 @@ class OrderItem(Base):
     product = relationship("Product", back_populates="order_items")
     choice_options = relationship("ChoiceOption", secondary=order_item_choices_association, back_populates="order_items")
     # >>> SUPPRIMÉ: menu = relationship("Menu")
+
+# --- CACHE GÉOCODAGE ---
+class GeocodeCacheEntry(Base):
+    __tablename__ = "geocode_cache"
+    # sha256 de l'adresse normalisée (cf. crud/geocoding.normalize_address)
+    address_key = Column(String(64), primary_key=True)
+    normalized_address = Column(Text, nullable=False)
+    latitude = Column(Float, nullable=False)
+    longitude = Column(Float, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+# --- ROLLUPS ANALYTICS (mis à jour à la création / annulation d'une commande) ---
+class SalesDaily(Base):
+    __tablename__ = "sales_daily"
+    day = Column(Date, primary_key=True)
+    orders_count = Column(Integer, nullable=False, default=0)
+    items_count = Column(Integer, nullable=False, default=0)
+    revenue = Column(DECIMAL(12, 2), nullable=False, default=0)   # total TTC (items + frais)
+    fees = Column(DECIMAL(12, 2), nullable=False, default=0)
+
+class SalesHourly(Base):
+    __tablename__ = "sales_hourly"
+    day = Column(Date, primary_key=True)
+    hour = Column(Integer, primary_key=True)
+    orders_count = Column(Integer, nullable=False, default=0)
+    revenue = Column(DECIMAL(12, 2), nullable=False, default=0)
+
+class ProductSalesDaily(Base):
+    __tablename__ = "product_sales_daily"
+    day = Column(Date, primary_key=True)
+    product_id = Column(Integer, primary_key=True)
+    product_name = Column(String(200), nullable=False)
+    quantity = Column(Integer, nullable=False, default=0)
+    revenue = Column(DECIMAL(12, 2), nullable=False, default=0)
+
+class ChoiceSalesDaily(Base):
+    __tablename__ = "choice_sales_daily"
+    day = Column(Date, primary_key=True)
+    choice_option_id = Column(Integer, primary_key=True)
+    choice_name = Column(String(100), nullable=False)
+    count = Column(Integer, nullable=False, default=0)
+
+# --- IDEMPOTENCE (Idempotency-Key sur POST /orders/) ---
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+    scope = Column(String(32), primary_key=True)   # "orders.create"
+    key = Column(String(255), primary_key=True)
+    request_hash = Column(String(64), nullable=True)
+    state = Column(String(16), nullable=False, default="processing")  # processing | done
+    order_id = Column(Integer, ForeignKey("orders.id", ondelete="SET NULL"), nullable=True)
+    status_code = Column(Integer, nullable=True)
+    response_body = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+# --- BROUILLONS DE COMMANDE CB (metadata Stripe trop volumineuse ou mode "draft") ---
+class OrderDraft(Base):
+    __tablename__ = "order_drafts"
+    id = Column(Integer, primary_key=True)
+    payload = Column(LargeBinary, nullable=False)   # cf. core/order_codec.pack_order
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+# --- OUTBOX STRIPE (effets de bord écrits avec la commande, envoyés en tâche de fond) ---
+class StripeOutboxEntry(Base):
+    __tablename__ = "stripe_outbox"
+    id = Column(Integer, primary_key=True)
+    action = Column(String(32), nullable=False)
+    payment_intent_id = Column(String(255), nullable=False)
+    payload = Column(Text, nullable=False)                           # JSON
+    status = Column(String(16), nullable=False, default="pending")  # pending | done | dead
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    locked_until = Column(DateTime(timezone=True), nullable=True)   # bail du worker (appel Stripe en cours)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    __table_args__ = (
+        Index("ix_stripe_outbox_status_next_attempt", "status", "next_attempt_at"),
+    )
+
+# --- ÉVÈNEMENTS STRIPE REÇUS (webhook : stockés puis traités en tâche de fond) ---
+class StripeEvent(Base):
+    __tablename__ = "stripe_events"
+    id = Column(String(255), primary_key=True)                       # evt_... (dédoublonnage)
+    type = Column(String(64), nullable=False)
+    payment_intent_id = Column(String(255), nullable=True, index=True)
+    payload = Column(Text, nullable=False)                           # évènement brut (JSON)
+    status = Column(String(16), nullable=False, default="pending")  # pending | processing | done | ignored | dead
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    last_error = Column(Text, nullable=True)
+    received_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    processed_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index("ix_stripe_events_status_next_attempt", "status", "next_attempt_at"),
+    )
+
+# --- VERSION DU CATALOGUE (partagée entre workers, cf. crud/catalog_cache.py) ---
+# Incrémentée par trigger à chaque écriture sur les tables du catalogue,
+# quelle qu'en soit l'origine (routes admin, seed, SQL manuel).
+class CatalogState(Base):
+    __tablename__ = "catalog_state"
+    id = Column(Integer, primary_key=True)             # ligne unique : id = 1
+    version = Column(BigInteger, nullable=False, default=1)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+CATALOG_TABLES = ("categories", "products", "options", "choice_options", "product_options")
+
+CATALOG_VERSION_DDL = [
+    """
+    CREATE OR REPLACE FUNCTION bump_catalog_version() RETURNS trigger AS $$
+    BEGIN
+        INSERT INTO catalog_state (id, version, updated_at) VALUES (1, 1, now())
+        ON CONFLICT (id) DO UPDATE SET version = catalog_state.version + 1, updated_at = now();
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "INSERT INTO catalog_state (id, version) VALUES (1, 1) ON CONFLICT (id) DO NOTHING",
+] + [
+    # pas de DROP/CREATE à chaque démarrage (verrou exclusif sur la table)
+    f"""
+    DO $$ BEGIN
+        IF NOT EXISTS (
+            SELECT 1 FROM pg_trigger
+            WHERE tgname = 'trg_{table}_catalog_version' AND tgrelid = '{table}'::regclass
+        ) THEN
+            CREATE TRIGGER trg_{table}_catalog_version
+            AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table}
+            FOR EACH STATEMENT EXECUTE PROCEDURE bump_catalog_version();
+        END IF;
+    END $$
+    """
+    for table in CATALOG_TABLES
+]
+
+# create_all (démarrage dev) : mêmes triggers que la migration
+for _stmt in CATALOG_VERSION_DDL:
+    event.listen(Base.metadata, "after_create", DDL(_stmt).execute_if(dialect="postgresql"))
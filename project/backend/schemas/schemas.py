@@ -1,6 +1,6 @@
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
 from typing import List, Optional
-from datetime import datetime
+from datetime import date, datetime
 from decimal import Decimal
 from models.models import DeliveryMode, PaymentMode, OrderStatus
 
@@ -156,3 +156,67 @@ class OrderResponse(OrderBase, TimestampMixin):
     total: Decimal
     status: OrderStatus
     order_items: List[OrderItemResponse] = []
+
+
+# ----- DELIVERY QUOTE -----
+class DeliveryQuoteRequest(BaseModel):
+    address: Optional[str] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+
+class DeliveryQuoteResponse(BaseModel):
+    distance_km: float
+    fee: Decimal
+    in_zone: bool
+    max_km: float
+
+
+# ----- ANALYTICS (rollups) -----
+class RevenueDayResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    day: date
+    orders_count: int
+    items_count: int
+    revenue: Decimal
+    fees: Decimal
+    avg_basket: Decimal
+
+class RevenueHourResponse(BaseModel):
+    hour: int
+    orders_count: int
+    revenue: Decimal
+
+class TopProductResponse(BaseModel):
+    product_id: int
+    product_name: str
+    quantity: int
+    revenue: Decimal
+
+class TopChoiceResponse(BaseModel):
+    choice_option_id: int
+    choice_name: str
+    count: int
+
+class BasketSummaryResponse(BaseModel):
+    orders_count: int
+    revenue: Decimal
+    avg_basket: Decimal
+    avg_items: Decimal
+
+
+# ----- STRIPE EVENTS (webhook stocké, admin) -----
+class StripeEventResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    id: str
+    type: str
+    payment_intent_id: Optional[str] = None
+    status: str
+    attempts: int
+    last_error: Optional[str] = None
+    received_at: datetime
+    processed_at: Optional[datetime] = None
+
+class SQLProfilerConfigUpdate(BaseModel):
+    slow_ms: Optional[float] = Field(None, ge=0)
+    sample_rate: Optional[float] = Field(None, ge=0, le=1)
+    routes: Optional[List[str]] = None
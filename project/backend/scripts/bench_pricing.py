@@ -0,0 +1,70 @@
+"""
+CPU du pricing d'un panier : compute_unit_price_for_item (ancien chemin de
+CRUDOrder.create, dicts et lookup par nom reconstruits à chaque panier) vs
+PricingTable (construite une fois par version du catalogue, puis
+unit_price par ligne).
+
+Mêmes catalogue et paniers aléatoires que tests/test_pricing.py ; les deux
+chemins sont comparés prix par prix avant la mesure. Le coût de
+PricingTable.build est donné à part (payé une fois par snapshot).
+
+Depuis backend/ : python scripts/bench_pricing.py [--carts 5000] [--repeat 5]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(BACKEND_DIR))   # tests/
+
+from core.pricing import PricingTable  # noqa: E402
+from tests.test_pricing import CHOICES, OPTIONS, PRODUCTS, random_carts, reference_unit_price  # noqa: E402
+
+
+def price_reference(carts) -> list:
+    out = []
+    for lines in carts:
+        cart_reqs = [ch for _pid, reqs in lines for ch in reqs]
+        out.append([reference_unit_price(product_id, reqs, cart_reqs) for product_id, reqs in lines])
+    return out
+
+
+def price_table(table: PricingTable, carts) -> list:
+    return [[table.unit_price(product_id, reqs) for product_id, reqs in lines] for lines in carts]
+
+
+def bench(fn, repeat: int) -> float:
+    """Médiane, en secondes, de `repeat` exécutions."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def main(n_carts: int, repeat: int) -> None:
+    carts = list(random_carts(n_carts))
+    n_lines = sum(len(lines) for lines in carts)
+    table = PricingTable.build(PRODUCTS, OPTIONS, CHOICES)
+    assert price_reference(carts) == price_table(table, carts)
+
+    build = bench(lambda: PricingTable.build(PRODUCTS, OPTIONS, CHOICES), repeat * 20)
+    reference = bench(lambda: price_reference(carts), repeat)
+    compiled = bench(lambda: price_table(table, carts), repeat)
+
+    print(f"{n_carts} paniers, {n_lines} lignes, médiane sur {repeat} passes")
+    print(f"  compute_unit_price_for_item  {reference / n_carts * 1e6:8.1f} µs / panier")
+    print(f"  PricingTable.unit_price      {compiled / n_carts * 1e6:8.1f} µs / panier   x{reference / compiled:.1f}")
+    print(f"  PricingTable.build           {build * 1e6:8.1f} µs (une fois par version du catalogue)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--carts", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    main(args.carts, args.repeat)
@@ -0,0 +1,74 @@
+"""
+Données de test (catalogue minimal, commandes insérées directement).
+"""
+from decimal import Decimal
+from typing import Dict, List
+
+from models.models import (
+    Category, Product, Option, ChoiceOption, Order, OrderItem,
+    PaymentMode, OrderStatus, order_item_choices_association,
+)
+
+
+async def seed_catalog(db) -> Dict[str, object]:
+    """Un burger avec une option 'Sauces' à deux choix ; commit."""
+    category = Category(name="Burgers", slug="burgers")
+    db.add(category)
+    await db.flush()
+
+    burger = Product(name="Big Smash", slug="big-smash", base_price=Decimal("9.50"), category_id=category.id)
+    sauces = Option(name="Sauces", slug="sauces", type="checkbox")
+    db.add_all([burger, sauces])
+    await db.flush()
+
+    ketchup = ChoiceOption(name="Ketchup", price_modifier=Decimal("0.00"), option_id=sauces.id)
+    cheddar = ChoiceOption(name="Sauce cheddar", price_modifier=Decimal("0.50"), option_id=sauces.id)
+    db.add_all([ketchup, cheddar])
+    await db.commit()
+    return {"category": category, "burger": burger, "sauces": sauces, "ketchup": ketchup, "cheddar": cheddar}
+
+
+async def insert_orders(db, catalog: Dict[str, object], count: int, items_per_order: int = 2) -> List[Order]:
+    """`count` commandes cash, chacune avec `items_per_order` lignes et deux choix par ligne ; commit."""
+    burger = catalog["burger"]
+    choices = [catalog["ketchup"], catalog["cheddar"]]
+    orders = []
+    for n in range(count):
+        order = Order(
+            name=f"Client {n}",
+            address="1 rue de la Loge, 34000 Montpellier",
+            phone="0600000000",
+            payment_mode=PaymentMode.especes,
+            fee=Decimal("2.00"),
+            total=Decimal("2.00") + Decimal("10.00") * items_per_order,
+            status=OrderStatus.preparing,
+        )
+        order.order_items.extend(
+            OrderItem(
+                product_id=burger.id,
+                product_name_snapshot=burger.name,
+                base_price_snapshot=burger.base_price,
+                quantity=1,
+                item_total=Decimal("10.00"),
+            )
+            for _ in range(items_per_order)
+        )
+        db.add(order)
+        orders.append(order)
+    await db.flush()
+
+    rows = [
+        {
+            "order_item_id": item.id,
+            "choice_option_id": co.id,
+            "choice_name_snapshot": co.name,
+            "choice_price_modifier_snapshot": co.price_modifier,
+        }
+        for order in orders
+        for item in order.order_items
+        for co in choices
+    ]
+    if rows:
+        await db.execute(order_item_choices_association.insert(), rows)
+    await db.commit()
+    return orders
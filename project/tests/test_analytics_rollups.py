@@ -0,0 +1,93 @@
+"""
+Rollups analytics : la création et l'annulation d'une commande touchent le
+même bucket (jour / heure locaux de orders.created_at), l'annulation remet
+donc les compteurs à zéro ; des annulations répétées ou simultanées ne la
+retirent qu'une fois.
+"""
+import asyncio
+from decimal import Decimal
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy import select  # noqa: E402
+
+from tests.factories import seed_catalog  # noqa: E402
+
+
+async def _create_order(db, catalog):
+    from core.delivery import delivery_zone
+    from crud.crud_operations import order_crud
+    from models.models import PaymentMode
+    from schemas.schemas import OrderCreate, OrderItemChoiceRequest, OrderItemRequest
+
+    return await order_crud.create(db, OrderCreate(
+        name="Client",
+        address="1 rue de la Loge, 34000 Montpellier",
+        phone="0600000000",
+        payment_mode=PaymentMode.especes,
+        latitude=delivery_zone.lat,
+        longitude=delivery_zone.lng,
+        items=[OrderItemRequest(
+            product_id=catalog["burger"].id,
+            quantity=2,
+            choices=[OrderItemChoiceRequest(option_id=catalog["sauces"].id, choice_option_id=catalog["cheddar"].id)],
+        )],
+    ))
+
+
+def test_create_then_cancel_hits_the_same_bucket(pg_run):
+    async def scenario():
+        from database.session import AsyncSessionLocal
+        from crud.analytics import apply_status_rollup, local_day_hour
+        from models.models import OrderStatus, SalesDaily, SalesHourly
+
+        async with AsyncSessionLocal() as db:
+            catalog = await seed_catalog(db)
+            order = await _create_order(db, catalog)
+
+            day, hour = local_day_hour(order.created_at)
+            hourly = (await db.execute(select(SalesHourly))).scalars().all()
+            assert [(h.day, h.hour, h.orders_count) for h in hourly] == [(day, hour, 1)]
+
+            await apply_status_rollup(db, order, order.status, OrderStatus.cancelled)
+            await db.commit()
+
+            db.expire_all()
+            daily = (await db.execute(select(SalesDaily))).scalars().all()
+            hourly = (await db.execute(select(SalesHourly))).scalars().all()
+            assert [(d.day, d.orders_count, d.revenue) for d in daily] == [(day, 0, Decimal("0.00"))]
+            assert [(h.day, h.hour, h.orders_count) for h in hourly] == [(day, hour, 0)]
+
+    pg_run(scenario)
+
+
+def test_repeated_cancel_requests_subtract_the_order_once(pg_run):
+    async def scenario():
+        from database.session import AsyncSessionLocal
+        from api.routers.orders import update_order_status
+        from models.models import OrderStatus, ProductSalesDaily, SalesDaily, SalesHourly
+        from schemas.schemas import OrderUpdate
+
+        async with AsyncSessionLocal() as db:
+            catalog = await seed_catalog(db)
+            order = await _create_order(db, catalog)
+
+        async def cancel():
+            async with AsyncSessionLocal() as db:
+                return await update_order_status(order.id, OrderUpdate(status=OrderStatus.cancelled), db, "admin")
+
+        # deux admins en même temps, puis un double-clic
+        await asyncio.gather(cancel(), cancel())
+        await cancel()
+
+        async with AsyncSessionLocal() as db:
+            daily = (await db.execute(select(SalesDaily))).scalars().all()
+            hourly = (await db.execute(select(SalesHourly))).scalars().all()
+            products = (await db.execute(select(ProductSalesDaily))).scalars().all()
+            assert [(d.orders_count, d.items_count, d.revenue) for d in daily] == [(0, 0, Decimal("0.00"))]
+            assert [h.orders_count for h in hourly] == [0]
+            assert [(p.quantity, p.revenue) for p in products] == [(0, Decimal("0.00"))]
+
+    pg_run(scenario)
@@ -0,0 +1,96 @@
+"""
+Pricing des commandes : jamais sur un snapshot catalogue périmé, même quand
+l'écriture n'est pas passée par ce process (autre worker, SQL manuel) ; ids
+inconnus d'un snapshot à jour refusés (400) sans requête catalogue.
+"""
+from decimal import Decimal
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy import text  # noqa: E402
+
+from tests.factories import seed_catalog  # noqa: E402
+from tests.test_order_list_queries import count_statements  # noqa: E402
+
+
+def _items(catalog):
+    from schemas.schemas import OrderItemChoiceRequest, OrderItemRequest
+
+    return [
+        OrderItemRequest(
+            product_id=catalog["burger"].id,
+            quantity=2,
+            choices=[OrderItemChoiceRequest(option_id=catalog["sauces"].id, choice_option_id=catalog["cheddar"].id)],
+        )
+    ]
+
+
+def test_price_change_from_another_worker_is_charged(pg_run, monkeypatch):
+    from crud.catalog_cache import catalog_cache
+
+    monkeypatch.setattr(catalog_cache, "version_check_seconds", 0.0)
+
+    async def scenario():
+        from database.session import AsyncSessionLocal
+        from crud.cart_resolver import resolve_cart
+
+        async with AsyncSessionLocal() as db:
+            catalog = await seed_catalog(db)
+            cart = await resolve_cart(db, _items(catalog))
+            assert cart.items_total == Decimal("20.00")   # (9.50 + 0.50) x 2
+            cached_version = catalog_cache.version
+
+            # Écriture hors de ce process : pas d'invalidate() local
+            await db.execute(text("UPDATE products SET base_price = 11.50 WHERE id = :id"), {"id": catalog["burger"].id})
+            await db.commit()
+            assert catalog_cache.version == cached_version
+
+            cart = await resolve_cart(db, _items(catalog))
+            assert cart.items_total == Decimal("24.00")   # (11.50 + 0.50) x 2
+            # le snapshot périmé est jeté : le prochain accès le reconstruit
+            assert catalog_cache.version != cached_version
+
+            cart = await resolve_cart(db, _items(catalog))
+            assert cart.items_total == Decimal("24.00")
+
+    pg_run(scenario)
+
+
+def test_unknown_ids_on_current_snapshot_are_rejected_without_queries(pg_run, monkeypatch):
+    from crud.catalog_cache import catalog_cache
+
+    monkeypatch.setattr(catalog_cache, "version_check_seconds", 60.0)
+
+    async def scenario():
+        from fastapi import HTTPException
+
+        from database.session import AsyncSessionLocal, async_engine
+        from crud.cart_resolver import resolve_cart
+        from schemas.schemas import OrderItemChoiceRequest, OrderItemRequest
+
+        async with AsyncSessionLocal() as db:
+            catalog = await seed_catalog(db)
+            await resolve_cart(db, _items(catalog))   # construit le snapshot
+
+            with count_statements(async_engine) as statements:
+                # snapshot confirmé il y a moins de version_check_seconds : aucune requête
+                cart = await resolve_cart(db, _items(catalog))
+                assert cart.items_total == Decimal("20.00")
+
+                unknown_product = [OrderItemRequest(product_id=999_999, quantity=1, choices=[])]
+                unknown_choice = [
+                    OrderItemRequest(
+                        product_id=catalog["burger"].id,
+                        quantity=1,
+                        choices=[OrderItemChoiceRequest(option_id=catalog["sauces"].id, choice_option_id=999_999)],
+                    )
+                ]
+                for items in (unknown_product, unknown_choice):
+                    with pytest.raises(HTTPException) as exc:
+                        await resolve_cart(db, items)
+                    assert exc.value.status_code == 400
+            assert statements == []
+
+    pg_run(scenario)
@@ -0,0 +1,80 @@
+"""
+CompressionMiddleware : ETag suffixé par encodage ("+gzip") sur le 200, et
+le même ETag sur le 304 de revalidation.
+"""
+import asyncio
+import gzip
+
+import pytest
+
+pytest.importorskip("starlette")
+
+from core.compression import CompressionMiddleware  # noqa: E402
+
+ETAG = '"catalog-v1"'
+BODY = b'{"items":[' + b",".join(b'{"id":%d}' % i for i in range(200)) + b"]}"
+
+
+async def catalog_app(scope, receive, send):
+    headers = dict(scope["headers"])
+    if headers.get(b"if-none-match") == ETAG.encode():
+        await send({"type": "http.response.start", "status": 304, "headers": [(b"etag", ETAG.encode())]})
+        await send({"type": "http.response.body", "body": b""})
+        return
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(BODY)).encode()),
+            (b"etag", ETAG.encode()),
+            (b"cache-control", b"public, max-age=60"),
+        ],
+    })
+    await send({"type": "http.response.body", "body": BODY})
+
+
+def _get(app, **request_headers):
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/api/products/",
+        "headers": [(k.replace("_", "-").encode(), v.encode()) for k, v in request_headers.items()],
+    }
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    start = messages[0]
+    headers = {k.decode(): v.decode() for k, v in start["headers"]}
+    body = b"".join(m.get("body", b"") for m in messages[1:])
+    return start["status"], headers, body
+
+
+def test_not_modified_keeps_the_variant_etag():
+    app = CompressionMiddleware(catalog_app, minimum_size=100)
+
+    status, headers, body = _get(app, accept_encoding="gzip")
+    assert status == 200
+    assert headers["content-encoding"] == "gzip"
+    assert headers["etag"] == '"catalog-v1+gzip"'
+    assert gzip.decompress(body) == BODY
+
+    status, headers, _ = _get(app, accept_encoding="gzip", if_none_match=headers["etag"])
+    assert status == 304
+    assert headers["etag"] == '"catalog-v1+gzip"'
+    assert "Accept-Encoding" in headers["vary"]
+
+
+def test_other_variant_is_not_revalidated():
+    app = CompressionMiddleware(catalog_app, minimum_size=100)
+    # le client détient la variante gzip mais ne négocie plus aucun encodage
+    status, headers, body = _get(app, if_none_match='"catalog-v1+gzip"')
+    assert status == 200
+    assert headers["etag"] == ETAG
+    assert body == BODY
@@ -0,0 +1,48 @@
+"""
+DeliveryZone.quote : pré-rejet par bounding box, projection locale dans la
+boîte, grand cercle pour la distance affichée hors de la boîte.
+"""
+from decimal import Decimal
+
+import pytest
+
+pytest.importorskip("pydantic_settings")
+
+from core.delivery import DeliveryZone  # noqa: E402
+
+ZONE = DeliveryZone(43.606206, 3.870316, 8.0, Decimal("2.00"), Decimal("1.00"))
+
+
+def test_point_in_zone():
+    quote = ZONE.quote(43.61, 3.87)
+    assert quote.in_zone
+    assert quote.distance_km == pytest.approx(0.42, abs=0.01)
+    assert quote.fee == Decimal("2.42")
+
+
+def test_point_in_bbox_but_out_of_zone():
+    # coin de la boîte : dans le carré, hors du disque
+    assert ZONE.in_bbox(43.66, 3.95)
+    quote = ZONE.quote(43.66, 3.95)
+    assert not quote.in_zone
+    assert quote.distance_km > ZONE.max_km
+
+
+def test_point_out_of_bbox_keeps_displayed_distance():
+    assert not ZONE.in_bbox(48.85, 2.35)
+    quote = ZONE.quote(48.85, 2.35)   # Paris
+    assert not quote.in_zone
+    assert quote.distance_km == pytest.approx(595, abs=2)
+
+
+def test_quote_many_matches_quote_point_by_point():
+    lats = [43.61, 43.66, 43.70, 48.85, 43.606206, 43.58]
+    lngs = [3.87, 3.95, 3.87, 2.35, 3.870316, 3.84]
+    quotes = ZONE.quote_many(lats, lngs)
+    assert quotes == [ZONE.quote(lat, lng) for lat, lng in zip(lats, lngs)]
+    assert [q.in_zone for q in quotes] == [True, False, False, False, True, True]
+
+
+def test_quote_many_rejects_mismatched_arrays():
+    with pytest.raises(ValueError):
+        ZONE.quote_many([43.61, 43.62], [3.87])
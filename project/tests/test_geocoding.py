@@ -0,0 +1,127 @@
+"""
+GeocodeCache : recherches concurrentes d'une même adresse coalescées en un
+seul appel au géocodeur, et indépendantes de l'annulation d'un appelant.
+Géocodeur factice, sans DB (session_factory=None).
+OutboundHTTPClient : attente d'une place bornée par queue_timeout.
+"""
+import asyncio
+from datetime import timedelta
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+pytest.importorskip("asyncpg")
+
+import httpx  # noqa: E402
+
+from core.http_client import OutboundHTTPClient  # noqa: E402
+from crud.geocoding import GeocodeCache  # noqa: E402
+
+COORDS = (43.6108, 3.8767)
+
+
+class StubGeocoder:
+    def __init__(self, result=COORDS):
+        self.result = result
+        self.calls = []
+        self.release = asyncio.Event()
+
+    async def __call__(self, address):
+        self.calls.append(address)
+        await self.release.wait()
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+def _cache(geocoder):
+    return GeocodeCache(geocoder=geocoder, ttl=timedelta(days=1), session_factory=None)
+
+
+def test_concurrent_lookups_share_one_call():
+    async def scenario():
+        geocoder = StubGeocoder()
+        cache = _cache(geocoder)
+        addresses = ["12 Rue de la Loge, Montpellier", "12, rue de la loge  MONTPELLIER", "12 rue de la Loge Montpellier"]
+        lookups = [asyncio.create_task(cache.lookup(a)) for a in addresses * 3]
+        await asyncio.sleep(0)
+        geocoder.release.set()
+        results = await asyncio.gather(*lookups)
+
+        assert results == [COORDS] * len(lookups)
+        assert len(geocoder.calls) == 1
+        # ensuite servi par le LRU
+        assert await cache.lookup(addresses[1]) == COORDS
+        assert len(geocoder.calls) == 1
+        assert cache._inflight == {}
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_owner_does_not_fail_other_waiters():
+    async def scenario():
+        geocoder = StubGeocoder()
+        cache = _cache(geocoder)
+        owner = asyncio.create_task(cache.lookup("3 place de la Comédie"))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.lookup("3 Place de la Comedie"))
+        await asyncio.sleep(0)
+
+        owner.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await owner
+
+        geocoder.release.set()
+        assert await waiter == COORDS
+        assert len(geocoder.calls) == 1
+        assert cache._inflight == {}
+
+    asyncio.run(scenario())
+
+
+def test_error_is_shared_and_not_cached():
+    async def scenario():
+        geocoder = StubGeocoder(result=ValueError("nominatim down"))
+        cache = _cache(geocoder)
+        lookups = [asyncio.create_task(cache.lookup("1 rue Foch")) for _ in range(3)]
+        await asyncio.sleep(0)
+        geocoder.release.set()
+        results = await asyncio.gather(*lookups, return_exceptions=True)
+
+        assert all(isinstance(r, ValueError) for r in results)
+        assert len(geocoder.calls) == 1
+        assert cache._inflight == {}
+
+        geocoder.result = COORDS
+        assert await cache.lookup("1 rue Foch") == COORDS
+        assert len(geocoder.calls) == 2
+
+    asyncio.run(scenario())
+
+
+def test_queue_wait_is_bounded():
+    async def scenario():
+        release = asyncio.Event()
+
+        async def handler(request):
+            await release.wait()
+            return httpx.Response(200, json=[])
+
+        client = OutboundHTTPClient(base_url="http://nominatim.test", max_concurrency=1, queue_timeout=0.05)
+        client._client = httpx.AsyncClient(base_url=client.base_url, transport=httpx.MockTransport(handler))
+        first = asyncio.create_task(client.get("/search"))
+        await asyncio.sleep(0)
+
+        with pytest.raises(httpx.PoolTimeout):
+            await client.get("/search")
+        assert client.stats()["rejected_total"] == 1
+        assert client.queue_depth == 0
+
+        release.set()
+        assert (await first).status_code == 200
+        assert client.in_flight == 0
+        assert (await client.get("/search")).status_code == 200
+        await client.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,62 @@
+"""
+Idempotence de POST /orders/ : une fois la commande commitée, la clé reste
+prise même si la suite du traitement échoue (pas de doublon au retry).
+"""
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from tests.factories import seed_catalog  # noqa: E402
+
+
+def _order_in(catalog):
+    from core.delivery import delivery_zone
+    from models.models import PaymentMode
+    from schemas.schemas import OrderCreate, OrderItemRequest
+
+    return OrderCreate(
+        name="Client",
+        address="1 rue de la Loge, 34000 Montpellier",
+        phone="0600000000",
+        payment_mode=PaymentMode.especes,
+        latitude=delivery_zone.lat,
+        longitude=delivery_zone.lng,
+        items=[OrderItemRequest(product_id=catalog["burger"].id, quantity=1)],
+    )
+
+
+def test_claim_survives_release_after_order_commit(pg_run):
+    async def scenario():
+        from database.session import AsyncSessionLocal
+        from crud.crud_operations import order_crud
+        from crud.idempotency import idempotency_store, SCOPE_ORDER_CREATE, STATE_PROCESSING
+
+        async with AsyncSessionLocal() as db:
+            catalog = await seed_catalog(db)
+            assert await idempotency_store.claim(db, SCOPE_ORDER_CREATE, "k-1", "h") is None
+            order = await order_crud.create(db, obj_in=_order_in(catalog), idempotency_key="k-1")
+
+            # Échec simulé après le commit (ex. rechargement de la commande)
+            await idempotency_store.release(db, SCOPE_ORDER_CREATE, "k-1")
+
+            record = await idempotency_store.get(db, SCOPE_ORDER_CREATE, "k-1")
+            assert record is not None
+            assert record.state == STATE_PROCESSING
+            assert record.order_id == order.id
+            # le retry ne reprend pas la clé
+            assert await idempotency_store.claim(db, SCOPE_ORDER_CREATE, "k-1", "h") is not None
+
+    pg_run(scenario)
+
+
+def test_claim_released_when_order_not_created(pg_run):
+    async def scenario():
+        from database.session import AsyncSessionLocal
+        from crud.idempotency import idempotency_store, SCOPE_ORDER_CREATE
+
+        async with AsyncSessionLocal() as db:
+            assert await idempotency_store.claim(db, SCOPE_ORDER_CREATE, "k-2", "h") is None
+            await idempotency_store.release(db, SCOPE_ORDER_CREATE, "k-2")
+            assert await idempotency_store.get(db, SCOPE_ORDER_CREATE, "k-2") is None
+
+    pg_run(scenario)
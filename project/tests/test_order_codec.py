@@ -0,0 +1,36 @@
+"""
+Metadata Stripe : la commande inline laisse la place aux clés ajoutées
+ensuite par l'outbox (order_created, order_id), sinon bascule en brouillon.
+"""
+import os
+
+from core.order_codec import METADATA_MAX_KEYS, METADATA_VALUE_MAX, decode_inline, encode_inline, pack_order
+
+
+def _blob_with_parts(n_parts: int) -> bytes:
+    # base64 : 3 octets -> 4 caractères ; 375 octets = une valeur de 500 caractères
+    return os.urandom(n_parts * METADATA_VALUE_MAX * 3 // 4)
+
+
+def test_reserved_keys_leave_room_for_outbox_tags():
+    # "ov" + "on" + parts + 2 clés réservées <= 50
+    fits = _blob_with_parts(METADATA_MAX_KEYS - 4)
+    md = encode_inline(fits, reserved_keys=2)
+    assert md is not None
+    md.update({"order_created": "1", "order_id": "42"})
+    assert len(md) == METADATA_MAX_KEYS
+
+    too_big = _blob_with_parts(METADATA_MAX_KEYS - 3)
+    assert encode_inline(too_big) is not None
+    assert encode_inline(too_big, reserved_keys=2) is None
+
+
+def test_roundtrip():
+    data = {
+        "name": "Client", "address": "1 rue de la Loge", "phone": "0600000000", "fee": "2.50",
+        "latitude": 43.6, "longitude": 3.87, "payment_mode": "cb",
+        "items": [{"product_id": 3, "quantity": 2, "choices": [{"option_id": 1, "choice_option_id": 7}]}],
+    }
+    decoded = decode_inline(encode_inline(pack_order(data), reserved_keys=2))
+    assert decoded["items"] == data["items"]
+    assert decoded["fee"] == "2.50"
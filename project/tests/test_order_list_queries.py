@@ -0,0 +1,51 @@
+"""
+Liste admin des commandes : nombre de requêtes SQL indépendant du nombre de
+commandes (régression N+1 sur get_multi_with_relations).
+"""
+from contextlib import contextmanager
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy import event  # noqa: E402
+
+from tests.factories import insert_orders, seed_catalog  # noqa: E402
+
+
+@contextmanager
+def count_statements(engine):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+
+async def _list_query_count(n_orders: int) -> int:
+    from database.session import AsyncSessionLocal, async_engine
+    from crud.crud_operations import order_crud
+
+    async with AsyncSessionLocal() as db:
+        catalog = await seed_catalog(db)
+        await insert_orders(db, catalog, n_orders)
+
+    async with AsyncSessionLocal() as db:
+        with count_statements(async_engine) as statements:
+            orders = await order_crud.get_multi_with_relations(db, limit=100)
+        assert len(orders) == n_orders
+        assert all(len(item._choice_snapshots) == 2 for o in orders for item in o.order_items)
+        return len(statements)
+
+
+def test_order_list_query_count_does_not_grow_with_orders(pg_run):
+    one = pg_run(lambda: _list_query_count(1))
+    fifty = pg_run(lambda: _list_query_count(50))
+    # commandes + items (selectinload) + snapshots des choix en une requête
+    assert one == fifty
+    assert fifty <= 3
@@ -0,0 +1,161 @@
+"""
+Commande CB : le webhook Stripe et /orders/capture reçoivent le même
+PaymentIntent en même temps -> une seule commande, PaymentIntent marqué une
+seule fois (outbox). Passerelle Stripe factice.
+"""
+import asyncio
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy import func, select  # noqa: E402
+
+from tests.factories import seed_catalog  # noqa: E402
+
+
+def _order_in(catalog):
+    from core.delivery import delivery_zone
+    from models.models import PaymentMode
+    from schemas.schemas import OrderCreate, OrderItemChoiceRequest, OrderItemRequest
+
+    return OrderCreate(
+        name="Client CB",
+        address="1 rue de la Loge, 34000 Montpellier",
+        phone="0600000000",
+        payment_mode=PaymentMode.cb,
+        latitude=delivery_zone.lat,
+        longitude=delivery_zone.lng,
+        items=[OrderItemRequest(
+            product_id=catalog["burger"].id,
+            quantity=1,
+            choices=[OrderItemChoiceRequest(option_id=catalog["sauces"].id, choice_option_id=catalog["cheddar"].id)],
+        )],
+    )
+
+
+def test_webhook_and_capture_race_creates_one_order(pg_run, monkeypatch):
+    from core.payment_gateway import FakePaymentGateway
+    import api.routers.orders as orders_router
+
+    gateway = FakePaymentGateway(latency=0.005)
+    monkeypatch.setattr(orders_router, "payment_gateway", gateway)
+
+    async def scenario():
+        from database.session import AsyncSessionLocal
+        from crud.payment_orders import payment_order_service
+        from crud.stripe_events import handle_payment_intent_event
+        from crud.stripe_outbox import StripeOutboxWorker
+        from models.models import Order, OrderStatus, StripeOutboxEntry
+
+        async with AsyncSessionLocal() as db:
+            catalog = await seed_catalog(db)
+            intents = []
+            for _ in range(5):
+                md = await payment_order_service.encode_metadata(db, _order_in(catalog))
+                intents.append(await gateway.create_payment_intent(amount=1200, currency="eur", metadata=md))
+
+        async def webhook(pi):
+            async with AsyncSessionLocal() as db:
+                await handle_payment_intent_event(
+                    db, "payment_intent.succeeded", {"id": pi.id, "metadata": dict(pi.metadata)}
+                )
+
+        async def capture(pi):
+            async with AsyncSessionLocal() as db:
+                return await orders_router.capture_payment({"payment_intent_id": pi.id}, db)
+
+        for pi in intents:
+            _, captured = await asyncio.gather(webhook(pi), capture(pi))
+            assert captured.status == OrderStatus.preparing
+
+        async with AsyncSessionLocal() as db:
+            for pi in intents:
+                orders = (await db.execute(select(Order).where(Order.payment_intent_id == pi.id))).scalars().all()
+                assert len(orders) == 1
+                assert orders[0].status == OrderStatus.preparing
+                outbox = await db.scalar(
+                    select(func.count()).select_from(StripeOutboxEntry)
+                    .where(StripeOutboxEntry.payment_intent_id == pi.id)
+                )
+                assert outbox == 1
+            assert await db.scalar(select(func.count()).select_from(Order)) == len(intents)
+
+        # Le worker marque chaque PaymentIntent une seule fois
+        assert await StripeOutboxWorker(gateway=gateway).drain_once() == len(intents)
+        for pi in intents:
+            assert gateway.calls.count(("modify", pi.id)) == 1
+            assert gateway.intents[pi.id].metadata["order_created"] == "1"
+
+    pg_run(scenario)
+
+
+def test_expired_drafts_are_pruned(pg_run):
+    async def scenario():
+        from datetime import timedelta
+
+        from sqlalchemy import update
+
+        from database.session import AsyncSessionLocal
+        from crud.payment_orders import OrderDraftPruner
+        from models.models import OrderDraft
+
+        async with AsyncSessionLocal() as db:
+            drafts = [OrderDraft(payload=b"x") for _ in range(5)]
+            db.add_all(drafts)
+            await db.flush()
+            old_ids = [d.id for d in drafts[:3]]
+            await db.execute(
+                update(OrderDraft).where(OrderDraft.id.in_(old_ids))
+                .values(created_at=func.now() - timedelta(days=8))
+            )
+            await db.commit()
+
+        pruner = OrderDraftPruner(ttl=timedelta(days=7), batch_size=2)
+        assert await pruner.drain_once() == 2
+        assert await pruner.drain_once() == 1
+        assert await pruner.drain_once() == 0
+
+        async with AsyncSessionLocal() as db:
+            remaining = (await db.execute(select(OrderDraft.id).order_by(OrderDraft.id))).scalars().all()
+            assert remaining == [d.id for d in drafts[3:]]
+
+    pg_run(scenario)
+
+
+def test_geocoding_runs_outside_the_payment_intent_lock(pg_run, monkeypatch):
+    from crud.geocoding import geocode_cache
+
+    probes = []
+
+    async def slow_lookup(address):
+        """Géocodeur lent : pendant l'attente, ni verrou du PI ni transaction ouverte."""
+        from sqlalchemy import text
+
+        from core.delivery import delivery_zone
+        from database.session import AsyncSessionLocal
+
+        async with AsyncSessionLocal() as db:
+            locks = await db.scalar(text("SELECT count(*) FROM pg_locks WHERE locktype = 'advisory'"))
+            idle_in_tx = await db.scalar(text(
+                "SELECT count(*) FROM pg_stat_activity "
+                "WHERE datname = current_database() AND state = 'idle in transaction'"
+            ))
+            probes.append((locks, idle_in_tx))
+        return delivery_zone.lat, delivery_zone.lng
+
+    monkeypatch.setattr(geocode_cache, "lookup", slow_lookup)
+
+    async def scenario():
+        from database.session import AsyncSessionLocal
+        from crud.payment_orders import payment_order_service
+
+        async with AsyncSessionLocal() as db:
+            catalog = await seed_catalog(db)
+            order_in = _order_in(catalog).model_copy(update={"latitude": None, "longitude": None})
+            order, created = await payment_order_service.materialize(db, "pi_geo", order_in)
+            assert created
+            assert order.payment_intent_id == "pi_geo"
+
+    pg_run(scenario)
+    assert probes == [(0, 0)]
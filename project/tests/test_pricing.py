@@ -0,0 +1,127 @@
+"""
+PricingTable (table précompilée) == compute_unit_price_for_item (référence),
+sur un catalogue couvrant tacos / menu tacos / menu combo / produits simples
+et des paniers aléatoires.
+"""
+import random
+from decimal import Decimal
+from types import SimpleNamespace as NS
+
+from core.pricing import PricingTable, compute_unit_price_for_item, _norm
+
+SMASH = NS(name="Smash", slug="smash")
+SIGNATURE = NS(name="Signatures", slug="signature")
+TACOS = NS(name="Tacos", slug="tacos")
+MENUS = NS(name="Menus", slug=None)
+DRINKS = NS(name="Boissons", slug="boissons")
+
+PRODUCTS = [
+    NS(id=1, name="Tacos", slug="tacos", base_price=Decimal("6.50"), category=TACOS),
+    NS(id=2, name="Menu Tacos", slug="menu-tacos", base_price=Decimal("9.50"), category=MENUS),
+    NS(id=3, name="Menu Combo", slug="menu-combo", base_price=Decimal("12.00"), category=MENUS),
+    NS(id=4, name="Big Smash", slug="big-smash", base_price=Decimal("8.00"), category=SMASH),
+    NS(id=5, name="Le Parrain", slug=None, base_price=Decimal("12.50"), category=SIGNATURE),
+    # même nom exact qu'un autre produit : le dernier (id le plus grand) l'emporte
+    NS(id=6, name="Big Smash", slug="big-smash-signature", base_price=Decimal("11.00"), category=SIGNATURE),
+    # ne diffère que par la casse : jamais retenu pour le choix "Big Smash"
+    NS(id=7, name="big smash", slug="big-smash-mini", base_price=Decimal("5.00"), category=SMASH),
+    NS(id=8, name="Coca", slug=None, base_price=Decimal("2.50"), category=DRINKS),
+    NS(id=9, name="Chicken Burger", slug=None, base_price=Decimal("7.00"), category=None),
+    NS(id=10, name="Tacos XL", slug=None, base_price=Decimal("8.50"), category=TACOS),
+]
+
+OPTIONS = [
+    NS(id=1, name="Viandes", slug="viandes"),
+    NS(id=2, name="Choix du burger", slug="burger"),
+    NS(id=3, name="Sauces", slug=None),
+    NS(id=4, name="Suppléments", slug="supplements"),
+]
+
+CHOICES = [
+    NS(id=1, name="1 viande", option_id=1, price_modifier=Decimal("0.00")),
+    NS(id=2, name="2 viandes", option_id=1, price_modifier=Decimal("1.00")),
+    NS(id=3, name="Triple", option_id=1, price_modifier=Decimal("2.00")),
+    NS(id=4, name="Poulet", option_id=1, price_modifier=Decimal("0.50")),
+    NS(id=5, name="Big Smash", option_id=2, price_modifier=Decimal("0.00")),
+    NS(id=6, name=" Le Parrain ", option_id=2, price_modifier=Decimal("1.50")),
+    NS(id=7, name="Chicken Burger", option_id=2, price_modifier=Decimal("0.50")),
+    NS(id=8, name="Mystery Smash", option_id=2, price_modifier=Decimal("0.00")),
+    NS(id=9, name="Veggie", option_id=2, price_modifier=Decimal("1.00")),
+    NS(id=10, name="Ketchup", option_id=3, price_modifier=Decimal("0.00")),
+    NS(id=11, name="Sauce cheddar", option_id=3, price_modifier=Decimal("0.50")),
+    NS(id=12, name="Bacon", option_id=4, price_modifier=Decimal("1.20")),
+    NS(id=13, name="Oeuf", option_id=4, price_modifier=None),
+    NS(id=14, name="", option_id=2, price_modifier=Decimal("0.30")),
+]
+
+OPTIONS_BY_ID = {o.id: o for o in OPTIONS}
+CHOICES_BY_ID = {co.id: co for co in CHOICES}
+PRODUCTS_BY_ID = {p.id: p for p in PRODUCTS}
+
+
+def reference_unit_price(product_id, choice_reqs, cart_choice_reqs):
+    """Comme l'ancien CRUDOrder.create : Product.name IN (libellés des choix du panier)."""
+    names = {
+        CHOICES_BY_ID[ch.choice_option_id].name.strip()
+        for ch in cart_choice_reqs
+        if ch.choice_option_id in CHOICES_BY_ID and CHOICES_BY_ID[ch.choice_option_id].name
+    }
+    products_by_name = {_norm(p.name): p for p in PRODUCTS if p.name in names}
+    return compute_unit_price_for_item(
+        PRODUCTS_BY_ID[product_id], choice_reqs, OPTIONS_BY_ID, CHOICES_BY_ID, products_by_name
+    )
+
+
+def _req(choice_option_id, option_id=None):
+    if option_id is None:
+        option_id = CHOICES_BY_ID[choice_option_id].option_id if choice_option_id in CHOICES_BY_ID else 99
+    return NS(option_id=option_id, choice_option_id=choice_option_id)
+
+
+def test_explicit_cases():
+    table = PricingTable.build(PRODUCTS, OPTIONS, CHOICES)
+    # tacos 2 viandes : 8.00, le modificateur viande est retiré, + cheddar
+    assert table.unit_price(1, [_req(2), _req(11)]) == Decimal("8.50")
+    # menu tacos 3 viandes : 10.00 + 3.00
+    assert table.unit_price(2, [_req(3)]) == Decimal("13.00")
+    # menu combo + "Big Smash" : deux produits de ce nom, le dernier (Signature) l'emporte
+    assert table.unit_price(3, [_req(5), _req(12)]) == Decimal("16.70")
+    # menu combo + " Le Parrain " : nom exact après strip -> Signature
+    assert table.unit_price(3, [_req(6)]) == Decimal("17.00")
+    # burger inconnu sans indice smash/signature : base du produit
+    assert table.unit_price(3, [_req(9)]) == Decimal("13.00")
+    # produit simple, choix inconnu ignoré
+    assert table.unit_price(8, [_req(10), _req(999)]) == Decimal("2.50")
+    for product_id, reqs in [(1, [_req(2), _req(11)]), (3, [_req(5), _req(12)]), (3, [_req(6)]), (3, [_req(9)])]:
+        assert table.unit_price(product_id, reqs) == reference_unit_price(product_id, reqs, reqs)
+
+
+def random_carts(count: int, seed: int = 20251018):
+    """`count` paniers [(product_id, choice_reqs), ...] (aussi utilisés par scripts/bench_pricing.py)."""
+    rng = random.Random(seed)
+    choice_ids = list(CHOICES_BY_ID) + [999]
+    option_ids = list(OPTIONS_BY_ID) + [99]
+    for _ in range(count):
+        lines = []
+        for _ in range(rng.randint(1, 4)):
+            reqs = []
+            for _ in range(rng.randint(0, 5)):
+                co_id = rng.choice(choice_ids)
+                # parfois une option incohérente avec le choix (payload client)
+                opt_id = rng.choice(option_ids) if rng.random() < 0.15 else None
+                reqs.append(_req(co_id, opt_id))
+            lines.append((rng.choice(list(PRODUCTS_BY_ID)), reqs))
+        yield lines
+
+
+def test_matches_reference_on_random_carts():
+    table = PricingTable.build(PRODUCTS, OPTIONS, CHOICES)
+
+    for lines in random_carts(5000):
+        # L'ancien lookup par nom portait sur tout le panier ; il ne diffère du lookup
+        # par choix que si deux libellés de burger ne diffèrent que par la casse
+        # (absent de ce catalogue, cf. message du commit).
+        cart_reqs = [ch for _pid, reqs in lines for ch in reqs]
+        for product_id, reqs in lines:
+            expected = reference_unit_price(product_id, reqs, cart_reqs)
+            assert table.unit_price(product_id, reqs) == expected, (product_id, reqs)
@@ -0,0 +1,119 @@
+"""
+Requêtes chaudes : plans servis par les index (migrations 8e3f0b6c4a17 /
+b7d2c9e41f85), jamais par un Seq Scan.
+
+Les requêtes réellement émises par le CRUD sont capturées (SQL + paramètres
+driver) puis rejouées sous EXPLAIN sur la même connexion. Sur une base de test
+de quelques centaines de lignes le planner préfère le Seq Scan ;
+`enable_seqscan = off` ne fait que le pénaliser : s'il n'existe pas d'index
+utilisable, il reste choisi et le test échoue.
+"""
+from contextlib import contextmanager
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy import event, text  # noqa: E402
+
+from tests.factories import insert_orders, seed_catalog  # noqa: E402
+
+
+@contextmanager
+def capture_selects(engine):
+    captured = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            captured.append((statement, parameters))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield captured
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+
+async def _plans(run):
+    """Exécute `await run(db, catalog, orders)` et renvoie le plan de chaque SELECT émis."""
+    from database.session import AsyncSessionLocal, async_engine
+
+    async with AsyncSessionLocal() as db:
+        catalog = await seed_catalog(db)
+        orders = await insert_orders(db, catalog, 200)
+        await db.execute(text("ANALYZE"))
+        await db.commit()
+
+    async with AsyncSessionLocal() as db:
+        await db.execute(text("SET LOCAL enable_seqscan = off"))
+        with capture_selects(async_engine) as captured:
+            await run(db, catalog, orders)
+        conn = await db.connection()
+        plans = []
+        for statement, parameters in captured:
+            res = await conn.exec_driver_sql("EXPLAIN " + statement, parameters)
+            plans.append("\n".join(row[0] for row in res.fetchall()))
+        await db.rollback()
+        return plans
+
+
+def _assert_index_only(plan: str, *indexes: str):
+    assert "Seq Scan" not in plan, plan
+    for name in indexes:
+        assert name in plan, plan
+
+
+def test_keyset_order_list_uses_indexes(pg_run):
+    async def run(db, catalog, orders):
+        from crud.crud_operations import encode_order_cursor, order_crud
+
+        cursor = encode_order_cursor(orders[100])
+        page = await order_crud.get_multi_with_relations(db, limit=20, cursor=cursor)
+        assert len(page) == 20
+
+    orders_plan, items_plan, snapshots_plan = pg_run(lambda: _plans(run))
+    _assert_index_only(orders_plan, "ix_orders_created_at_id")
+    _assert_index_only(items_plan, "ix_order_items_order_id")
+    _assert_index_only(snapshots_plan)
+
+
+def test_status_filtered_order_list_uses_status_index(pg_run):
+    async def run(db, catalog, orders):
+        from crud.crud_operations import order_crud
+        from models.models import OrderStatus
+
+        await order_crud.get_multi_with_relations(db, limit=20, status=OrderStatus.preparing)
+
+    orders_plan = pg_run(lambda: _plans(run))[0]
+    _assert_index_only(orders_plan, "ix_orders_status_created_at_id")
+
+
+def test_cancellation_rollup_reads_use_indexes(pg_run):
+    async def run(db, catalog, orders):
+        from crud.analytics import apply_status_rollup
+        from models.models import OrderStatus
+
+        await apply_status_rollup(db, orders[42], OrderStatus.preparing, OrderStatus.cancelled)
+
+    items_plan, choices_plan = pg_run(lambda: _plans(run))
+    _assert_index_only(items_plan, "ix_order_items_order_id")
+    _assert_index_only(choices_plan, "ix_order_items_order_id")
+
+
+def test_products_by_name_lookup_uses_name_index(pg_run):
+    async def run(db, catalog, orders):
+        from crud.cart_resolver import _load_pricing_from_db
+        from schemas.schemas import OrderItemChoiceRequest, OrderItemRequest
+
+        items = [
+            OrderItemRequest(
+                product_id=catalog["burger"].id,
+                quantity=1,
+                choices=[OrderItemChoiceRequest(option_id=catalog["sauces"].id, choice_option_id=catalog["ketchup"].id)],
+            )
+        ]
+        await _load_pricing_from_db(db, items)
+
+    plans = pg_run(lambda: _plans(run))
+    products_plan = next(p for p in plans if "on products" in p)
+    _assert_index_only(products_plan, "ix_products_name")
@@ -0,0 +1,83 @@
+"""
+Outbox Stripe : le worker réserve ses lignes par bail (locked_until) et ne
+garde ni verrou ni transaction ouverts pendant l'appel Stripe.
+"""
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy import select  # noqa: E402
+
+
+def test_stripe_call_runs_outside_any_lock(pg_run):
+    from core.payment_gateway import FakePaymentGateway
+
+    class ProbingGateway(FakePaymentGateway):
+        """Pendant l'appel : la ligne n'est pas verrouillée, et un 2e worker ne la prend pas."""
+
+        async def modify_payment_intent(self, payment_intent_id, metadata):
+            from database.session import AsyncSessionLocal
+            from models.models import StripeOutboxEntry
+
+            async with AsyncSessionLocal() as db:
+                res = await db.execute(
+                    select(StripeOutboxEntry)
+                    .where(StripeOutboxEntry.payment_intent_id == payment_intent_id)
+                    .with_for_update(nowait=True)
+                )
+                self.leased = res.scalar_one().locked_until is not None
+                await db.rollback()
+            self.concurrent_batch = await self.other_worker.drain_once()
+            await super().modify_payment_intent(payment_intent_id, metadata)
+
+    async def scenario():
+        from database.session import AsyncSessionLocal
+        from crud.stripe_outbox import ACTION_TAG_ORDER, STATUS_DONE, StripeOutboxWorker, enqueue
+        from models.models import StripeOutboxEntry
+
+        gateway = ProbingGateway()
+        gateway.other_worker = StripeOutboxWorker(gateway=FakePaymentGateway())
+        pi = await gateway.create_payment_intent(amount=100, currency="eur", metadata={})
+
+        async with AsyncSessionLocal() as db:
+            enqueue(db, ACTION_TAG_ORDER, pi.id, {"order_id": 7})
+            await db.commit()
+
+        assert await StripeOutboxWorker(gateway=gateway).drain_once() == 1
+        assert gateway.leased
+        assert gateway.concurrent_batch == 0
+        assert gateway.intents[pi.id].metadata == {"order_created": "1", "order_id": "7"}
+
+        async with AsyncSessionLocal() as db:
+            entry = (await db.execute(select(StripeOutboxEntry))).scalar_one()
+            assert entry.status == STATUS_DONE
+            assert entry.locked_until is None
+
+    pg_run(scenario)
+
+
+def test_failed_call_releases_lease_and_schedules_retry(pg_run):
+    async def scenario():
+        from core.payment_gateway import FakePaymentGateway
+        from database.session import AsyncSessionLocal
+        from crud.stripe_outbox import ACTION_TAG_ORDER, STATUS_PENDING, StripeOutboxWorker, enqueue
+        from models.models import StripeOutboxEntry
+
+        async with AsyncSessionLocal() as db:
+            enqueue(db, ACTION_TAG_ORDER, "pi_missing", {"order_id": 7})
+            await db.commit()
+
+        worker = StripeOutboxWorker(gateway=FakePaymentGateway())
+        assert await worker.drain_once() == 1
+        assert worker.retries_total == 1
+
+        async with AsyncSessionLocal() as db:
+            entry = (await db.execute(select(StripeOutboxEntry))).scalar_one()
+            assert entry.status == STATUS_PENDING
+            assert entry.attempts == 1
+            assert entry.locked_until is None
+            assert "No such payment_intent" in entry.last_error
+        # backoff : pas encore dû
+        assert await worker.drain_once() == 0
+
+    pg_run(scenario)